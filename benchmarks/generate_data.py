@@ -0,0 +1,172 @@
+'''
+Synthetic data generator: builds a scaled shop database for benchmarks.
+
+    python -m benchmarks.generate_data --scale 10k  --out data/bench_10k.db
+    python -m benchmarks.generate_data --scale 100k --out data/bench_100k.db
+    python -m benchmarks.generate_data --products 50000 --users 5000 --orders 80000 --out /tmp/custom.db
+
+What gets generated (the same --seed always gives the same database):-
+    1. products with searchable names ("Wireless Ergonomic Mouse 123"), descriptions, prices, stock and a sku
+    2. customers (user1 ... userN, password "password")
+    3. orders spread over the last year with 1-5 lines each; popular products show up far more often
+       (a few best sellers and a long tail, like a real shop), and a realistic mix of statuses
+--legacy-items-json writes the order lines into orders.items_json only, the format used before order_items
+existed, and marks the schema as version 3, so the next program that opens it runs the backfill migration.
+'''
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from core.database import DatabaseManager
+from core.models.order import Order
+
+SCALES = { # products, users, orders
+    "10k": (10_000, 2_000, 20_000),
+    "100k": (100_000, 20_000, 200_000),
+    "1m": (1_000_000, 200_000, 2_000_000),
+}
+
+ADJECTIVES = ["Wireless", "Ergonomic", "Portable", "Premium", "Compact", "Smart", "Classic", "Rugged",
+              "Silent", "Ultra", "Eco", "Pro", "Mini", "Heavy-Duty", "Vintage", "Foldable"]
+MATERIALS = ["Steel", "Bamboo", "Leather", "Carbon", "Ceramic", "Cotton", "Aluminium", "Glass", "Wooden", "Plastic"]
+NOUNS = ["Mouse", "Keyboard", "Laptop", "Monitor", "Headphones", "Speaker", "Charger", "Cable", "Backpack", "Bottle",
+         "Lamp", "Chair", "Desk", "Notebook", "Pen", "Camera", "Tripod", "Router", "Watch", "Jacket", "Mug", "Kettle"]
+FEATURES = ["fast charging", "long battery life", "water resistant", "two year warranty", "USB-C", "noise cancelling",
+            "adjustable height", "dishwasher safe", "lightweight", "bluetooth 5.3", "recycled materials", "travel case"]
+STATUSES = ["delivered"] * 60 + ["shipped"] * 15 + ["processing"] * 10 + ["pending"] * 10 + ["cancelled"] * 5
+CHUNK = 10_000 # rows per executemany / transaction
+
+
+def product_rows(count: int, rng: random.Random):
+    for n in range(1, count + 1):
+        name = f"{rng.choice(ADJECTIVES)} {rng.choice(MATERIALS)} {rng.choice(NOUNS)} {n}"
+        description = f"{name} with {rng.choice(FEATURES)} and {rng.choice(FEATURES)}."
+        price = round(min(rng.lognormvariate(3.2, 1.0), 5000) + 0.99, 2) # mostly cheap, a few expensive
+        stock = rng.choice([0, 5, 20, 50, 100, 500, 1000]) if rng.random() > 0.03 else 0
+        yield (name, price, stock, description, f"SKU-{n:08d}")
+
+
+def user_rows(count: int, start: datetime):
+    for n in range(1, count + 1):
+        yield (f"user{n}", "password", "customer", (start + timedelta(minutes=n)).isoformat(timespec="seconds"))
+
+
+def popular_product(rng: random.Random, products: int) -> int:
+    """Product id with a long-tail distribution: low ids (the best sellers) are picked far more often."""
+    return min(int(rng.paretovariate(1.2)) * rng.randint(1, 7), products) if rng.random() < 0.5 else rng.randint(1, products)
+
+
+def generate(path: str, products: int, users: int, orders: int, seed: int = 42, legacy: bool = False, progress=print):
+    """Create (or overwrite) the database at path. Returns {"products", "users", "orders", "order_items", "seconds"}."""
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    now = datetime.now().replace(microsecond=0)
+
+    db = DatabaseManager(path, profile="bulk-load", slow_query_ms=None)
+    try:
+        # Products; price and name are kept for the order lines
+        catalog = [None] # index = product id
+        batch = []
+        for row in product_rows(products, rng):
+            batch.append(row)
+            catalog.append((row[0], row[1]))
+            if len(batch) >= CHUNK:
+                db.execute_many("INSERT INTO products (name, price, stock, description, sku) VALUES (?, ?, ?, ?, ?)", batch)
+                batch = []
+        if batch:
+            db.execute_many("INSERT INTO products (name, price, stock, description, sku) VALUES (?, ?, ?, ?, ?)", batch)
+        progress(f"  {products:,} products")
+
+        # Users (the default admin already has id 1)
+        batch = []
+        for row in user_rows(users, now - timedelta(days=400)):
+            batch.append(row)
+            if len(batch) >= CHUNK:
+                db.execute_many("INSERT INTO users (username, password, role, created_at) VALUES (?, ?, ?, ?)", batch)
+                batch = []
+        if batch:
+            db.execute_many("INSERT INTO users (username, password, role, created_at) VALUES (?, ?, ?, ?)", batch)
+        first_user = 2
+        progress(f"  {users:,} users")
+
+        # Orders, in id order, created_at increasing over the last year
+        line_count = 0
+        order_batch, line_batch = [], []
+        for order_id in range(1, orders + 1):
+            created = now - timedelta(seconds=int((orders - order_id) * 365 * 86400 / max(orders, 1)))
+            lines = {}
+            for _ in range(rng.choice([1, 1, 1, 2, 2, 3, 4, 5])):
+                pid = popular_product(rng, products)
+                lines[pid] = lines.get(pid, 0) + rng.choice([1, 1, 1, 2, 3])
+            items = [{"product_id": pid, "name": catalog[pid][0], "price": catalog[pid][1], "qty": qty} for pid, qty in lines.items()]
+            user_id = rng.randint(first_user, first_user + users - 1) if users else 1
+            total = round(sum(i["price"] * i["qty"] for i in items), 2)
+            order_batch.append((order_id, user_id, json.dumps(items) if legacy else None, rng.choice(STATUSES),
+                                created.isoformat(timespec="seconds"),
+                                None if legacy else total, None if legacy else sum(lines.values()))) # legacy: the migration fills them
+            if not legacy:
+                line_batch.extend((order_id, i["product_id"], i["name"], i["price"], i["qty"]) for i in items)
+            line_count += len(items)
+            if len(order_batch) >= CHUNK:
+                _write_orders(db, order_batch, line_batch)
+                order_batch, line_batch = [], []
+        if order_batch:
+            _write_orders(db, order_batch, line_batch)
+        progress(f"  {orders:,} orders ({line_count:,} lines)")
+        if not legacy:
+            order_model = Order(db)
+            order_model.rebuild_user_summaries() # one GROUP BY instead of an upsert per order
+            order_model.sales.rebuild() # the same for the sales rollups
+
+        with db.connection() as conn:
+            conn.execute("ANALYZE") # table statistics for the query planner, like a long-running shop would have
+            if legacy:
+                conn.execute("PRAGMA user_version = 3") # the next open runs the order_items backfill
+    finally:
+        db.close()
+    return {"products": products, "users": users, "orders": orders, "order_items": line_count,
+            "seconds": time.perf_counter() - started}
+
+
+def _write_orders(db, orders, lines):
+    with db.transaction():
+        db.execute_many("INSERT INTO orders (id, user_id, items_json, status, created_at, total, item_count) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)", orders)
+        if lines:
+            db.execute_many("INSERT INTO order_items (order_id, product_id, name, price, qty) VALUES (?, ?, ?, ?, ?)", lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a scaled shop database for benchmarks.")
+    parser.add_argument("--scale", choices=list(SCALES), default="10k", help="preset sizes (products / users / orders)")
+    parser.add_argument("--products", type=int, help="override the preset")
+    parser.add_argument("--users", type=int, help="override the preset")
+    parser.add_argument("--orders", type=int, help="override the preset")
+    parser.add_argument("--out", help="database file to create (default data/bench_<scale>.db)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--legacy-items-json", action="store_true", help="store order lines the old way (items_json)")
+    args = parser.parse_args(argv)
+
+    products, users, orders = SCALES[args.scale]
+    products = args.products if args.products is not None else products
+    users = args.users if args.users is not None else users
+    orders = args.orders if args.orders is not None else orders
+    out = args.out or f"data/bench_{args.scale}.db"
+
+    print(f"Generating {out} ...")
+    summary = generate(out, products, users, orders, args.seed, args.legacy_items_json)
+    print(f"Done in {summary['seconds']:.1f}s: {summary['products']:,} products, {summary['users']:,} users, "
+          f"{summary['orders']:,} orders, {summary['order_items']:,} order lines")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
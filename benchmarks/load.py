@@ -0,0 +1,324 @@
+'''
+Concurrent customer load generator.
+
+Many simulated customers shop at the same time on one database file, most of them fighting over a few
+"hot" products with little stock, like a flash sale:-
+    1. --workers threads (sharing one DatabaseManager and its connection pool) or processes (one
+       DatabaseManager each, like several copies of the program) run shopping sessions for --duration seconds
+    2. A session browses a few pages, sometimes searches, adds 1-3 products to the cart (a hot one with
+       probability --hot-ratio) and checks out, or abandons the cart
+    3. Afterwards it reports throughput, p50/p95/p99 latency per step, lock contention (transactions that
+       waited for the write lock, time spent waiting, busy retries and statements that gave up, from
+       DatabaseManager.busy_stats()), and checks the stock
+       invariants: no negative stock, every unit sold came out of stock exactly once (no oversell),
+       and no product has more units held in carts than it has in stock
+
+    python -m benchmarks.load --workers 8 --duration 10
+    python -m benchmarks.load --workers 16 --mode process --hot-skus 3 --hot-stock 20 --out load.json
+    python -m benchmarks.load --db data/bench_10k.db --workers 8   (works on a copy of that database)
+'''
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.generate_data import generate
+from core.database import DatabaseManager
+from core.models.product import Product
+from core.services.cart_service import CartService
+
+SEARCH_WORDS = ["wireless", "mouse", "keyboard", "lamp", "steel", "bamboo", "pro", "bottle", "cable", "chair"]
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1)) # nearest rank
+    return sorted_values[index]
+
+
+# ----- One worker -----
+def run_worker(db, worker: int, options: dict) -> dict:
+    """Run shopping sessions until the deadline. Returns latencies (seconds) per step and counters."""
+    rng = random.Random(options["seed"] * 1000 + worker)
+    product_model = Product(db)
+    cart_service = CartService(db)
+    hot = list(range(1, options["hot_skus"] + 1))
+    products = options["products"]
+    latencies = {"browse": [], "search": [], "add_to_cart": [], "checkout": []}
+    counts = {"sessions": 0, "checkouts_ok": 0, "checkouts_out_of_stock": 0, "checkouts_db_failed": 0,
+              "adds_ok": 0, "adds_refused": 0, "empty_carts": 0, "abandoned": 0, "errors": 0}
+
+    # The models swallow (or turn into False) sqlite3 errors, so lock trouble never reaches us as an exception:
+    # it is measured with db.busy_stats() around the run and cart_service.failed_checkouts instead
+    def timed(step, function, *args):
+        started = time.perf_counter()
+        try:
+            return function(*args)
+        except Exception:
+            counts["errors"] += 1
+        finally:
+            latencies[step].append(time.perf_counter() - started)
+
+    deadline = time.time() + options["duration"]
+    session = 0
+    while time.time() < deadline:
+        session += 1
+        user_id = 10_000_000 + worker * 1_000_000 + session # cart owners no real user has
+        counts["sessions"] += 1
+
+        page = timed("browse", product_model.list_products_page, None, 20)
+        for _ in range(rng.randint(0, 2)):
+            if not page or not page["next"]:
+                break
+            page = timed("browse", product_model.list_products_page, page["next"], 20)
+        if rng.random() < 0.5:
+            timed("search", product_model.search_products, rng.choice(SEARCH_WORDS), 20)
+
+        in_cart = 0
+        for _ in range(rng.randint(1, 3)):
+            product_id = rng.choice(hot) if hot and rng.random() < options["hot_ratio"] else rng.randint(1, products)
+            added = timed("add_to_cart", cart_service.add_to_cart, user_id, product_id, rng.randint(1, 2))
+            counts["adds_ok" if added else "adds_refused"] += 1
+            in_cart += bool(added)
+
+        if not in_cart:
+            counts["empty_carts"] += 1 # every product they wanted was sold out or held by other carts
+            continue
+        if rng.random() < options["abandon_ratio"]:
+            counts["abandoned"] += 1 # the cart's holds stay until they expire, like a real abandoned cart
+            continue
+        if timed("checkout", cart_service.checkout, user_id):
+            counts["checkouts_ok"] += 1
+    counts["checkouts_out_of_stock"] = cart_service.failed_checkouts["stock"] # stock gone since the cart was filled
+    counts["checkouts_db_failed"] = cart_service.failed_checkouts["database"] # rolled back by a database error (lock gave up)
+    return {"latencies": latencies, "counts": counts}
+
+
+def busy_delta(before: dict, after: dict) -> dict:
+    return {key: after[key] - before.get(key, 0) for key in after}
+
+
+def _process_worker(args):
+    """Entry point of a worker process: its own DatabaseManager, like a separate copy of the program."""
+    path, worker, options = args
+    sys.stdout = open(os.devnull, "w") # the services print a line for every step
+    db = DatabaseManager(path, profile=options["profile"], slow_query_ms=None)
+    try:
+        before = db.busy_stats() # opening (migrations, admin check) may already have waited
+        result = run_worker(db, worker, options)
+        result["busy"] = busy_delta(before, db.busy_stats())
+        return result
+    finally:
+        db.close()
+
+
+# ----- Setup and checks -----
+def prepare(options: dict, folder: str) -> str:
+    """Make the database the load runs on: a copy of --db, or a freshly generated one. Returns its path."""
+    path = os.path.join(folder, "load.db")
+    if options["db"]:
+        source = sqlite3.connect(options["db"])
+        target = sqlite3.connect(path)
+        source.backup(target)
+        source.close()
+        target.close()
+    else:
+        generate(path, options["products"], 100, 1000, seed=options["seed"], progress=lambda message: None)
+
+    db = DatabaseManager(path, slow_query_ms=None)
+    try:
+        options["products"] = db.fetch_one("SELECT MAX(id) FROM products")[0] or 0
+        hot = [(options["hot_stock"], pid) for pid in range(1, options["hot_skus"] + 1)]
+        db.execute_many("UPDATE products SET stock = ? WHERE id = ?", hot) # the flash-sale products
+        db.execute("DELETE FROM stock_reservations", commit=True)
+    finally:
+        db.close()
+    return path
+
+
+def snapshot(path: str) -> dict:
+    conn = sqlite3.connect(path)
+    try:
+        return {
+            "stock": dict(conn.execute("SELECT id, stock FROM products").fetchall()),
+            "last_order": conn.execute("SELECT COALESCE(MAX(id), 0) FROM orders").fetchone()[0],
+        }
+    finally:
+        conn.close()
+
+
+def check_invariants(path: str, before: dict) -> list:
+    """Compare the database after the run with the snapshot from before. Returns a list of violations."""
+    conn = sqlite3.connect(path)
+    try:
+        violations = []
+        stock_after = dict(conn.execute("SELECT id, stock FROM products").fetchall())
+        sold = dict(conn.execute("""
+            SELECT i.product_id, SUM(i.qty) FROM order_items i WHERE i.order_id > ? GROUP BY i.product_id
+        """, (before["last_order"],)).fetchall())
+        held = dict(conn.execute("""
+            SELECT product_id, SUM(qty) FROM stock_reservations WHERE expires_at > ? GROUP BY product_id
+        """, (time.time(),)).fetchall())
+
+        for pid, stock in stock_after.items():
+            initial = before["stock"].get(pid, 0)
+            units = sold.get(pid, 0)
+            if stock < 0:
+                violations.append(f"product {pid}: negative stock {stock}")
+            if units > initial:
+                violations.append(f"product {pid}: oversold, {units} sold but only {initial} were in stock")
+            if initial - stock != units:
+                violations.append(f"product {pid}: stock went {initial} -> {stock} but orders contain {units} units")
+            if held.get(pid, 0) > stock:
+                violations.append(f"product {pid}: {held[pid]} units held in carts but only {stock} in stock")
+        orphans = conn.execute("""
+            SELECT COUNT(*) FROM orders o WHERE o.id > ? AND NOT EXISTS (SELECT 1 FROM order_items i WHERE i.order_id = o.id)
+        """, (before["last_order"],)).fetchone()[0]
+        if orphans:
+            violations.append(f"{orphans} order(s) without any lines (half-written checkout)")
+        return violations
+    finally:
+        conn.close()
+
+
+# ----- Running -----
+def run_load(options: dict) -> dict:
+    with tempfile.TemporaryDirectory() as folder:
+        saved_stdout = sys.stdout
+        sys.stdout = open(os.devnull, "w") # generator, migrations and services all print
+        try:
+            path = prepare(options, folder)
+            before = snapshot(path)
+            started = time.perf_counter()
+            if options["mode"] == "process":
+                with multiprocessing.Pool(options["workers"]) as pool:
+                    results = pool.map(_process_worker, [(path, w, options) for w in range(options["workers"])])
+                busy = {}
+                for result in results:
+                    for key, value in result["busy"].items():
+                        busy[key] = busy.get(key, 0) + value
+            else:
+                db = DatabaseManager(path, pool_size=options["workers"], profile=options["profile"], slow_query_ms=None)
+                busy_before = db.busy_stats()
+                results = [None] * options["workers"]
+
+                def thread_main(w):
+                    results[w] = run_worker(db, w, options)
+                threads = [threading.Thread(target=thread_main, args=(w,)) for w in range(options["workers"])]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                busy = busy_delta(busy_before, db.busy_stats()) # threads share one DatabaseManager: one total
+                db.close()
+            elapsed = time.perf_counter() - started
+            violations = check_invariants(path, before)
+        finally:
+            sys.stdout.close()
+            sys.stdout = saved_stdout
+    return report(options, results, busy, elapsed, violations)
+
+
+def report(options, results, busy, elapsed, violations) -> dict:
+    counts = {}
+    latencies = {}
+    for result in results:
+        for key, value in result["counts"].items():
+            counts[key] = counts.get(key, 0) + value
+        for step, values in result["latencies"].items():
+            latencies.setdefault(step, []).extend(values)
+
+    steps = {}
+    for step, values in latencies.items():
+        values.sort()
+        steps[step] = {
+            "count": len(values),
+            "per_sec": len(values) / elapsed,
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+            "max_ms": (values[-1] if values else 0.0) * 1000,
+        }
+    return {
+        "options": {key: value for key, value in options.items()},
+        "seconds": elapsed,
+        "sessions_per_sec": counts.get("sessions", 0) / elapsed,
+        "checkouts_per_sec": counts.get("checkouts_ok", 0) / elapsed,
+        "counts": counts,
+        "steps": steps,
+        "busy": busy, # gave_up = statements that hit the busy deadline: the real lock failures
+        "busy_per_worker": [result["busy"] for result in results if "busy" in result], # process mode only
+        "violations": violations,
+    }
+
+
+def print_report(result: dict):
+    options, counts = result["options"], result["counts"]
+    print(f"{options['workers']} {options['mode']} workers for {result['seconds']:.1f}s, "
+          f"{options['hot_skus']} hot products with {options['hot_stock']} in stock each\n")
+    print(f"Sessions  : {counts['sessions']:,} ({result['sessions_per_sec']:,.1f}/s)")
+    print(f"Checkouts : {counts['checkouts_ok']:,} ok ({result['checkouts_per_sec']:,.1f}/s), "
+          f"{counts['checkouts_out_of_stock']:,} out of stock, {counts['checkouts_db_failed']:,} database failures, "
+          f"{counts['abandoned']:,} carts abandoned, "
+          f"{counts['empty_carts']:,} sessions found nothing to buy")
+    print(f"Cart adds : {counts['adds_ok']:,} ok, {counts['adds_refused']:,} refused (no stock left to hold)")
+    busy = result["busy"]
+    # waits / lock_wait include every BEGIN IMMEDIATE that had to queue behind another writer (see DatabaseManager._retry_busy)
+    print(f"Locks     : {busy.get('waits', 0):,} transactions waited {busy.get('lock_wait', 0) * 1000:,.0f} ms in total "
+          f"({busy.get('retries', 0):,} busy retries), {busy.get('gave_up', 0):,} gave up waiting (lock failures)")
+    for worker, worker_busy in enumerate(result["busy_per_worker"]):
+        print(f"  worker {worker:<3}: {worker_busy.get('waits', 0):,} waited {worker_busy.get('lock_wait', 0) * 1000:,.0f} ms, "
+              f"{worker_busy.get('retries', 0):,} retries, {worker_busy.get('gave_up', 0):,} gave up")
+    print(f"Errors    : {counts['errors']:,} unexpected exceptions\n")
+    print(f"{'Step':<12} {'Count':>8} {'Per sec':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for step, s in result["steps"].items():
+        print(f"{step:<12} {s['count']:>8,} {s['per_sec']:>9,.1f} {s['p50_ms']:>8.2f} {s['p95_ms']:>8.2f} {s['p99_ms']:>8.2f} {s['max_ms']:>8.1f}")
+    print()
+    if result["violations"]:
+        print(f"INVARIANT VIOLATIONS ({len(result['violations'])}):")
+        for violation in result["violations"][:20]:
+            print(f"  {violation}")
+    else:
+        print("Stock invariants hold: no negative stock, no oversell, stock change = units ordered.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate many customers checking out at the same time.")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--mode", choices=("thread", "process"), default="thread")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds every worker keeps shopping")
+    parser.add_argument("--db", help="run on a copy of this database (default: generate a small one)")
+    parser.add_argument("--products", type=int, default=2000, help="catalog size when generating")
+    parser.add_argument("--hot-skus", type=int, default=5, help="products most customers want (ids 1..n)")
+    parser.add_argument("--hot-stock", type=int, default=50, help="stock of each hot product at the start")
+    parser.add_argument("--hot-ratio", type=float, default=0.6, help="chance a cart line is a hot product")
+    parser.add_argument("--abandon-ratio", type=float, default=0.2, help="chance a session leaves without checkout")
+    parser.add_argument("--profile", default="durable", help="PRAGMA profile")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="write the full report as JSON")
+    args = parser.parse_args(argv)
+
+    options = {
+        "workers": args.workers, "mode": args.mode, "duration": args.duration, "db": args.db,
+        "products": args.products, "hot_skus": args.hot_skus, "hot_stock": args.hot_stock,
+        "hot_ratio": args.hot_ratio, "abandon_ratio": args.abandon_ratio, "profile": args.profile, "seed": args.seed,
+    }
+    result = run_load(options)
+    print_report(result)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nReport written to {args.out}")
+    return 1 if result["violations"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
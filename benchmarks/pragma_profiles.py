@@ -0,0 +1,114 @@
+'''
+Benchmark of the PRAGMA profiles in core/database.py (durable, throughput, bulk-load).
+
+For every profile a fresh database is created in a temporary folder and the same work is timed:-
+    1. load    : import the product catalog with ProductImporter (batched inserts)
+    2. checkout: add a few products to a cart and check out, many times (small write transactions, one fsync each)
+    3. listing : page through the whole catalog with keyset pagination, and read it in one go with list_products()
+The numbers show the trade-off: less syncing = faster commits, but less safety if the power goes out.
+
+Run it from the project folder:
+    python -m benchmarks.pragma_profiles
+    python -m benchmarks.pragma_profiles --products 20000 --checkouts 500 --profiles durable throughput
+'''
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+from core.database import DatabaseManager, PRAGMA_PROFILES
+from core.importer import ProductImporter
+from core.models.product import Product
+from core.services.cart_service import CartService
+
+
+def quiet():
+    """The services print to the console, hide that while timing."""
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def run_profile(profile: str, folder: str, products: int, checkouts: int, rounds: int, seed: int) -> dict:
+    path = os.path.join(folder, f"{profile}.db")
+    rng = random.Random(seed) # same carts for every profile
+    with quiet():
+        db = DatabaseManager(path, profile=profile, slow_query_ms=None)
+    try:
+        # 1. Load
+        rows = ((n, {"sku": f"SKU{n}", "name": f"Product {n}", "price": 1 + n % 100, "stock": 1_000_000})
+                for n in range(1, products + 1))
+        started = time.perf_counter()
+        with quiet():
+            ProductImporter(db, key="sku", batch_size=1000).import_rows(rows)
+        load = time.perf_counter() - started
+
+        # 2. Checkout
+        cart_service = CartService(db)
+        started = time.perf_counter()
+        with quiet():
+            for n in range(checkouts):
+                user_id = n % 50 + 1
+                for product_id in rng.sample(range(1, products + 1), 3):
+                    cart_service.add_to_cart(user_id, product_id, 1)
+                cart_service.checkout(user_id)
+        checkout = time.perf_counter() - started
+
+        # 3. Listing
+        product_model = Product(db)
+        started = time.perf_counter()
+        for _ in range(rounds):
+            token = None
+            while True:
+                page = product_model.list_products_page(token, limit=100)
+                token = page["next"]
+                if not token:
+                    break
+        paged = time.perf_counter() - started
+        started = time.perf_counter()
+        for _ in range(rounds):
+            product_model.list_products()
+        full = time.perf_counter() - started
+
+        return {
+            "profile": profile,
+            "load_rows_per_sec": products / load,
+            "checkouts_per_sec": checkouts / checkout,
+            "paged_ms": paged / rounds * 1000,
+            "list_all_ms": full / rounds * 1000,
+            "pragmas": db.pragma_values(),
+        }
+    finally:
+        db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the DatabaseManager PRAGMA profiles.")
+    parser.add_argument("--products", type=int, default=5000, help="catalog size")
+    parser.add_argument("--checkouts", type=int, default=200, help="checkouts per profile (3 lines each)")
+    parser.add_argument("--rounds", type=int, default=5, help="times the catalog is listed")
+    parser.add_argument("--profiles", nargs="+", choices=list(PRAGMA_PROFILES), default=list(PRAGMA_PROFILES))
+    parser.add_argument("--dir", help="folder for the test databases (default: a temporary folder)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as folder:
+        results = [run_profile(p, folder, args.products, args.checkouts, args.rounds, args.seed) for p in args.profiles]
+
+    print(f"{args.products:,} products, {args.checkouts:,} checkouts, catalog listed {args.rounds} times\n")
+    print(f"{'Profile':<12} {'Load rows/s':>12} {'Checkouts/s':>12} {'Paged ms':>10} {'List all ms':>12}")
+    print("-" * 62)
+    for r in results:
+        print(f"{r['profile']:<12} {r['load_rows_per_sec']:>12,.0f} {r['checkouts_per_sec']:>12,.1f} "
+              f"{r['paged_ms']:>10.1f} {r['list_all_ms']:>12.1f}")
+    print()
+    for r in results:
+        print(f"{r['profile']:<12} {r['pragmas']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
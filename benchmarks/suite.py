@@ -0,0 +1,252 @@
+'''
+Benchmark suite over a generated database (see benchmarks/generate_data.py).
+
+    python -m benchmarks.generate_data --scale 100k --out data/bench_100k.db
+    python -m benchmarks.suite data/bench_100k.db --out results/before.json
+    ... change some code ...
+    python -m benchmarks.suite data/bench_100k.db --out results/after.json --compare results/before.json
+
+What it does:-
+    1. Copies the database to a temporary file first (checkout and status updates change data, the
+       original stays the same so every run starts from identical data)
+    2. Runs every benchmark a few warmup times, then `iterations` timed times
+    3. Writes a JSON file with the environment (git commit, Python, SQLite, row counts) and per benchmark
+       min / median / p95 / mean / max milliseconds and operations per second
+    4. With --compare it prints the median change against an earlier results file and exits with code 1
+       when something got slower than --threshold percent
+'''
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from core.database import DatabaseManager
+from core.models.order import Order
+from core.models.product import Product
+from core.services.admin_service import AdminService
+from core.services.cart_service import CartService
+
+BENCHMARKS = [] # (name, function, iterations), filled by the @benchmark decorator
+
+
+def benchmark(name: str, iterations: int = 50):
+    """
+    Register a benchmark. The function gets the Context and returns a callable that does ONE timed
+    operation (setup that shouldn't be timed goes into the function body or the callable's return value).
+    """
+    def register(function):
+        BENCHMARKS.append((name, function, iterations))
+        return function
+    return register
+
+
+class Context:
+    """Shared state for the benchmarks: the database, models and random generator."""
+
+    def __init__(self, db, seed: int):
+        self.db = db
+        self.rng = random.Random(seed)
+        self.product_model = Product(db)
+        self.order_model = Order(db)
+        self.cart_service = CartService(db)
+        self.admin_service = AdminService(db) # no auth_service: permission checks are skipped
+        counts = db.fetch_one("""
+            SELECT (SELECT MAX(id) FROM products) AS products, (SELECT MAX(id) FROM users) AS users,
+                   (SELECT MAX(id) FROM orders) AS orders
+        """)
+        self.products = counts["products"] or 0
+        self.users = counts["users"] or 0
+        self.orders = counts["orders"] or 0
+        self.next_user = self.users + 1_000_000 # checkout benchmark carts belong to ids no real user has
+
+
+# ----- Benchmarks -----
+@benchmark("product.search_products", iterations=200)
+def bench_search(ctx):
+    words = ["wireless", "mouse", "ergonomic keyboard", "steel bottle", "lamp", "pro cam", "bamboo desk", "usb"]
+    return lambda: ctx.product_model.search_products(ctx.rng.choice(words), 50)
+
+
+@benchmark("product.list_products", iterations=10)
+def bench_list_products(ctx):
+    return lambda: ctx.product_model.list_products()
+
+
+@benchmark("product.list_products_page", iterations=200)
+def bench_list_page(ctx):
+    def run():
+        page = ctx.product_model.list_products_page(None, 20)
+        for _ in range(ctx.rng.randint(0, 20)): # some customers click "next" a few times
+            if not page["next"]:
+                break
+            page = ctx.product_model.list_products_page(page["next"], 20)
+    return run
+
+
+@benchmark("cart.checkout", iterations=100)
+def bench_checkout(ctx):
+    def run():
+        user_id = ctx.next_user
+        ctx.next_user += 1
+        for _ in range(3):
+            ctx.cart_service.add_to_cart(user_id, ctx.rng.randint(1, ctx.products), 1)
+        ctx.cart_service.checkout(user_id) # a cart whose products were all out of stock simply fails fast
+    return run
+
+
+@benchmark("order.get_user_orders", iterations=200)
+def bench_user_orders(ctx):
+    return lambda: ctx.order_model.get_user_orders(ctx.rng.randint(2, max(ctx.users, 2)))
+
+
+@benchmark("order.get_all_orders", iterations=5)
+def bench_all_orders(ctx):
+    return lambda: ctx.order_model.get_all_orders()
+
+
+@benchmark("admin.update_order_status", iterations=200)
+def bench_update_status(ctx):
+    return lambda: ctx.admin_service.update_order_status(ctx.rng.randint(1, max(ctx.orders, 1)),
+                                                         ctx.rng.choice(["processing", "shipped", "delivered"]))
+
+
+@benchmark("report.revenue_by_day_90", iterations=200)
+def bench_revenue_by_day(ctx):
+    return lambda: ctx.admin_service.revenue_by_day(90)
+
+
+@benchmark("report.top_products_month", iterations=200)
+def bench_top_products(ctx):
+    return lambda: ctx.admin_service.top_products(None, 20)
+
+
+@benchmark("report.overview", iterations=200)
+def bench_overview(ctx):
+    return lambda: ctx.admin_service.sales_overview()
+
+
+# ----- Running -----
+def summarize(times: list) -> dict:
+    times = sorted(times)
+    n = len(times)
+    mean = sum(times) / n
+    return {
+        "iterations": n,
+        "min_ms": times[0] * 1000,
+        "median_ms": times[n // 2] * 1000,
+        "p95_ms": times[min(n - 1, int(n * 0.95))] * 1000,
+        "mean_ms": mean * 1000,
+        "max_ms": times[-1] * 1000,
+        "ops_per_sec": 1 / mean if mean else 0.0,
+    }
+
+
+def run_suite(db_path: str, only=None, scale: float = 1.0, warmup: int = 2, seed: int = 1, profile: str = "durable") -> dict:
+    with tempfile.TemporaryDirectory() as folder:
+        copy = os.path.join(folder, "bench.db")
+        source = sqlite3.connect(db_path) # the backup API copies a consistent snapshot, WAL included
+        target = sqlite3.connect(copy)
+        source.backup(target)
+        source.close()
+        target.close()
+
+        with contextlib.redirect_stdout(io.StringIO()): # the models print a line for almost everything
+            db = DatabaseManager(copy, profile=profile, slow_query_ms=None)
+        try:
+            ctx = Context(db, seed)
+            results = {}
+            for name, setup, iterations in BENCHMARKS:
+                if only and not any(part in name for part in only):
+                    continue
+                operation = setup(ctx)
+                times = []
+                with contextlib.redirect_stdout(io.StringIO()):
+                    for i in range(warmup + max(1, int(iterations * scale))):
+                        started = time.perf_counter()
+                        operation()
+                        if i >= warmup:
+                            times.append(time.perf_counter() - started)
+                results[name] = summarize(times)
+                print(f"  {name:<28} median {results[name]['median_ms']:>9.3f} ms   p95 {results[name]['p95_ms']:>9.3f} ms")
+            meta = {"products": ctx.products, "users": ctx.users, "orders": ctx.orders}
+        finally:
+            db.close()
+    return {"environment": environment(db_path, profile, meta), "results": results}
+
+
+def environment(db_path: str, profile: str, counts: dict) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": commit or None,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "database": os.path.basename(db_path),
+        "profile": profile,
+        "rows": counts,
+    }
+
+
+def compare(current: dict, previous: dict, threshold: float) -> bool:
+    """Print median changes. Returns True if any benchmark got slower than threshold percent."""
+    regressed = False
+    print(f"\n{'Benchmark':<28} {'Before ms':>10} {'After ms':>10} {'Change':>8}")
+    for name, result in current["results"].items():
+        old = previous.get("results", {}).get(name)
+        if not old:
+            print(f"{name:<28} {'-':>10} {result['median_ms']:>10.3f}      new")
+            continue
+        change = (result["median_ms"] / old["median_ms"] - 1) * 100 if old["median_ms"] else 0.0
+        flag = "  REGRESSION" if change > threshold else ""
+        regressed = regressed or bool(flag)
+        print(f"{name:<28} {old['median_ms']:>10.3f} {result['median_ms']:>10.3f} {change:>+7.1f}%{flag}")
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the benchmark suite against a generated database.")
+    parser.add_argument("database", help="database made by benchmarks.generate_data")
+    parser.add_argument("--out", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent slower that counts as a regression")
+    parser.add_argument("--only", nargs="+", help="run only benchmarks whose name contains one of these")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every benchmark's iteration count")
+    parser.add_argument("--profile", default="durable", help="PRAGMA profile of the DatabaseManager")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.database):
+        print(f"Database not found: {args.database} (create one with python -m benchmarks.generate_data)")
+        return 2
+
+    print(f"Benchmarking {args.database} ...")
+    report = run_suite(args.database, args.only, args.scale, seed=args.seed, profile=args.profile)
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.out}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+        if compare(report, previous, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,291 @@
+'''
+Scripted (non-interactive) runs of the shop, for replaying sessions and regression checks.
+
+A batch is a list of commands, the same things a person does through the menus in main.py:-
+    1. JSON Lines: one object per line, {"cmd": "add_to_cart", "product_id": 3, "qty": 2}
+    2. Plain script: one command per line with positional arguments, add_to_cart 3 2
+       (quote arguments with spaces: add_product "USB Hub" 19.99 40; lines starting with # are comments)
+Every command runs straight against the services (no menus, no screen clearing, no "Press Enter"),
+and one JSON result line is written per command:
+    {"line": 4, "cmd": "checkout", "ok": true, "result": ..., "output": "what it printed", "ms": 3.2}
+
+Commands act as the user of the last login. Give a command "session": "<name>" to act as another
+logged-in user instead (login with "session": "<name>" stores the session under that name).
+
+Run it through main.py:
+    python main.py --batch script.jsonl --out results.jsonl
+    python main.py --batch script.txt --db /tmp/replay.db --stop-on-error
+'''
+
+import contextlib
+import inspect
+import io
+import json
+import shlex
+import time
+
+from core.models.order import Order
+from core.models.product import Product
+from core.server import plain_data
+from core.services.admin_service import AdminService
+from core.services.auth_service import AuthService
+from core.services.cart_service import CartService
+
+COMMANDS = {} # name -> (function, needs) filled by the @command decorator
+
+
+def command(name: str, needs: str = None):
+    """Register a BatchRunner method as a command; needs is None, "user" or "admin"."""
+    def register(function):
+        COMMANDS[name] = (function, needs)
+        return function
+    return register
+
+
+class BatchError(Exception):
+    """A command that can't run (unknown name, bad arguments, not logged in)."""
+
+
+def parse_line(text: str):
+    """One line of a batch file -> {"cmd": ..., arguments...}, or None for blank lines and comments."""
+    text = text.strip()
+    if not text or text.startswith("#"):
+        return None
+    if text.startswith("{"):
+        record = json.loads(text)
+        if not isinstance(record, dict) or "cmd" not in record:
+            raise BatchError('a JSON line needs a "cmd" field')
+        return record
+    words = shlex.split(text)
+    return {"cmd": words[0], "args": words[1:]}
+
+
+class BatchRunner:
+    """Runs batch commands against the services and produces one result dict per command."""
+
+    def __init__(self, db, cart_service: CartService = None, auth_service: AuthService = None):
+        self.db = db
+        self.product_model = Product(db)
+        self.order_model = Order(db)
+        self.cart_service = cart_service or CartService(db)
+        self.auth_service = auth_service or AuthService(db)
+        self.tokens = {} # session name -> token
+        self.current = None # session name used when a command doesn't say
+
+    # ----- Running -----
+    def run_lines(self, lines, stop_on_error: bool = False):
+        """Yield a result dict for every command in an iterable of text lines."""
+        for number, text in enumerate(lines, start=1):
+            try:
+                record = parse_line(text)
+            except (ValueError, BatchError) as e:
+                result = {"line": number, "cmd": None, "ok": False, "error": f"unreadable line: {e}", "ms": 0.0}
+            else:
+                if record is None:
+                    continue
+                result = self.run(record)
+                result["line"] = number
+            yield result
+            if stop_on_error and not result["ok"]:
+                return
+
+    def run(self, record: dict) -> dict:
+        """Run one command record. Never raises, failures come back with ok=False."""
+        name = record.get("cmd")
+        output = io.StringIO()
+        started = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(output): # the models print, keep that in the result instead of on the console
+                ok, value = self._call(name, record)
+            result = {"cmd": name, "ok": bool(ok), "result": plain_data(value)}
+        except BatchError as e:
+            result = {"cmd": name, "ok": False, "error": str(e)}
+        except Exception as e:
+            result = {"cmd": name, "ok": False, "error": f"{type(e).__name__}: {e}"}
+        result["output"] = output.getvalue().strip()
+        result["ms"] = round((time.perf_counter() - started) * 1000, 3)
+        return result
+
+    def _call(self, name, record):
+        if name not in COMMANDS:
+            raise BatchError(f"unknown command {name!r}")
+        function, needs = COMMANDS[name]
+        session = record.get("session", self.current)
+        user = self.auth_service.get_user(self.tokens.get(session)) if session in self.tokens else None
+        if needs and not user:
+            raise BatchError("login first")
+        if needs == "admin" and user["role"] != "admin":
+            raise BatchError("admins only")
+
+        kwargs = self._arguments(function, record)
+        if function.__name__ == "login":
+            kwargs["session"] = session if "session" in record else None
+        elif needs:
+            kwargs["_user"] = user
+            kwargs["_token"] = self.tokens[session]
+        value = function(self, **kwargs)
+        return (value[0], value[1]) if isinstance(value, tuple) else (value is not False and value is not None, value)
+
+    @staticmethod
+    def _arguments(function, record):
+        """Match positional "args" (plain scripts) or named fields (JSON) to the command's parameters, converting types."""
+        parameters = [p for p in inspect.signature(function).parameters.values()
+                      if p.name not in ("self", "session") and not p.name.startswith("_")]
+        positional = record.get("args", [])
+        if len(positional) > len(parameters):
+            raise BatchError("too many arguments")
+        values = dict(zip((p.name for p in parameters), positional))
+        values.update({key: value for key, value in record.items() if key not in ("cmd", "args", "session")})
+
+        kwargs = {}
+        for parameter in parameters:
+            if parameter.name in values:
+                value = values.pop(parameter.name)
+                kind = parameter.annotation
+                if kind in (int, float, str) and value is not None:
+                    try:
+                        value = kind(value)
+                    except (TypeError, ValueError):
+                        raise BatchError(f"{parameter.name} must be {kind.__name__}")
+                kwargs[parameter.name] = value
+            elif parameter.default is inspect.Parameter.empty:
+                raise BatchError(f"missing argument {parameter.name}")
+        if values:
+            raise BatchError(f"unknown argument(s): {', '.join(values)}")
+        return kwargs
+
+    def _admin(self, token) -> AdminService:
+        return AdminService(self.db, self.auth_service.for_token(token))
+
+    # ----- Accounts -----
+    @command("register")
+    def register(self, username: str, password: str, role: str = "customer"):
+        return self.auth_service.register_user(username, password, role if role in ("customer", "admin") else "customer")
+
+    @command("login")
+    def login(self, username: str, password: str, session=None):
+        token = self.auth_service.login(username, password)
+        if not token:
+            return False, None
+        name = session or username
+        self.tokens[name] = token
+        self.current = name
+        user = self.auth_service.get_user(token)
+        return True, {"user_id": user["id"], "role": user["role"], "session": name}
+
+    @command("logout", needs="user")
+    def logout(self, _user=None, _token=None):
+        self.auth_service.logout(_token)
+        for name, token in list(self.tokens.items()):
+            if token == _token:
+                del self.tokens[name]
+                if self.current == name:
+                    self.current = None
+        return True
+
+    # ----- Browsing -----
+    @command("list_products")
+    def list_products(self, cursor: str = None, limit: int = 20):
+        return True, self.product_model.list_products_page(cursor, limit)
+
+    @command("search")
+    def search(self, keyword: str, limit: int = None):
+        return True, self.product_model.search_products(keyword, limit) or []
+
+    @command("get_product")
+    def get_product(self, product_id: int):
+        return self.product_model.get_by_id(product_id)
+
+    # ----- Cart -----
+    @command("add_to_cart", needs="user")
+    def add_to_cart(self, product_id: int, qty: int = 1, _user=None, _token=None):
+        return self.cart_service.add_to_cart(_user["id"], product_id, qty)
+
+    @command("remove_from_cart", needs="user")
+    def remove_from_cart(self, product_id: int, _user=None, _token=None):
+        return self.cart_service.remove_from_cart(_user["id"], product_id)
+
+    @command("view_cart", needs="user")
+    def view_cart(self, _user=None, _token=None):
+        return True, self.cart_service.quote(_user["id"])
+
+    @command("checkout", needs="user")
+    def checkout(self, _user=None, _token=None):
+        return self.cart_service.checkout(_user["id"])
+
+    @command("my_orders", needs="user")
+    def my_orders(self, cursor: str = None, limit: int = 20, _user=None, _token=None):
+        return True, self.order_model.get_user_orders_page(_user["id"], cursor, limit)
+
+    # ----- Admin -----
+    @command("add_product", needs="admin")
+    def add_product(self, name: str, price: float, stock: int = 0, description: str = "", _user=None, _token=None):
+        return self._admin(_token).add_product(name, price, stock, description)
+
+    @command("update_product", needs="admin")
+    def update_product(self, product_id: int, name: str = None, price: float = None, stock: int = None,
+                       description: str = None, _user=None, _token=None):
+        return self._admin(_token).update_product(product_id, name, price, stock, description)
+
+    @command("delete_product", needs="admin")
+    def delete_product(self, product_id: int, _user=None, _token=None):
+        return self._admin(_token).delete_product(product_id)
+
+    @command("increase_stock", needs="admin")
+    def increase_stock(self, product_id: int, qty: int, _user=None, _token=None):
+        return self._admin(_token).increase_stock(product_id, qty)
+
+    @command("reduce_stock", needs="admin")
+    def reduce_stock(self, product_id: int, qty: int, _user=None, _token=None):
+        return self._admin(_token).reduce_stock(product_id, qty)
+
+    @command("list_orders", needs="admin")
+    def list_orders(self, cursor: str = None, limit: int = 20, _user=None, _token=None):
+        return True, self._admin(_token).list_orders_page(cursor, limit)
+
+    @command("update_order_status", needs="admin")
+    def update_order_status(self, order_id: int, status: str, _user=None, _token=None):
+        return self._admin(_token).update_order_status(order_id, status)
+
+    @command("cancel_order", needs="admin")
+    def cancel_order(self, order_id: int, _user=None, _token=None):
+        return self._admin(_token).cancel_order(order_id)
+
+    @command("list_users", needs="admin")
+    def list_users(self, _user=None, _token=None):
+        return True, self.db.fetch_all("SELECT id, username, role, created_at FROM users ORDER BY id") or []
+
+    @command("promote_user", needs="admin")
+    def promote_user(self, user_id: int, _user=None, _token=None):
+        return self._admin(_token).promote_user_to_admin(user_id)
+
+    @command("demote_user", needs="admin")
+    def demote_user(self, user_id: int, _user=None, _token=None):
+        return self._admin(_token).demote_admin_to_customer(user_id)
+
+    @command("sales_report", needs="admin")
+    def sales_report(self, days: int = 90, month: str = None, limit: int = 20, _user=None, _token=None):
+        admin = self._admin(_token)
+        return True, {"overview": admin.sales_overview(), "by_day": admin.revenue_by_day(days),
+                      "top_products": admin.top_products(month, limit), "by_status": admin.orders_by_status()}
+
+    @command("top_customers", needs="admin")
+    def top_customers(self, limit: int = 10, _user=None, _token=None):
+        return True, self._admin(_token).top_customers(limit)
+
+    @command("stats", needs="admin")
+    def stats(self, _user=None, _token=None):
+        return True, {"top_queries": self.db.top_queries(10), "locks": self.db.busy_stats(), "pool": self.db.pool_stats()}
+
+
+def run_batch(db, lines, out, stop_on_error: bool = False) -> dict:
+    """Run batch lines, writing one JSON result per line to the file object out. Returns a summary."""
+    runner = BatchRunner(db)
+    summary = {"commands": 0, "failed": 0, "ms": 0.0}
+    for result in runner.run_lines(lines, stop_on_error):
+        out.write(json.dumps(result, separators=(",", ":"), default=str) + "\n")
+        summary["commands"] += 1
+        summary["failed"] += not result["ok"]
+        summary["ms"] += result["ms"]
+    summary["ms"] = round(summary["ms"], 3)
+    return summary
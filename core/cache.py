@@ -0,0 +1,73 @@
+'''
+A small, thread-safe LRU (least recently used) cache.
+
+It remembers up to `maxsize` values. When it is full and a new value comes in,
+the value that was used longest ago is thrown away (evicted).
+Hit / miss / eviction counters show whether the size is right:-
+    - many misses and evictions -> the cache is too small
+    - almost no evictions and a low hit count -> the cache is bigger than it needs to be
+'''
+
+import threading
+from collections import OrderedDict # a dict that remembers insertion order and can move keys to the end
+
+
+class LRUCache:
+    """Bounded key -> value cache with least-recently-used eviction."""
+
+    def __init__(self, maxsize: int = 1024):
+        if maxsize < 1:
+            raise ValueError("Cache size must be at least 1.")
+        self.maxsize = maxsize
+        self._data = OrderedDict() # oldest entry first, most recently used last
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """Return the cached value (and mark it as recently used), or default."""
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Store a value, evicting the least recently used one if the cache is full."""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False) # last=False pops the oldest entry
+                self.evictions += 1
+
+    def pop(self, key):
+        """Remove one entry (used to invalidate it). Missing keys are ignored."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Drop every entry (counters are kept)."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        """Return size and hit/miss/eviction counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -8,7 +8,58 @@ Database works:->
 
 import sqlite3 # The python sqlite3 library file
 import os # helps to work with folder and file path
+import random
+import threading
+import time
 from datetime import datetime # helps to record current date time for 
+from contextlib import contextmanager
+
+from core.pool import ConnectionPool
+from core.migrations import migrate
+from core.instrumentation import QueryStats
+
+# ------------ PRAGMA Profiles ------------
+'''
+Settings every new connection gets (see _connect), picked by name with DatabaseManager(profile=...):-
+    1. durable    : WAL journal (readers never wait for a writer), every COMMIT is fsynced. Safe default.
+    2. throughput : WAL with synchronous=NORMAL (the WAL is only fsynced at checkpoints, a power cut can lose
+                    the last few commits but never corrupts the file), bigger page cache and memory-mapped reads
+    3. bulk-load  : for imports into a database you can rebuild: no fsync at all, a large cache, temp tables in memory
+journal_mode=WAL is stored in the database file itself, it stays on for every program that opens it later.
+cache_size is negative = size in KiB, mmap_size is in bytes, busy_timeout in milliseconds.
+busy_timeout is short on purpose: SQLite only waits that long on its own, the longer waiting for another
+writer is done (and counted) by DatabaseManager._retry_busy() with backoff, up to busy_deadline seconds.
+'''
+PRAGMA_PROFILES = {
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -8_000, # 8 MB
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+        "busy_timeout": 20,
+    },
+    "throughput": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64_000, # 64 MB
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 20,
+    },
+    "bulk-load": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -256_000, # 256 MB
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 20,
+    },
+}
+DEFAULT_PROFILE = "durable"
+
+SQLITE_BUSY = 5 # another connection (maybe another process) holds the lock we need
+SQLITE_LOCKED = 6
 
 class DatabaseManager: # this class acts as a manager which will manage our database after it's created .
     """
@@ -17,65 +68,221 @@ class DatabaseManager: # this class acts as a manager which will manage our data
     and safe admin bootstrapping.
     """
 
-    def __init__(self, db_path: str = "data/ecommerce.db"): # This constructor will run autometically when a new db is created . if no db is assigned it will create a db in "data/ecomerce.db" by default as database
+    def __init__(self, db_path: str = "data/ecommerce.db", pool_size: int = 1, pool_timeout: float = 30.0,
+                 slow_query_ms: float = 100.0, slow_query_log: str = None,
+                 profile: str = DEFAULT_PROFILE, pragmas: dict = None, busy_deadline: float = 30.0): # This constructor will run autometically when a new db is created . if no db is assigned it will create a db in "data/ecomerce.db" by default as database
+        """
+        db_path        : location of the SQLite file
+        pool_size      : how many connections may be open at once. 1 keeps the old single-connection
+                         behaviour, anything bigger lets that many threads run queries concurrently
+        pool_timeout   : seconds a thread waits for a free connection before giving up
+        slow_query_ms  : statements at least this slow go to the slow-query log (None = no slow log)
+        slow_query_log : slow-query log file, defaults to slow_queries.log next to the database
+        profile        : name of a PRAGMA_PROFILES entry applied to every connection
+        pragmas        : extra {pragma: value} settings that override the profile's values
+        busy_deadline  : seconds a write keeps retrying while another writer holds the database lock
+        """
         # Ensure the data directory exists
-        os.makedirs(os.path.dirname(db_path), exist_ok=True) # checking if the data folder exists if not then creates the data folder
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True) # checking if the data folder exists if not then creates the data folder
 
         self.db_path = db_path # it remembers the database file location so it can use the path later
-        self.conn = sqlite3.connect(self.db_path) # connecting with the database file like opening the database 
-        self.conn.row_factory = sqlite3.Row  # access results by column name. This tells SQLite to give query results as dictionary-like objects.
-        self.cursor = self.conn.cursor() # a cursor is like a pen that writes database commands and executes commands 
+        if profile not in PRAGMA_PROFILES:
+            raise ValueError(f"Unknown PRAGMA profile {profile!r}, choose one of {', '.join(PRAGMA_PROFILES)}")
+        self.profile = profile
+        self.pragmas = {**PRAGMA_PROFILES[profile], **(pragmas or {})}
+        self.pool = ConnectionPool(self._connect, size=pool_size, timeout=pool_timeout) # connections are opened on demand and handed out one per thread
+        self._tx = threading.local() # per-thread transaction nesting depth, see transaction()
+        if slow_query_log is None:
+            slow_query_log = os.path.join(os.path.dirname(db_path) or ".", "slow_queries.log")
+        self.query_stats = QueryStats(slow_query_ms, slow_query_log) # timing of every statement, see core/instrumentation.py
+        self.busy_deadline = busy_deadline
+        self._busy = {"busy_errors": 0, "retries": 0, "gave_up": 0, "waits": 0, "lock_wait": 0.0} # see _retry_busy()
+        self._busy_lock = threading.Lock()
 
         # Initialize tables and default admin . the _ before the method name as prefix means this method is only used in backend
         self._create_tables() # creates all table
         self._create_default_admin() # creates a default superuser admin
 
+    # ------------ Connections ------------
+    def _connect(self) -> sqlite3.Connection:
+        """Open one new connection (called by the pool)."""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False) # the pool makes sure only one thread uses it at a time, so it may move between threads
+        conn.isolation_level = None # autocommit mode: we issue BEGIN / SAVEPOINT / COMMIT ourselves in transaction()
+        conn.row_factory = sqlite3.Row  # access results by column name. This tells SQLite to give query results as dictionary-like objects.
+        for name, value in self.pragmas.items(): # values come from our own profiles, never from user input
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def pragma_values(self) -> dict:
+        """The settings SQLite actually uses right now, e.g. {'journal_mode': 'wal', 'synchronous': 1, ...}."""
+        with self.connection() as conn:
+            return {name: conn.execute(f"PRAGMA {name}").fetchone()[0] for name in self.pragmas}
+
+    @contextmanager
+    def connection(self):
+        """
+        Check out this thread's connection for a block of work: with db.connection() as conn: ...
+        Nested use on the same thread gets the same connection back.
+        """
+        with self.pool.connection() as conn:
+            yield conn
+
+    def pool_stats(self) -> dict:
+        """Pool size, connections in use and checkout wait-time metrics."""
+        return self.pool.stats()
+
+    # ------------ Transactions ------------
+    '''
+    Without a transaction every write is saved on its own (one commit = one disk sync per statement).
+    Wrapping work in ( with db.transaction(): ) groups all of it into a single COMMIT:-
+        1. The outermost block runs BEGIN ... COMMIT (or ROLLBACK if an exception escapes)
+        2. A nested block becomes a SAVEPOINT, so it can fail and roll back alone without
+           throwing away the work of the outer block
+        3. execute(..., commit=True) inside a block does not commit, it joins the block
+        4. The outermost block starts with BEGIN IMMEDIATE: it takes the write lock right away, so two
+           writers queue up at BEGIN (where waiting and retrying is safe) instead of failing halfway through.
+           Pass immediate=False for blocks that only read.
+    '''
+    @contextmanager
+    def transaction(self, immediate: bool = True):
+        """Run the enclosed statements as one transaction (nested blocks use SAVEPOINTs)."""
+        with self.connection() as conn:
+            depth = getattr(self._tx, "depth", 0)
+            savepoint = f"sp_{depth}"
+            if depth == 0:
+                self._tx.callbacks = []
+                begin = "BEGIN IMMEDIATE" if immediate else "BEGIN"
+                started = time.perf_counter()
+                self._retry_busy(lambda: conn.execute(begin), lock_step=True)
+                self.query_stats.record(begin, (), time.perf_counter() - started) # time spent waiting for the write lock
+            else:
+                conn.execute(f"SAVEPOINT {savepoint}")
+            self._tx.depth = depth + 1
+
+            try:
+                yield conn
+            except BaseException:
+                self._tx.depth = depth
+                # Some errors (SQLITE_FULL, SQLITE_IOERR, SQLITE_NOMEM ...) make SQLite roll the whole transaction
+                # back by itself; a ROLLBACK then would fail and hide the original error
+                if depth == 0:
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    self._run_transaction_callbacks()
+                elif conn.in_transaction:
+                    conn.execute(f"ROLLBACK TO {savepoint}") # undo only this block's work
+                    conn.execute(f"RELEASE {savepoint}")
+                raise
+
+            self._tx.depth = depth
+            if depth == 0:
+                try:
+                    started = time.perf_counter()
+                    self._retry_busy(lambda: conn.execute("COMMIT")) # a busy COMMIT leaves the transaction open, trying again is safe
+                    self.query_stats.record("COMMIT", (), time.perf_counter() - started) # commits are where the disk syncs happen
+                except sqlite3.Error:
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    raise
+                finally:
+                    self._run_transaction_callbacks()
+            else:
+                conn.execute(f"RELEASE {savepoint}") # merge this block's work into the outer transaction
+
+    def in_transaction(self) -> bool:
+        """True if the current thread is inside a transaction() block."""
+        return getattr(self._tx, "depth", 0) > 0
+
+    def call_after_transaction(self, callback):
+        """
+        Run callback() once the current transaction has finished (committed or rolled back),
+        or right away when there is no transaction. Used to drop cached rows that a transaction touched.
+        """
+        if self.in_transaction():
+            self._tx.callbacks.append(callback)
+        else:
+            callback()
+
+    def _run_transaction_callbacks(self):
+        callbacks, self._tx.callbacks = self._tx.callbacks, []
+        for callback in callbacks:
+            callback()
+
+    # ------------ Lock Contention ------------
+    '''
+    Several programs (or threads) can use the same database file, but only one can write at a time.
+    When the file is locked SQLite first waits busy_timeout ms by itself, then gives up with SQLITE_BUSY
+    ("database is locked"). _retry_busy() runs a step again in that case:-
+        1. Only steps that are safe to repeat go through it: BEGIN, COMMIT and single statements outside a transaction
+        2. The wait between attempts doubles each time (5 ms, 10 ms, 20 ms ... at most 1 s) with random jitter,
+           so writers that collided don't all wake up and collide again
+        3. After busy_deadline seconds it stops and raises the error
+    busy_stats() shows how often that happened and how long writers waited. BEGIN only waits for the lock, so a
+    BEGIN that took longer than LOCK_WAIT_MIN counts as a wait even when SQLite's own busy_timeout absorbed it.
+    '''
+    LOCK_WAIT_MIN = 0.001 # seconds; an uncontended BEGIN IMMEDIATE takes microseconds
+
+    @staticmethod
+    def _is_busy(error: sqlite3.OperationalError) -> bool:
+        code = getattr(error, "sqlite_errorcode", None) # Python 3.11+
+        if code is not None:
+            return code & 0xFF in (SQLITE_BUSY, SQLITE_LOCKED) # the low byte is the primary code (SQLITE_BUSY_SNAPSHOT -> SQLITE_BUSY)
+        message = str(error)
+        return "locked" in message or "busy" in message
+
+    def _retry_busy(self, step, lock_step: bool = False):
+        """
+        Run step(), retrying with jittered exponential backoff while the database is locked.
+        lock_step=True marks a step whose whole duration is lock waiting (BEGIN IMMEDIATE).
+        """
+        started = time.perf_counter()
+        delay = 0.005
+        retries = 0
+        try:
+            while True:
+                try:
+                    return step()
+                except sqlite3.OperationalError as e:
+                    if not self._is_busy(e):
+                        raise
+                    remaining = self.busy_deadline - (time.perf_counter() - started)
+                    with self._busy_lock:
+                        self._busy["busy_errors"] += 1
+                        if remaining <= 0:
+                            self._busy["gave_up"] += 1
+                    if remaining <= 0:
+                        raise
+                    time.sleep(min(delay * random.uniform(0.5, 1.5), remaining))
+                    delay = min(delay * 2, 1.0)
+                    retries += 1
+        finally:
+            waited = time.perf_counter() - started
+            if retries or (lock_step and waited >= self.LOCK_WAIT_MIN):
+                with self._busy_lock:
+                    self._busy["retries"] += retries
+                    self._busy["waits"] += 1
+                    self._busy["lock_wait"] += waited
+
+    def busy_stats(self) -> dict:
+        """
+        Lock contention so far: busy_errors (SQLITE_BUSY seen), retries, gave_up (deadline hit),
+        waits (steps that had to wait for the lock) and lock_wait (seconds spent waiting).
+        """
+        with self._busy_lock:
+            return dict(self._busy)
+
     # ------------ Table Creation ------------
     def _create_tables(self): # This is a secret helper function (that’s what the _ means)
-        """Create all required tables if they do not already exist."""
-
-        # Users
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                password TEXT NOT NULL,
-                role TEXT DEFAULT 'customer',
-                created_at TEXT
-            )
-        """)
-
-        # Products
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS products (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                price REAL NOT NULL,
-                stock INTEGER DEFAULT 0,
-                description TEXT
-            )
-        """)
-
-        # Orders
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS orders (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                items_json TEXT,
-                status TEXT,
-                created_at TEXT,
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            )
-        """) # items_json means a list of items in JSON format
-        # The Foreign key part tells SQLite that user_id must match a real id from the users table-- it links two tables together 
-
-        self.conn.commit() # Saving the changes permanently
+        """Create or upgrade all required tables (see core/migrations.py). Only runs work when the schema version changed."""
+        migrate(self)
+        self.has_fts5 = self.fetch_one(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'"
+        ) is not None # False when this SQLite build has no FTS5, search then falls back to LIKE
 
     # ------------ Default Admin Creation ------------
     def _create_default_admin(self): # Secret helper function for creating a super user
         """Bootstrap a default admin account if none exists."""
-        self.cursor.execute("SELECT COUNT(*) FROM users WHERE role = 'admin'")# This looks inside the users table and counts how many admins exists.
-        admin_count = self.cursor.fetchone()[0] # fetches one row and gets the index number i guess
+        admin_count = self.fetch_one("SELECT COUNT(*) FROM users WHERE role = 'admin'")[0] # This looks inside the users table and counts how many admins exists.
 
         if admin_count == 0:
             print("Creating default admin account...")
@@ -85,11 +292,10 @@ class DatabaseManager: # this class acts as a manager which will manage our data
             created_at = datetime.now().isoformat(timespec="seconds") # this says when the built in admin was activated 
 
             # This adds the default admin information in the database ---
-            self.cursor.execute("""
+            self.execute("""
                 INSERT INTO users (username, password, role, created_at)
                 VALUES (?, ?, 'admin', ?)
-            """, (username, password, created_at))
-            self.conn.commit()
+            """, (username, password, created_at), commit=True)
             # ----------------------------------------------------------
             print("Default admin created! (username: admin, password: admin123)")
 
@@ -100,20 +306,57 @@ class DatabaseManager: # this class acts as a manager which will manage our data
         1. query   : My SQL text
         2. params  : Any values i want to insert safely
         3. And flags like (fetchone), (fetchall), (commit) to control what the database does next
+    Without fetchone/fetchall it returns how many rows the statement changed (cursor.rowcount),
+    or with lastrowid=True the id of the row an INSERT just created.
+    Inside ( with db.transaction(): ) the commit flag is ignored, the block commits everything at the end,
+    and errors are raised (after printing) so the block can roll back instead of half-applying.
     '''
-    def execute(self, query: str, params: tuple = (), fetchone=False, fetchall=False, commit=False):
+    def execute(self, query: str, params: tuple = (), fetchone=False, fetchall=False, commit=False, lastrowid=False):
         """Execute an SQL query safely with parameters."""
         try: # This tries to run my SQL commands safely
-            self.cursor.execute(query, params)
-            if commit: # if i say commit in any file or place it saves the commit in the database 
-                self.conn.commit()
-            if fetchone: # if i ask one row anywhere in project it gives one desired row
-                return self.cursor.fetchone()
-            if fetchall: # if i ask all the rows of a table anywhere in the project it gives all the available rows 
-                return self.cursor.fetchall()
+            with self.connection() as conn:
+                started = time.perf_counter() # timing includes fetching, that's part of the query's cost
+                cursor = conn.cursor() # a fresh cursor per call, so two queries never share (and overwrite) one result set
+                if self.in_transaction():
+                    cursor.execute(query, params) # the block's BEGIN IMMEDIATE already holds the lock
+                else:
+                    self._retry_busy(lambda: cursor.execute(query, params)) # a single statement is its own transaction, safe to repeat
+                if commit and not self.in_transaction(): # if i say commit in any file or place it saves the commit in the database 
+                    conn.commit()
+                if fetchone: # if i ask one row anywhere in project it gives one desired row
+                    result = cursor.fetchone()
+                elif fetchall: # if i ask all the rows of a table anywhere in the project it gives all the available rows 
+                    result = cursor.fetchall()
+                elif lastrowid: # the id SQLite gave to the row we just inserted
+                    result = cursor.lastrowid
+                else:
+                    result = cursor.rowcount # number of rows an INSERT/UPDATE/DELETE touched (lets callers check conditional updates)
+                self.query_stats.record(query, params, time.perf_counter() - started, conn)
+                return result
             
         except sqlite3.Error as e: # If anything goes wrong then  it cathces the error and instade of crashing the program it gives and error message
             print(f"[DB ERROR] {e}")
+            if self.in_transaction(): # let the enclosing transaction() see the failure and roll back
+                raise
+            return None
+
+    def execute_many(self, query: str, seq_of_params):
+        """
+        Run one statement for many parameter tuples (cursor.executemany). Returns the total rowcount.
+        Much faster than calling execute() in a loop: the SQL is prepared once and all the rows are
+        saved with a single commit (or join the enclosing transaction, like execute(commit=True)).
+        """
+        try:
+            with self.transaction() as conn: # without it autocommit mode would commit after every single row
+                started = time.perf_counter()
+                cursor = conn.executemany(query, seq_of_params)
+                self.query_stats.record(query, (), time.perf_counter() - started, conn)
+                return cursor.rowcount
+
+        except sqlite3.Error as e:
+            print(f"[DB ERROR] {e}")
+            if self.in_transaction():
+                raise
             return None
 
     # Optional helper wrappers
@@ -123,6 +366,48 @@ class DatabaseManager: # this class acts as a manager which will manage our data
     def fetch_all(self, query, params=()):# a shortcut method for fetching all the row
         return self.execute(query, params, fetchall=True)
 
+    # ------------ Streaming Reads ------------
+    '''
+    fetch_all() builds the whole result list in memory. iter_rows() is a generator instead: it pulls
+    batch_size rows at a time with fetchmany(), so reading a million rows only ever holds one batch.
+        for row in db.iter_rows("SELECT * FROM orders"):
+            ...
+    It has its own cursor, so running other queries inside the loop is fine. The thread keeps its
+    connection checked out until the loop ends (or the generator is closed).
+    '''
+    def iter_rows(self, query: str, params: tuple = (), batch_size: int = 500):
+        """Yield the rows of a SELECT one by one, fetching batch_size rows from SQLite at a time."""
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            spent = 0.0 # time inside SQLite only, not the time the caller spends on each row
+            try:
+                started = time.perf_counter()
+                cursor.execute(query, params)
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    spent += time.perf_counter() - started
+                    if not rows:
+                        break
+                    yield from rows
+                    started = time.perf_counter()
+            except sqlite3.Error as e: # unlike fetch_all we can't return None halfway through, so the caller gets the error
+                print(f"[DB ERROR] {e}")
+                raise
+            finally:
+                cursor.close()
+                self.query_stats.record(query, params, spent, conn)
+
+    # ------------ Query Statistics ------------
+    def top_queries(self, n: int = 10, by: str = "total") -> list:
+        """The n most expensive statements so far (sorted by 'total', 'count', 'max' or 'avg' seconds)."""
+        return self.query_stats.top(n, by)
+
+    def query_report(self, n: int = 10) -> str:
+        """Top-n statements by total time as a printable table, plus the lock contention counters."""
+        busy = self.busy_stats()
+        return (self.query_stats.report(n) + f"\nLock contention: {busy['busy_errors']} busy errors, {busy['retries']} retries, "
+                f"{busy['waits']} waits, {busy['gave_up']} gave up, {busy['lock_wait'] * 1000:.1f} ms waited")
+
     # ------------ Context Manager Support ------------
     '''
     These makes it possible to use the (with) statement like ( with DatabaseManager() as db: )
@@ -135,6 +420,7 @@ class DatabaseManager: # this class acts as a manager which will manage our data
 
     # ------------ Connection Close ------------
     def close(self): # Method for closing the connection
-        """Close database connection safely."""
-        if self.conn:
-            self.conn.close()
+        """Close database connections safely."""
+        if self.pool:
+            self.pool.close()
+        self.query_stats.close()
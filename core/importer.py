@@ -0,0 +1,266 @@
+'''
+Streaming product catalog import.
+
+Loads a supplier feed (CSV or JSON Lines) into the products table without going through
+Product.add_product() one row at a time:-
+    1. The file is read row by row, so a 200k line feed never sits in memory as a whole
+    2. Rows are validated; bad rows are counted as rejected (with the reason) instead of stopping the import
+    3. Every batch_size good rows are written in ONE transaction with executemany():
+       rows whose key (sku or name) already exists are updated, the others are inserted (upsert)
+    4. With --key name, a row whose sku belongs to another product (or repeats in the batch) is rejected
+       instead of breaking the unique sku index and rolling the whole batch back
+
+Columns / keys: name, price, stock, description, sku (only name and price are required,
+sku is required when importing with --key sku).
+
+Run it from the project folder:
+    python -m core.importer feed.csv
+    python -m core.importer feed.jsonl --key name --batch-size 5000 --db data/ecommerce.db
+    python -m core.importer big_feed.csv --profile bulk-load
+'''
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+from core.models.product import Product
+
+KEYS = ("sku", "name") # columns a feed row can be matched on
+MAX_KEPT_REJECTS = 1000 # rejected rows are always counted, but only this many reasons are kept in memory
+
+
+class ProductImporter:
+    """Batched upsert of product rows from CSV / JSONL feeds."""
+
+    def __init__(self, db, key: str = "sku", batch_size: int = 1000, progress=None):
+        """
+        db         : DatabaseManager instance
+        key        : "sku" or "name", the column that decides between update and insert
+        batch_size : rows per transaction
+        progress   : optional callback(report) called after every batch
+        """
+        if key not in KEYS:
+            raise ValueError(f"key must be one of {KEYS}")
+        self.db = db
+        self.key = key
+        self.batch_size = max(1, int(batch_size))
+        self.progress = progress
+        self.product_model = Product(db)
+
+    # ----- Reading -----
+    @staticmethod
+    def read_rows(path: str, fmt: str = None):
+        """Yield (line_number, dict) for every record in a .csv or .jsonl file."""
+        fmt = fmt or ("jsonl" if path.endswith((".jsonl", ".ndjson", ".json")) else "csv")
+        with open(path, newline="", encoding="utf-8") as f:
+            if fmt == "csv":
+                for number, row in enumerate(csv.DictReader(f), start=2): # line 1 is the header
+                    yield number, row
+            elif fmt == "jsonl":
+                for number, line in enumerate(f, start=1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        row = json.loads(line)
+                    except json.JSONDecodeError as e:
+                        yield number, ValueError(f"invalid JSON: {e.msg}")
+                        continue
+                    yield number, row if isinstance(row, dict) else ValueError("line is not a JSON object")
+            else:
+                raise ValueError("format must be 'csv' or 'jsonl'")
+
+    def _clean(self, row: dict):
+        """Validate one record. Returns (name, price, stock, description, sku) or raises ValueError."""
+        name = str(row.get("name") or "").strip()
+        if not name:
+            raise ValueError("missing name")
+        try:
+            price = float(row.get("price"))
+        except (TypeError, ValueError):
+            raise ValueError(f"invalid price {row.get('price')!r}")
+        if price < 0:
+            raise ValueError("negative price")
+        stock_value = row.get("stock")
+        try:
+            stock = int(float(stock_value)) if stock_value not in (None, "") else 0
+        except (TypeError, ValueError):
+            raise ValueError(f"invalid stock {stock_value!r}")
+        if stock < 0:
+            raise ValueError("negative stock")
+        description = str(row.get("description") or "")
+        sku = str(row.get("sku") or "").strip() or None
+        if self.key == "sku" and not sku:
+            raise ValueError("missing sku")
+        return name, price, stock, description, sku
+
+    # ----- Import -----
+    def import_rows(self, records) -> dict:
+        """Import an iterable of (line_number, dict) records. Returns the report dict."""
+        report = {"read": 0, "inserted": 0, "updated": 0, "rejected": 0, "rejects": [], "seconds": 0.0, "rows_per_sec": 0.0}
+        started = time.perf_counter()
+        batch = {} # key value -> (line number, cleaned row); a key repeated inside one batch keeps its last row
+
+        for number, record in records:
+            report["read"] += 1
+            try:
+                if isinstance(record, Exception):
+                    raise record
+                cleaned = self._clean(record)
+            except ValueError as e:
+                self._reject(report, number, str(e))
+                continue
+
+            key_value = cleaned[4] if self.key == "sku" else cleaned[0]
+            batch.pop(key_value, None) # a repeated key moves to the end, like the row order of the feed
+            batch[key_value] = (number, cleaned)
+            if len(batch) >= self.batch_size:
+                self._write_batch(batch, report, started)
+                batch = {}
+
+        if batch:
+            self._write_batch(batch, report, started)
+        self._finish(report, started)
+        return report
+
+    def import_file(self, path: str, fmt: str = None) -> dict:
+        """Import a CSV or JSONL file. Returns the report dict."""
+        return self.import_rows(self.read_rows(path, fmt))
+
+    def _write_batch(self, batch: dict, report: dict, started: float):
+        """Upsert one batch in a single transaction."""
+        keys = list(batch)
+        with self.db.transaction():
+            existing = self._lookup(self.key, keys) # key value -> [product ids]
+            if self.key == "name":
+                keys = self._drop_sku_conflicts(batch, keys, existing, report)
+
+            updates = [batch[k][1] for k in keys if k in existing]
+            inserts = [batch[k][1] for k in keys if k not in existing]
+
+            if updates:
+                # name, price, stock, description, sku + the key value for the WHERE part
+                self.db.execute_many(
+                    f"UPDATE products SET name = ?, price = ?, stock = ?, description = ?, sku = COALESCE(?, sku) WHERE {self.key} = ?",
+                    [row + ((row[4] if self.key == "sku" else row[0]),) for row in updates]
+                )
+            if inserts:
+                self.db.execute_many(
+                    "INSERT INTO products (name, price, stock, description, sku) VALUES (?, ?, ?, ?, ?)",
+                    inserts
+                )
+
+            changed_ids = [pid for k in keys if k in existing for pid in existing[k]]
+            if changed_ids:
+                self.product_model.invalidate(*changed_ids) # cached rows would still show the old price/stock
+
+        report["updated"] += len(updates)
+        report["inserted"] += len(inserts)
+        if self.progress:
+            self._finish(report, started)
+            self.progress(report)
+
+    def _lookup(self, column: str, values: list) -> dict:
+        """value -> [ids of the products whose column has that value]"""
+        found = {}
+        for start in range(0, len(values), 500): # stay well under SQLite's limit on ? per statement
+            chunk = values[start:start + 500]
+            placeholders = ", ".join("?" for _ in chunk)
+            rows = self.db.fetch_all(
+                f"SELECT id, {column} AS k FROM products WHERE {column} IN ({placeholders})", tuple(chunk)
+            ) or []
+            for row in rows:
+                found.setdefault(row["k"], []).append(row["id"])
+        return found
+
+    def _drop_sku_conflicts(self, batch: dict, keys: list, existing: dict, report: dict) -> list:
+        """
+        When matching on name, a row's sku may already belong to another product, or repeat inside the batch;
+        writing it would break the unique sku index and roll the whole batch back. Such rows are rejected
+        instead and the keys that are safe to write are returned.
+        """
+        owners = self._lookup("sku", [row[4] for _, row in batch.values() if row[4]]) # sku -> [product id]
+        claimed = {} # sku -> line number of the row in this batch that gets it
+        kept = []
+        for k in keys:
+            number, row = batch[k]
+            sku = row[4]
+            if sku:
+                own_ids = existing.get(k, [])
+                other_owners = [pid for pid in owners.get(sku, []) if pid not in own_ids]
+                if sku in claimed:
+                    self._reject(report, number, f"sku {sku!r} repeats line {claimed[sku]}")
+                    continue
+                if other_owners:
+                    self._reject(report, number, f"sku {sku!r} already belongs to product {other_owners[0]}")
+                    continue
+                if len(own_ids) > 1:
+                    self._reject(report, number, f"name matches {len(own_ids)} products, they can't share sku {sku!r}")
+                    continue
+                claimed[sku] = number
+            kept.append(k)
+        return kept
+
+    @staticmethod
+    def _reject(report: dict, number: int, reason: str):
+        report["rejected"] += 1
+        if len(report["rejects"]) < MAX_KEPT_REJECTS:
+            report["rejects"].append((number, reason))
+
+    @staticmethod
+    def _finish(report: dict, started: float):
+        report["seconds"] = time.perf_counter() - started
+        written = report["inserted"] + report["updated"]
+        report["rows_per_sec"] = written / report["seconds"] if report["seconds"] else 0.0
+
+
+# ----- Command line -----
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import products from a CSV or JSONL feed.")
+    parser.add_argument("path", help="feed file (.csv or .jsonl)")
+    parser.add_argument("--db", default="data/ecommerce.db", help="SQLite database file")
+    parser.add_argument("--key", choices=KEYS, default="sku", help="column used to match existing products")
+    parser.add_argument("--batch-size", type=int, default=1000, help="rows per transaction")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="file format (guessed from the extension)")
+    parser.add_argument("--rejects", help="write rejected line numbers and reasons to this file")
+    parser.add_argument("--profile", default="throughput",
+                        help="PRAGMA profile (durable, throughput, bulk-load); bulk-load skips fsync, keep a backup")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.path):
+        print(f"File not found: {args.path}")
+        return 1
+
+    from core.database import DatabaseManager # imported here so `--help` works without touching a database
+
+    def show_progress(report):
+        print(f"\r  {report['inserted'] + report['updated']:,} rows written, {report['rejected']:,} rejected, "
+              f"{report['rows_per_sec']:,.0f} rows/s", end="", flush=True)
+
+    with DatabaseManager(args.db, profile=args.profile) as db:
+        importer = ProductImporter(db, key=args.key, batch_size=args.batch_size, progress=show_progress)
+        report = importer.import_file(args.path, args.format)
+    print()
+
+    print(f"Read {report['read']:,} rows in {report['seconds']:.2f}s: "
+          f"{report['inserted']:,} inserted, {report['updated']:,} updated, {report['rejected']:,} rejected "
+          f"({report['rows_per_sec']:,.0f} rows/s)")
+    if report["rejects"]:
+        if args.rejects:
+            with open(args.rejects, "w", encoding="utf-8") as f:
+                for number, reason in report["rejects"]:
+                    f.write(f"{number}\t{reason}\n")
+            print(f"Rejected rows written to {args.rejects}")
+        else:
+            for number, reason in report["rejects"][:10]:
+                print(f"  line {number}: {reason}")
+            if report["rejected"] > 10:
+                print("  ... use --rejects FILE to see all of them")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
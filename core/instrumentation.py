@@ -0,0 +1,132 @@
+'''
+Query instrumentation for the DatabaseManager.
+
+Every statement that goes through DatabaseManager.execute() (and iter_rows / transactions) is timed here:-
+    1. Timings are added up per *normalized* SQL text, so "WHERE id = 5" and "WHERE id = 7" count as one query
+    2. Statements slower than a threshold are written to a rotating log file together with their
+       EXPLAIN QUERY PLAN, which shows whether SQLite used an index or scanned the whole table
+    3. top() / report() list the queries that cost the most time in total
+'''
+
+import logging
+import re
+import threading
+from functools import lru_cache
+from logging.handlers import RotatingFileHandler
+
+_STRING = re.compile(r"'(?:[^']|'')*'") # 'text' literals (with '' escapes)
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)") # (?, ?, ?) -> (...), so IN lists of any length group together
+_SPACES = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096) # the same SQL strings come back all the time, normalize each one only once
+def normalize_sql(query: str) -> str:
+    """Turn an SQL string into a grouping key: literals become ?, IN lists collapse, whitespace is squeezed."""
+    text = _STRING.sub("?", query)
+    text = _NUMBER.sub("?", text)
+    text = _IN_LIST.sub("(...)", text)
+    return _SPACES.sub(" ", text).strip()
+
+
+class QueryStats:
+    """Per-statement counters plus the slow-query log."""
+
+    def __init__(self, slow_query_ms: float = 100.0, log_path: str = None,
+                 max_log_bytes: int = 1_000_000, backup_count: int = 3):
+        """
+        slow_query_ms : statements at least this slow are logged (None turns the slow log off)
+        log_path      : file for the slow-query log, rotated at max_log_bytes keeping backup_count old files
+        """
+        self.slow_query_ms = slow_query_ms
+        self.log_path = log_path
+        self.max_log_bytes = max_log_bytes
+        self.backup_count = backup_count
+
+        self._stats = {} # normalized sql -> {"count", "total", "max"}
+        self._plans = {} # normalized sql -> EXPLAIN QUERY PLAN text (plans rarely change, explain each query once)
+        self._lock = threading.Lock()
+        self._logger = None
+        self.slow_count = 0
+
+    # ----- Recording -----
+    def record(self, query: str, params, elapsed: float, conn=None):
+        """Add one execution (elapsed in seconds). conn is used to EXPLAIN the statement if it was slow."""
+        key = normalize_sql(query)
+        with self._lock:
+            entry = self._stats.get(key)
+            if entry is None:
+                entry = self._stats[key] = {"count": 0, "total": 0.0, "max": 0.0}
+            entry["count"] += 1
+            entry["total"] += elapsed
+            if elapsed > entry["max"]:
+                entry["max"] = elapsed
+
+        if self.slow_query_ms is not None and elapsed * 1000 >= self.slow_query_ms:
+            self._log_slow(key, query, params, elapsed, conn)
+
+    def _log_slow(self, key, query, params, elapsed, conn):
+        with self._lock:
+            self.slow_count += 1
+            plan = self._plans.get(key)
+        if plan is None and conn is not None:
+            plan = self._explain(conn, query, params)
+            with self._lock:
+                self._plans[key] = plan
+
+        logger = self._get_logger()
+        if logger:
+            logger.warning("%.1f ms | %s | params=%r\n%s", elapsed * 1000, key, tuple(params)[:10], plan or "    (no plan)")
+
+    @staticmethod
+    def _explain(conn, query, params) -> str:
+        """Return EXPLAIN QUERY PLAN output as indented lines (empty for statements that can't be explained)."""
+        try:
+            rows = conn.execute("EXPLAIN QUERY PLAN " + query, params).fetchall()
+        except Exception:
+            return ""
+        return "\n".join(f"    {row[3]}" for row in rows) # column 3 is the human readable 'detail'
+
+    def _get_logger(self):
+        """Create the rotating file logger the first time a slow query shows up."""
+        if self._logger is None and self.log_path:
+            logger = logging.getLogger(f"consolecommerce.slow_queries.{id(self)}")
+            logger.setLevel(logging.WARNING)
+            logger.propagate = False # don't print slow queries on the console
+            handler = RotatingFileHandler(self.log_path, maxBytes=self.max_log_bytes, backupCount=self.backup_count)
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            logger.addHandler(handler)
+            self._logger = logger
+        return self._logger
+
+    # ----- Reporting -----
+    def top(self, n: int = 10, by: str = "total") -> list:
+        """Return the n most expensive queries sorted by 'total', 'count', 'max' or 'avg' time."""
+        with self._lock:
+            rows = [
+                {"sql": sql, "count": e["count"], "total": e["total"], "max": e["max"], "avg": e["total"] / e["count"]}
+                for sql, e in self._stats.items()
+            ]
+        rows.sort(key=lambda r: r[by], reverse=True)
+        return rows[:n]
+
+    def report(self, n: int = 10) -> str:
+        """Top-n queries by total time as a printable table (times in milliseconds)."""
+        lines = [f"{'Count':>8} {'Total ms':>10} {'Avg ms':>8} {'Max ms':>8}  Query", "-" * 70]
+        for r in self.top(n):
+            sql = r["sql"] if len(r["sql"]) <= 80 else r["sql"][:77] + "..."
+            lines.append(f"{r['count']:>8} {r['total'] * 1000:>10.1f} {r['avg'] * 1000:>8.2f} {r['max'] * 1000:>8.2f}  {sql}")
+        return "\n".join(lines)
+
+    def reset(self):
+        """Forget all counters (the slow log file is kept)."""
+        with self._lock:
+            self._stats.clear()
+            self.slow_count = 0
+
+    def close(self):
+        if self._logger:
+            for handler in list(self._logger.handlers):
+                handler.close()
+                self._logger.removeHandler(handler)
+            self._logger = None
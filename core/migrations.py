@@ -0,0 +1,403 @@
+'''
+Versioned schema migrations.
+
+SQLite keeps a free integer in the database file header called user_version (PRAGMA user_version).
+We use it as the schema version:-
+    1. Every migration below has a version number, in increasing order
+    2. On startup we read user_version and run only the migrations with a higher number
+    3. After each migration user_version is set to its number, so it never runs twice
+A database that is already up to date costs one PRAGMA read at startup.
+
+To change the schema add a new function at the bottom with the next version number.
+Never edit a migration that has already shipped, existing databases have already run it.
+'''
+
+import json
+import sqlite3
+
+MIGRATIONS = [] # (version, description, function, transactional), filled by the @migration decorator
+
+
+def migration(version: int, description: str, transactional: bool = True):
+    """
+    Register a migration.
+    transactional=True  : the function gets a connection and runs inside one transaction together with
+                          the user_version bump (all or nothing)
+    transactional=False : the function gets the DatabaseManager and manages its own transactions
+                          (for long backfills that commit in chunks). It must be safe to run again,
+                          because an interruption leaves user_version at the previous number.
+    """
+    def register(function):
+        MIGRATIONS.append((version, description, function, transactional))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return function
+    return register
+
+
+def latest_version() -> int:
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def current_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(db) -> int:
+    """Bring the database schema up to date. Returns the number of migrations that ran."""
+    with db.connection() as conn:
+        version = current_version(conn)
+        if version == latest_version():
+            return 0
+        if version > latest_version():
+            print(f"[DB WARNING] Database schema version {version} is newer than this program ({latest_version()}).")
+            return 0
+
+        applied = 0
+        for number, description, function, transactional in MIGRATIONS:
+            if number <= version:
+                continue
+            if transactional:
+                with db.transaction():
+                    function(conn)
+                    conn.execute(f"PRAGMA user_version = {number}") # part of the same transaction
+            else:
+                function(db)
+                with db.transaction():
+                    conn.execute(f"PRAGMA user_version = {number}")
+            print(f"Applied database migration {number}: {description}")
+            applied += 1
+        return applied
+
+
+# ------------ Migrations ------------
+# Every CREATE uses IF NOT EXISTS, so databases made before versioning existed (user_version 0) upgrade cleanly.
+
+@migration(1, "create users, products and orders tables")
+def _create_core_tables(conn):
+    # Users
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            role TEXT DEFAULT 'customer',
+            created_at TEXT
+        )
+    """)
+
+    # Products
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS products (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            price REAL NOT NULL,
+            stock INTEGER DEFAULT 0,
+            description TEXT
+        )
+    """)
+
+    # Orders
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS orders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            items_json TEXT,
+            status TEXT,
+            created_at TEXT,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    """) # items_json means a list of items in JSON format (only filled for orders created before order_items existed)
+    # The Foreign key part tells SQLite that user_id must match a real id from the users table-- it links two tables together
+
+
+'''
+products_fts is an FTS5 index over products.name and products.description.
+It is an "external content" table: it stores only the search index and reads the text from products,
+and the three triggers below keep it in sync on every INSERT, UPDATE and DELETE of a product.
+'''
+@migration(2, "full-text search index for products")
+def _create_search_index(conn):
+    existed = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'"
+    ).fetchone() is not None
+
+    try:
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+                name, description,
+                content='products', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        """)
+    except sqlite3.OperationalError: # "no such module: fts5", search falls back to LIKE
+        return
+
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+            INSERT INTO products_fts (rowid, name, description) VALUES (new.id, new.name, new.description);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+            INSERT INTO products_fts (products_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF name, description ON products BEGIN
+            INSERT INTO products_fts (products_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+            INSERT INTO products_fts (rowid, name, description) VALUES (new.id, new.name, new.description);
+        END
+    """) # only fires when the text changes, stock/price updates don't touch the index
+
+    if not existed: # first time: index the products that are already in the table
+        conn.execute("INSERT INTO products_fts (products_fts) VALUES ('rebuild')")
+
+
+@migration(3, "order_items table")
+def _create_order_items(conn):
+    # Order line items, one row per product in an order
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS order_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_id INTEGER NOT NULL,
+            product_id INTEGER,
+            name TEXT,
+            price REAL,
+            qty INTEGER,
+            FOREIGN KEY (order_id) REFERENCES orders(id),
+            FOREIGN KEY (product_id) REFERENCES products(id)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_order_items_order ON order_items (order_id)") # load the lines of an order
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_order_items_product ON order_items (product_id)") # "orders containing product X", revenue per product
+
+
+'''
+Orders created before the order_items table existed only have their lines in orders.items_json.
+This copies them into order_items a chunk at a time. Every chunk is its own short transaction, so the
+database is never locked for long, and an interrupted backfill simply continues where it stopped
+(orders that already have rows in order_items are skipped). items_json itself is left untouched.
+'''
+@migration(4, "backfill order_items from items_json", transactional=False)
+def _backfill_order_items(db, chunk_size: int = 500):
+    migrated = 0
+    last_id = 0
+    while True:
+        with db.transaction() as conn:
+            rows = conn.execute("""
+                SELECT o.id, o.items_json FROM orders o
+                WHERE o.id > ? AND o.items_json IS NOT NULL
+                  AND NOT EXISTS (SELECT 1 FROM order_items i WHERE i.order_id = o.id)
+                ORDER BY o.id LIMIT ?
+            """, (last_id, chunk_size)).fetchall()
+            if not rows:
+                break
+
+            lines = []
+            for row in rows:
+                try:
+                    items = json.loads(row["items_json"])
+                except json.JSONDecodeError:
+                    items = []
+                for item in items:
+                    lines.append((row["id"], item.get("product_id"), item.get("name"), item.get("price"), item.get("qty")))
+            conn.executemany(
+                "INSERT INTO order_items (order_id, product_id, name, price, qty) VALUES (?, ?, ?, ?, ?)",
+                lines
+            )
+            last_id = rows[-1]["id"]
+            migrated += len(rows)
+
+    if migrated:
+        print(f"Migrated line items of {migrated} order(s) into order_items.")
+
+
+@migration(5, "indexes for order and user lookups")
+def _create_lookup_indexes(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_orders_user ON orders (user_id, id)") # Order.get_user_orders (and listing them in id order)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_orders_status ON orders (status)") # admin filters by order status
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_users_role ON users (role)") # customer listing in the admin menu, default admin check
+
+
+@migration(6, "product sku column and import lookup indexes")
+def _add_product_sku(conn):
+    columns = [row["name"] for row in conn.execute("PRAGMA table_info(products)")]
+    if "sku" not in columns: # ALTER TABLE has no IF NOT EXISTS for columns
+        conn.execute("ALTER TABLE products ADD COLUMN sku TEXT")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_products_sku ON products (sku) WHERE sku IS NOT NULL") # supplier feeds upsert on sku
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_products_name ON products (name)") # ...or on the product name
+
+
+@migration(7, "stock reservations for carts")
+def _create_stock_reservations(conn):
+    # One row per (user, product) currently held in a cart; expires_at is a unix timestamp (seconds)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS stock_reservations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            qty INTEGER NOT NULL,
+            expires_at REAL NOT NULL,
+            UNIQUE (user_id, product_id),
+            FOREIGN KEY (product_id) REFERENCES products(id)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_reservations_product ON stock_reservations (product_id, expires_at)") # active holds of a product
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_reservations_expiry ON stock_reservations (expires_at)") # the sweeper's expired-holds scan
+
+
+@migration(8, "persistent cart storage")
+def _create_cart_items(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS cart_items (
+            user_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            qty INTEGER NOT NULL,
+            updated_at REAL,
+            PRIMARY KEY (user_id, product_id)
+        ) WITHOUT ROWID
+    """) # WITHOUT ROWID: the (user_id, product_id) key is the table itself, a user's cart is one contiguous range
+
+
+@migration(9, "login sessions")
+def _create_sessions(conn):
+    # Only a SHA-256 hash of each token is stored, so someone who can read the database file can't log in with it
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sessions (
+            token_hash TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            expires_at REAL NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions (user_id)") # log a user out everywhere
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expiry ON sessions (expires_at)") # purge expired sessions
+
+
+@migration(10, "order totals and per-user order summaries")
+def _add_order_totals(conn):
+    columns = [row["name"] for row in conn.execute("PRAGMA table_info(orders)")]
+    if "total" not in columns:
+        conn.execute("ALTER TABLE orders ADD COLUMN total REAL") # sum of price * qty of the lines, saved when the order is created
+    if "item_count" not in columns:
+        conn.execute("ALTER TABLE orders ADD COLUMN item_count INTEGER") # sum of qty
+
+    # One row per customer, kept up to date by the Order model in the same transaction as the order change.
+    # order_count / total_spent leave cancelled orders out; last_order_* is the most recently placed order.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS user_order_summary (
+            user_id INTEGER PRIMARY KEY,
+            order_count INTEGER NOT NULL DEFAULT 0,
+            total_spent REAL NOT NULL DEFAULT 0,
+            last_order_id INTEGER,
+            last_order_at TEXT,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_user_summary_spent ON user_order_summary (total_spent)") # top customers
+
+
+'''
+Fills orders.total / item_count for orders that existed before migration 10, a chunk of orders per
+transaction like the order_items backfill (safe to run again, it only touches rows where total is NULL),
+then builds user_order_summary from scratch in one go.
+'''
+@migration(11, "backfill order totals and user summaries", transactional=False)
+def _backfill_order_totals(db, chunk_size: int = 2000):
+    last_id = 0
+    while True:
+        with db.transaction() as conn:
+            ids = [row[0] for row in conn.execute(
+                "SELECT id FROM orders WHERE id > ? AND total IS NULL ORDER BY id LIMIT ?", (last_id, chunk_size)
+            )]
+            if not ids:
+                break
+            conn.execute(f"""
+                UPDATE orders SET
+                    total = COALESCE((SELECT ROUND(SUM(i.price * i.qty), 2) FROM order_items i WHERE i.order_id = orders.id), 0),
+                    item_count = COALESCE((SELECT SUM(i.qty) FROM order_items i WHERE i.order_id = orders.id), 0)
+                WHERE id IN ({", ".join("?" for _ in ids)})
+            """, ids)
+            last_id = ids[-1]
+
+    with db.transaction() as conn:
+        conn.execute("DELETE FROM user_order_summary")
+        conn.execute("""
+            INSERT INTO user_order_summary (user_id, order_count, total_spent, last_order_id, last_order_at)
+            SELECT user_id,
+                   SUM(LOWER(status) != 'cancelled'),
+                   ROUND(SUM(CASE WHEN LOWER(status) != 'cancelled' THEN total ELSE 0 END), 2),
+                   MAX(id),
+                   MAX(created_at)
+            FROM orders WHERE user_id IS NOT NULL
+            GROUP BY user_id
+        """)
+
+
+'''
+Sales rollups: small tables the admin reports read instead of scanning every order. The Order model
+keeps them up to date in the same transaction as the order change (see core/models/sales.py).
+'''
+@migration(12, "sales rollup tables for admin reports")
+def _create_sales_rollups(conn):
+    # One row per calendar day of created_at, orders that aren't cancelled
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sales_daily (
+            day TEXT PRIMARY KEY,
+            orders INTEGER NOT NULL DEFAULT 0,
+            units INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    # One row per product per month (YYYY-MM), orders that aren't cancelled
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sales_product_monthly (
+            month TEXT NOT NULL,
+            product_id INTEGER NOT NULL,
+            name TEXT,
+            units INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (month, product_id)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sales_product_month_revenue ON sales_product_monthly (month, revenue)") # top products of a month
+    # Every order by its current status, cancelled included
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sales_status (
+            status TEXT PRIMARY KEY,
+            orders INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+
+
+'''
+Builds the sales rollups from the orders that already exist, one table per transaction.
+Needs the order totals of migration 11; safe to run again (each table is emptied first).
+'''
+@migration(13, "backfill sales rollups", transactional=False)
+def _backfill_sales_rollups(db):
+    with db.transaction() as conn:
+        conn.execute("DELETE FROM sales_daily")
+        conn.execute("""
+            INSERT INTO sales_daily (day, orders, units, revenue)
+            SELECT SUBSTR(created_at, 1, 10), COUNT(*), SUM(item_count), ROUND(SUM(total), 2)
+            FROM orders WHERE LOWER(status) != 'cancelled' AND created_at IS NOT NULL
+            GROUP BY SUBSTR(created_at, 1, 10)
+        """)
+    with db.transaction() as conn:
+        conn.execute("DELETE FROM sales_product_monthly")
+        conn.execute("""
+            INSERT INTO sales_product_monthly (month, product_id, name, units, revenue)
+            SELECT SUBSTR(o.created_at, 1, 7), i.product_id, MAX(i.name), SUM(i.qty), ROUND(SUM(i.price * i.qty), 2)
+            FROM order_items i JOIN orders o ON o.id = i.order_id
+            WHERE LOWER(o.status) != 'cancelled' AND o.created_at IS NOT NULL AND i.product_id IS NOT NULL
+            GROUP BY SUBSTR(o.created_at, 1, 7), i.product_id
+        """)
+    with db.transaction() as conn:
+        conn.execute("DELETE FROM sales_status")
+        conn.execute("""
+            INSERT INTO sales_status (status, orders, revenue)
+            SELECT LOWER(status), COUNT(*), ROUND(SUM(total), 2) FROM orders GROUP BY LOWER(status)
+        """)
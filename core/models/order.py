@@ -8,26 +8,46 @@ So the class doesn't directly talks with the SQL, it asks the db object to do th
 import json # used to convert Python data (like lists or dicts) into a string for storing in the database, and back again when reading 
 from datetime import datetime
 
+from core.models.sales import SalesReport
+from core.pagination import fetch_page, DEFAULT_PAGE_SIZE
+
 class Order:
     """Handles all order-related operations."""
     # The constructor runs once when the class is created 
     def __init__(self, db):# The db argument is an object that knows how to run DQL commands
         self.db = db # stores the db object inside the class so every method can use it to communicate with the database
+        self.sales = SalesReport(db) # the sales rollups change together with the orders
 
     # ----- CREATE -----
     def create_order(self, user_id: int, items: list): # this method creates a new orders in the orders table
-        """Create a new order for a specific user."""
-        items_json = json.dumps(items)# Converts the items list(object) into a JSON string so it can be stored in a single database column
+        """
+        Create a new order for a specific user. Returns the new order ID.
+        The order row and its lines in order_items are written in one transaction.
+        """
         created_at = datetime.now().isoformat(timespec="seconds") # .isoformat() makes the date time readable and easy to store in database 
         status = "pending"
+        total, item_count = self._totals(items) # stored with the order, so listings never add up the lines again
 
-        # This adds a new record to the orders table, ? are placeholders for the values commit = True means save the changes in the database 
-        self.db.execute("""
-            INSERT INTO orders (user_id, items_json, status, created_at)
-            VALUES (?, ?, ?, ?)
-        """, (user_id, items_json, status, created_at), commit=True)
+        with self.db.transaction(): # joins the caller's transaction if there is one (e.g. checkout)
+            # This adds a new record to the orders table, ? are placeholders for the values
+            order_id = self.db.execute("""
+                INSERT INTO orders (user_id, status, created_at, total, item_count)
+                VALUES (?, ?, ?, ?, ?)
+            """, (user_id, status, created_at, total, item_count), commit=True, lastrowid=True)
+            self._insert_items(order_id, items)
+            self.db.execute("""
+                INSERT INTO user_order_summary (user_id, order_count, total_spent, last_order_id, last_order_at)
+                VALUES (?, 1, ?, ?, ?)
+                ON CONFLICT (user_id) DO UPDATE SET
+                    order_count = order_count + 1,
+                    total_spent = ROUND(total_spent + excluded.total_spent, 2),
+                    last_order_id = excluded.last_order_id,
+                    last_order_at = excluded.last_order_at
+            """, (user_id, total, order_id, created_at), commit=True)
+            self.sales.add({"status": status, "created_at": created_at, "total": total, "item_count": item_count, "items": items})
 
         print("Order created successfully.")
+        return order_id
 
     # ----- READ -----
     def get_user_orders(self, user_id: int):
@@ -35,81 +55,243 @@ class Order:
         Fetch all orders placed by a specific user.
         1. runs a query to find all rows where user_id matches
         2. fetch_all() returns a list of rows
-        3. each row is converted into a dictionary using _row_to_dict() for easier working 
+        3. each row is converted into a dictionary using _rows_to_dicts() for easier working 
         """
         rows = self.db.fetch_all("SELECT * FROM orders WHERE user_id = ?", (user_id,)) # the fetch_all() method is located in database.py
-        return [self._row_to_dict(row) for row in rows] if rows else [] # if there are no orders, it returns an empty list [] note: list comprehension and ternary operators are used here 
+        return self._rows_to_dicts(rows) if rows else [] # if there are no orders, it returns an empty list [] note: ternary operators are used here 
 
     def get_all_orders(self): 
         """Fetch all orders (admin view). Shows all orders of every users"""
-        rows = self.db.fetch_all("SELECT * FROM orders")
-        # using regular looping and if else condition instead of list comprehension and ternary operators 
-        result = []
-        if rows:
-            for row in rows:
-                result.append(self._row_to_dict(row))
-        else:
-            result = []
-        
-        return result
+        return list(self.iter_all_orders())
+
+    def iter_all_orders(self, batch_size: int = 500):
+        """
+        Stream every order as a dict without loading the whole table.
+        Orders are read batch_size at a time and each batch gets its lines with one order_items query,
+        so memory stays flat no matter how many orders there are (use this for exports and reports).
+        """
+        batch = []
+        for row in self.db.iter_rows("SELECT * FROM orders ORDER BY id", batch_size=batch_size):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                yield from self._rows_to_dicts(batch)
+                batch = []
+        if batch:
+            yield from self._rows_to_dicts(batch)
             
 
+    def get_user_orders_page(self, user_id: int, token: str = None, limit: int = DEFAULT_PAGE_SIZE) -> dict:
+        """One page of a user's orders in ID order: {"items": [order dicts], "next": token, "prev": token}."""
+        page = fetch_page(self.db, "SELECT * FROM orders", ["user_id = ?"], (user_id,), token=token, limit=limit)
+        page["items"] = self._rows_to_dicts(page["items"])
+        return page
+
+    def get_all_orders_page(self, token: str = None, limit: int = DEFAULT_PAGE_SIZE) -> dict:
+        """One page of all orders (admin view), same shape as get_user_orders_page()."""
+        page = fetch_page(self.db, "SELECT * FROM orders", token=token, limit=limit)
+        page["items"] = self._rows_to_dicts(page["items"])
+        return page
+
     def get_order_by_id(self, order_id: int):
         """Fetch a single order by ID."""
         row = self.db.fetch_one("SELECT * FROM orders WHERE id = ?", (order_id,)) # fetch_one() returns a single row
         if not row:
             print(f"No order found with ID {order_id}.")
             return None
-        return self._row_to_dict(row)
+        return self._rows_to_dicts([row])[0]
+
+    def get_orders_with_product(self, product_id: int):
+        """Fetch every order that contains a given product (uses the order_items product index)."""
+        rows = self.db.fetch_all("""
+            SELECT * FROM orders WHERE id IN (SELECT order_id FROM order_items WHERE product_id = ?)
+            ORDER BY id
+        """, (product_id,))
+        return self._rows_to_dicts(rows) if rows else []
+
+    def revenue_by_product(self, limit: int = None):
+        """
+        Units sold and revenue per product over all orders that are not cancelled.
+        Returns rows with product_id, name, units and revenue, best sellers first.
+        """
+        query = """
+            SELECT i.product_id, MAX(i.name) AS name, SUM(i.qty) AS units, SUM(i.price * i.qty) AS revenue
+            FROM order_items i JOIN orders o ON o.id = i.order_id
+            WHERE LOWER(o.status) != 'cancelled'
+            GROUP BY i.product_id
+            ORDER BY revenue DESC
+        """
+        params = ()
+        if limit:
+            query += " LIMIT ?"
+            params = (int(limit),)
+        return self.db.fetch_all(query, params) or []
 
     # ----- UPDATE -----
     def update_order(self, order_id: int, new_items: list = None, new_status: str = None):
-        """Update an order's items or status."""
-        existing = self.get_order_by_id(order_id) # getting the existing orders
-        if not existing:
-            return
-        # if new items were provided it converts them into JSON with json.dumps(new_item) otherwise it keeps the existing one 
-        updated_items = json.dumps(new_items) if new_items else json.dumps(existing["items"])
-        updated_status = new_status if new_status else existing["status"] # if a new status was given, use that 
-        # update the database
-        self.db.execute("""
-            UPDATE orders SET items_json = ?, status = ? WHERE id = ?
-        """, (updated_items, updated_status, order_id), commit=True)
+        """Update an order's items or status (and the user's order summary with it)."""
+        # update the database, if new items were provided they replace the old lines, otherwise the existing ones are kept
+        with self.db.transaction(): # read inside the transaction, so the summary change is based on the status we replace
+            existing = self.get_order_by_id(order_id) # getting the existing orders
+            if not existing:
+                return
+            updated_status = new_status if new_status else existing["status"] # if a new status was given, use that 
+            total, item_count = existing["total"], existing["item_count"]
+
+            self.db.execute("UPDATE orders SET status = ? WHERE id = ?", (updated_status, order_id), commit=True)
+            if new_items:
+                total, item_count = self._totals(new_items)
+                self.db.execute("UPDATE orders SET items_json = NULL, total = ?, item_count = ? WHERE id = ?",
+                                (total, item_count, order_id), commit=True) # the legacy items_json copy would be out of date
+                self.db.execute("DELETE FROM order_items WHERE order_id = ?", (order_id,), commit=True)
+                self._insert_items(order_id, new_items)
+
+            # What the order added to the summary before and after: cancelled orders count as nothing
+            was_counted = not self._is_cancelled(existing["status"])
+            counted = not self._is_cancelled(updated_status)
+            self._adjust_summary(existing["user_id"], int(counted) - int(was_counted),
+                                 (total if counted else 0) - (existing["total"] if was_counted else 0))
+            self.sales.change(existing, dict(existing, status=updated_status, total=total, item_count=item_count,
+                                             items=new_items or existing["items"]))
 
         print(f"Order {order_id} updated successfully.")
 
     # ----- DELETE -----
     def delete_order(self, order_id: int):
         """Delete an order from the system by its ID."""
-        order = self.get_order_by_id(order_id) # checks if the order exists 
-        if not order:
-            return
-
-        self.db.execute("DELETE FROM orders WHERE id = ?", (order_id,), commit=True) # delete the order by holding the ID which will remove the row 
+        with self.db.transaction(): # the order, its lines, the summary and rollup changes go together
+            order = self.get_order_by_id(order_id) # checks if the order exists 
+            if not order:
+                return
+            self.db.execute("DELETE FROM order_items WHERE order_id = ?", (order_id,), commit=True)
+            self.db.execute("DELETE FROM orders WHERE id = ?", (order_id,), commit=True) # delete the order by holding the ID which will remove the row 
+            if not self._is_cancelled(order["status"]):
+                self._adjust_summary(order["user_id"], -1, -order["total"])
+            # the deleted order may have been the user's last one
+            self.db.execute("""
+                UPDATE user_order_summary SET
+                    last_order_id = (SELECT MAX(id) FROM orders WHERE user_id = ?),
+                    last_order_at = (SELECT MAX(created_at) FROM orders WHERE user_id = ?)
+                WHERE user_id = ?
+            """, (order["user_id"], order["user_id"], order["user_id"]), commit=True)
+            self.sales.remove(order)
         print(f"Order {order_id} deleted successfully.")
 
 
 
+    # ----- Summaries -----
+    def get_user_summary(self, user_id: int) -> dict:
+        """Order count, total spent (both without cancelled orders) and last order of a user, from the summary table."""
+        row = self.db.fetch_one("SELECT * FROM user_order_summary WHERE user_id = ?", (user_id,))
+        if not row:
+            return {"user_id": user_id, "order_count": 0, "total_spent": 0.0, "last_order_id": None, "last_order_at": None}
+        return dict(row)
+
+    def top_customers(self, limit: int = 10):
+        """The customers who spent the most: rows with user_id, username, order_count, total_spent, last_order_at."""
+        return self.db.fetch_all("""
+            SELECT s.user_id, u.username, s.order_count, s.total_spent, s.last_order_at
+            FROM user_order_summary s LEFT JOIN users u ON u.id = s.user_id
+            ORDER BY s.total_spent DESC LIMIT ?
+        """, (int(limit),)) or [] # walks idx_user_summary_spent backwards, only `limit` rows are read
+
+    def rebuild_user_summaries(self):
+        """Recompute user_order_summary from the orders table (after loading orders with plain SQL)."""
+        with self.db.transaction():
+            self.db.execute("DELETE FROM user_order_summary", commit=True)
+            self.db.execute("""
+                INSERT INTO user_order_summary (user_id, order_count, total_spent, last_order_id, last_order_at)
+                SELECT user_id,
+                       SUM(LOWER(status) != 'cancelled'),
+                       ROUND(SUM(CASE WHEN LOWER(status) != 'cancelled' THEN total ELSE 0 END), 2),
+                       MAX(id),
+                       MAX(created_at)
+                FROM orders WHERE user_id IS NOT NULL
+                GROUP BY user_id
+            """, commit=True)
+
+    def _adjust_summary(self, user_id: int, order_change: int, spent_change: float):
+        if not order_change and not spent_change:
+            return
+        self.db.execute("""
+            UPDATE user_order_summary SET order_count = order_count + ?, total_spent = ROUND(total_spent + ?, 2)
+            WHERE user_id = ?
+        """, (order_change, spent_change or 0, user_id), commit=True)
+
     # ----- Helper -----
-    def _row_to_dict(self, row):
+    ITEMS_CHUNK = 500 # how many order ids go into one IN (...) query when loading lines
+
+    @staticmethod
+    def _totals(items: list):
+        """(total price, number of units) of a list of order lines."""
+        total = round(sum(item.get("price", 0) * item.get("qty", 0) for item in items), 2)
+        return total, sum(item.get("qty", 0) for item in items)
+
+    @staticmethod
+    def _is_cancelled(status) -> bool:
+        return (status or "").lower() == "cancelled"
+
+    def _insert_items(self, order_id: int, items: list):
+        """Write the lines of an order into order_items."""
+        for item in items:
+            self.db.execute("""
+                INSERT INTO order_items (order_id, product_id, name, price, qty)
+                VALUES (?, ?, ?, ?, ?)
+            """, (order_id, item.get("product_id"), item.get("name"), item.get("price"), item.get("qty")), commit=True)
+
+    def _load_items(self, order_ids: list) -> dict:
+        """Load the lines of many orders with a few IN (...) queries. Returns {order_id: [item, ...]}."""
+        items = {}
+        for start in range(0, len(order_ids), self.ITEMS_CHUNK):
+            chunk = order_ids[start:start + self.ITEMS_CHUNK]
+            placeholders = ", ".join("?" for _ in chunk)
+            rows = self.db.fetch_all(
+                f"SELECT * FROM order_items WHERE order_id IN ({placeholders}) ORDER BY id", tuple(chunk)
+            ) or []
+            for row in rows:
+                items.setdefault(row["order_id"], []).append({
+                    "product_id": row["product_id"],
+                    "name": row["name"],
+                    "price": row["price"],
+                    "qty": row["qty"],
+                })
+        return items
+
+    def _rows_to_dicts(self, rows):
+        """Convert SQLite order rows to dictionaries, with their lines loaded from order_items."""
+        items = self._load_items([row["id"] for row in rows])
+        return [self._row_to_dict(row, items.get(row["id"])) for row in rows]
+
+    def _row_to_dict(self, row, items=None):
         """Convert an SQLite row to a dictionary."""
-        try:# json.loads() converts the json string into a python dictionary/list
-            items = json.loads(row["items_json"]) # row["items_json"] is a string like [{"product_id":5,"qty":2}]
-        except json.JSONDecodeError:
-            items = []
+        if items is None and row["items_json"]: # an old order the order_items backfill hasn't reached yet
+            try:# json.loads() converts the json string into a python dictionary/list
+                items = json.loads(row["items_json"]) # row["items_json"] is a string like [{"product_id":5,"qty":2}]
+            except json.JSONDecodeError:
+                items = []
+
+        items = items or []
+        total, item_count = row["total"], row["item_count"]
+        if total is None: # an old order the totals backfill hasn't reached yet
+            total, item_count = self._totals(items)
 
         return { # This makes sure every order is always returned in the same nice format 
             "id": row["id"],
             "user_id": row["user_id"],
             "items": items,
             "status": row["status"],
-            "created_at": row["created_at"]
+            "created_at": row["created_at"],
+            "total": total,
+            "item_count": item_count,
         }
 
 
 '''
 The order gets saved in database like this 
 
-id-1        user_id-2       items_json-[{"product_id":5,"qty": 3}]      status-pending      Created_at-2025-11-03T20:45:00
+orders:      id-1   user_id-2   status-pending   created_at-2025-11-03T20:45:00   total-2550.0   item_count-3
+order_items: order_id-1   product_id-5   name-Mouse   price-850.0   qty-3
 
-'''
\ No newline at end of file
+user_order_summary: user_id-2   order_count-1   total_spent-2550.0   last_order_id-1   last_order_at-2025-11-03T20:45:00
+
+(orders created before order_items existed also keep their old items_json column)
+'''
@@ -9,13 +9,76 @@ That db object handles things like:-
 So Product focuses on what to do, while db handles how to do it. 
 '''
 
+import re
+import threading
+import weakref
+from collections import OrderedDict
 from datetime import datetime
 
+from core.cache import LRUCache
+from core.pagination import fetch_page, DEFAULT_PAGE_SIZE
+
+
+class _StockShortage(Exception):
+    """Internal: rolls back a reduce_stock_many() batch."""
+
+
+class _Versions:
+    """
+    Internal: per-product change counters of one database, at most `maxsize` of them.
+    Every bump takes the next value of one clock, so the least recently changed product has the lowest value.
+    When it is dropped to make room, `floor` rises to its value, and products without an entry report the
+    floor: a dropped product never goes back to a value it had before (which would make old quotes look valid).
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.clock = 0
+        self.floor = 0
+        self._ids = OrderedDict() # product id -> value, lowest value first
+        self._lock = threading.Lock()
+
+    def bump(self, product_ids):
+        with self._lock:
+            for pid in product_ids:
+                self.clock += 1
+                self._ids[pid] = self.clock
+                self._ids.move_to_end(pid)
+            while len(self._ids) > self.maxsize:
+                _, self.floor = self._ids.popitem(last=False)
+
+    def get(self, product_id) -> int:
+        with self._lock:
+            return self._ids.get(product_id, self.floor)
+
+    def get_many(self, product_ids) -> tuple:
+        with self._lock:
+            return tuple(self._ids.get(pid, self.floor) for pid in product_ids)
+
+    def __len__(self):
+        return len(self._ids)
+
+
 class Product:
     """Handles all product-related database operations."""
 
+    CACHE_SIZE = 2048 # how many product rows are kept in memory per database
+    VERSIONS_SIZE = 100_000 # how many products' change counters are remembered per database
+
+    # Product(db) is created all over the place (every cart action makes a new one), so the cache can't live on the instance.
+    # It is shared by every Product built on the same DatabaseManager, and goes away together with that DatabaseManager.
+    _caches = weakref.WeakKeyDictionary()
+    _versions = weakref.WeakKeyDictionary() # per database: {product_id: change counter}, see versions_of()
+    _caches_lock = threading.Lock()
+
     def __init__(self, db):# This saves the DatabaseManager in every instances so every method regarding that isntance/object can talk to database . 
         self.db = db
+        with Product._caches_lock:
+            if db not in Product._caches:
+                Product._caches[db] = LRUCache(Product.CACHE_SIZE)
+                Product._versions[db] = _Versions(Product.VERSIONS_SIZE)
+            self.cache = Product._caches[db] # read-through cache of product rows keyed by id
+            self.versions = Product._versions[db]
 
     # ----- CREATE -----
     def add_product(self, name: str, price: float, stock: int = 0, description: str = "") -> bool:# input type and return type 
@@ -33,20 +96,84 @@ class Product:
     # ----- READ -----
     # These methods returns a Tuple or Dictionary with the products information 
     def get_by_id(self, product_id: int): # Fetches one specific product using its ID
-        """Fetch a single product by ID."""
-        return self.db.fetch_one("SELECT * FROM products WHERE id = ?", (product_id,)) # id indicates the specific row
+        """Fetch a single product by ID (served from the cache when possible)."""
+        product = self.cache.get(product_id)
+        if product is None:
+            version = self.versions.get(product_id) # if this changes before put(), the row we read may be old already
+            product = self.db.fetch_one("SELECT * FROM products WHERE id = ?", (product_id,)) # id indicates the specific row
+            if product and self.versions.get(product_id) == version:
+                self.cache.put(product_id, product)
+        return product
+
+    def get_many(self, product_ids, fresh: bool = False) -> dict:
+        """
+        Fetch several products with one query. Returns {product_id: row}; missing ids are left out.
+        fresh=True skips the cache lookup (another process may have changed stock) and refreshes it instead.
+        """
+        ids = list(dict.fromkeys(product_ids)) # remove duplicates but keep the order
+        found = {}
+        missing = []
+        for pid in ids: # take what the cache already has, only query the rest
+            product = None if fresh else self.cache.get(pid)
+            if product is None:
+                missing.append(pid)
+            else:
+                found[pid] = product
+        if not missing:
+            return found
+
+        versions = dict(zip(missing, self.versions.get_many(missing))) # see get_by_id()
+        placeholders = ", ".join("?" for _ in missing) # one ? per id -> "?, ?, ?"
+        rows = self.db.fetch_all(f"SELECT * FROM products WHERE id IN ({placeholders})", tuple(missing))
+        for row in rows or []:
+            if self.versions.get(row["id"]) == versions[row["id"]]: # changed while we read it: don't cache
+                self.cache.put(row["id"], row)
+            found[row["id"]] = row
+        return found
 
     def list_products(self): # Fetch every products from the table 
         """Return all products."""
         return self.db.fetch_all("SELECT * FROM products ORDER BY id ASC") # ORDERED BY id ASC ensures results come in order (ID 1,2,3...)
 
-    def search_products(self, keyword: str):
-        """Find products matching a search keyword (name or description)."""
+    def list_products_page(self, token: str = None, limit: int = DEFAULT_PAGE_SIZE) -> dict:
+        """
+        Return one page of products in ID order: {"items": [...], "next": token, "prev": token}.
+        Pass the "next" or "prev" token back in to move between pages (None = first page).
+        """
+        return fetch_page(self.db, "SELECT * FROM products", token=token, limit=limit)
+
+    def search_products(self, keyword: str, limit: int = None):
+        """
+        Find products matching a search keyword (name or description).
+        Uses the FTS5 index when available: every word is a prefix match ("lap mou" finds "Laptop Mouse"),
+        all words must match, and results are ranked by bm25 relevance with name hits weighted above description hits.
+        """
+        terms = re.findall(r"\w+", keyword) # split into words and drop punctuation, so user input can't break the MATCH syntax
+        if not getattr(self.db, "has_fts5", False) or not terms:
+            return self._search_like(keyword, limit)
+
+        match = " ".join(f'"{term}"*' for term in terms) # "lap"* "mou"* -> both prefixes must match
+        query = """
+            SELECT p.* FROM products_fts
+            JOIN products p ON p.id = products_fts.rowid
+            WHERE products_fts MATCH ?
+            ORDER BY bm25(products_fts, 10.0, 1.0)
+        """ # bm25 gives lower scores to better matches, the weights make the name count 10x the description
+        params = (match,)
+        if limit:
+            query += " LIMIT ?"
+            params += (int(limit),)
+        return self.db.fetch_all(query, params)
+
+    def _search_like(self, keyword: str, limit: int = None):
+        """Fallback search for SQLite builds without FTS5 (scans the whole table)."""
         pattern = f"%{keyword}%" # the % means any number or characters it's like sufix prefix of the key word like (%mouse%) (optical mouse price)
-        return self.db.fetch_all(
-            "SELECT * FROM products WHERE name LIKE ? OR description LIKE ?", # LIKE is a SQL keyword for pattern matching 
-            (pattern, pattern)
-        )
+        query = "SELECT * FROM products WHERE name LIKE ? OR description LIKE ?" # LIKE is a SQL keyword for pattern matching 
+        params = (pattern, pattern)
+        if limit:
+            query += " LIMIT ?"
+            params += (int(limit),)
+        return self.db.fetch_all(query, params)
 
     # ----- UPDATE -----
     # This is a dynamic updater which means it can change one field(column) or multiple or every single one . 
@@ -75,6 +202,7 @@ class Product:
         values.append(product_id) # after gathering the updated information it adds the product_id to the end of the values list (for the WHERE id = ? part)
         query = f"UPDATE products SET {', '.join(updates)} WHERE id = ?" # building the final SQL query
         self.db.execute(query, tuple(values), commit=True) # executing the query and saving the changes in database 
+        self.invalidate(product_id)
         print(f"Product ID {product_id} updated successfully.")
         return True
 
@@ -87,26 +215,68 @@ class Product:
             return False
 
         self.db.execute("DELETE FROM products WHERE id = ?", (product_id,), commit=True) # this removes the row permanently and commits the changes 
+        self.invalidate(product_id)
         print(f"Product ID {product_id} deleted successfully.")
         return True
 
     # ----- STOCK HELPERS -----
     def reduce_stock(self, product_id: int, qty: int):
-        """Reduce product stock when an order is placed."""
-        product = self.get_by_id(product_id)
-        if not product:
-            print("Product not found.")
+        """
+        Reduce product stock when an order is placed.
+        The check and the subtraction are one statement (UPDATE ... WHERE stock >= qty), so two
+        processes can't both see enough stock and oversell: the second one simply changes no row.
+        """
+        if qty <= 0:
+            print("Quantity must be positive.")
             return False
 
-        current_stock = product["stock"]
-        if current_stock < qty:
+        changed = self.db.execute(
+            "UPDATE products SET stock = stock - ? WHERE id = ? AND stock >= ?", # subtract the number ordered, only if that many are left
+            (qty, product_id, qty), commit=True
+        )
+        if changed is None: # execute() already printed the [DB ERROR] (e.g. gave up waiting for the lock)
+            print("Stock was not changed because of a database error, please try again.")
+            return False
+        if changed != 1:
+            # only the failure path needs a read, to tell the two reasons apart
+            if not self.db.fetch_one("SELECT 1 FROM products WHERE id = ?", (product_id,)):
+                print("Product not found.")
+            else:
+                print("Not enough products in stock.")
+            return False
+
+        self.invalidate(product_id)
+        return True
+
+    def reduce_stock_many(self, items) -> bool:
+        """
+        Reduce stock for many (product_id, qty) pairs at once, all or nothing.
+        Every pair gets the same guarded UPDATE, sent with one executemany(); if fewer rows changed than
+        pairs were given, some product was missing or short and the whole batch is rolled back.
+        Inside a caller's transaction only this batch is undone (SAVEPOINT), the caller decides what's next.
+        """
+        totals = {} # the same product twice in the list -> one update with the summed quantity
+        for product_id, qty in items:
+            if qty <= 0:
+                print("Quantity must be positive.")
+                return False
+            totals[product_id] = totals.get(product_id, 0) + qty
+        if not totals:
+            return True
+
+        try:
+            with self.db.transaction():
+                changed = self.db.execute_many(
+                    "UPDATE products SET stock = stock - ? WHERE id = ? AND stock >= ?",
+                    [(qty, pid, qty) for pid, qty in totals.items()]
+                )
+                if changed != len(totals):
+                    raise _StockShortage()
+        except _StockShortage:
             print("Not enough products in stock.")
             return False
 
-        self.db.execute(
-            "UPDATE products SET stock = stock - ? WHERE id = ?", # subtract the number ordered 
-            (qty, product_id), commit=True
-        )
+        self.invalidate(*totals)
         return True
 
     def increase_stock(self, product_id: int, qty: int):
@@ -115,18 +285,53 @@ class Product:
             "UPDATE products SET stock = stock + ? WHERE id = ?", # adds the number of the ordered product back to stock 
             (qty, product_id), commit=True
         )
+        self.invalidate(product_id)
         return True
 
+    # ----- CACHE -----
+    def invalidate(self, *product_ids):
+        """
+        Drop cached rows after the products changed.
+        Dropped now, and again once the surrounding transaction ends, so a row read
+        (and cached) while the transaction was still open can't outlive it.
+        """
+        for pid in product_ids:
+            self.cache.pop(pid)
+        self._bump(product_ids)
+
+        def drop_again():
+            for pid in product_ids:
+                self.cache.pop(pid)
+            self._bump(product_ids)
+        self.db.call_after_transaction(drop_again)
+
+    def _bump(self, product_ids):
+        self.versions.bump(product_ids)
+
+    def versions_of(self, product_ids) -> tuple:
+        """
+        Change counters of the given products, e.g. (3, 0, 1).
+        Every invalidate() bumps the counter of the products it names, so anything computed from product rows
+        (like a cart quote) is still valid as long as this tuple hasn't changed. No database query involved.
+        """
+        return self.versions.get_many(product_ids)
+
+    def cache_stats(self) -> dict:
+        """Size and hit/miss/eviction counters of the product cache."""
+        return self.cache.stats()
+
 
 '''
 All the methods of product.py:->
     1. add_product()
     2. get_by_id()
-    3. list_products()
-    4. search_products()
-    5. update_product()
-    6. delete_product()
-    7. reduce_product()
-    8. increase_product()
+    3. get_many()
+    4. list_products() / list_products_page()
+    5. search_products()
+    6. update_product()
+    7. delete_product()
+    8. reduce_product() / reduce_stock_many()
+    9. increase_product()
+    10. invalidate() / versions_of() / cache_stats()
 
 '''
\ No newline at end of file
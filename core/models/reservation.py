@@ -0,0 +1,104 @@
+'''
+Time-limited stock reservations (holds) for carts.
+
+When a customer puts something in the cart we "hold" that quantity for a while (the TTL):-
+    1. available stock = products.stock - every active (not expired) hold of other customers
+    2. a hold is only granted if that much is available, so carts can't promise more than exists
+    3. holds that are not checked out in time expire and stop counting; the sweeper deletes them later
+products.stock itself only changes at checkout, when the held quantity is really sold.
+'''
+
+import time
+
+DEFAULT_TTL = 15 * 60 # seconds a cart keeps its items held
+
+
+class Reservation:
+    """Handles stock holds in the stock_reservations table."""
+
+    def __init__(self, db, ttl: float = DEFAULT_TTL):
+        self.db = db
+        self.ttl = ttl
+
+    # ----- HOLD -----
+    def hold(self, user_id: int, product_id: int, qty: int):
+        """
+        Hold qty units of a product for this user (replacing the user's previous hold of it) and restart the TTL.
+        The availability check and the write are one INSERT ... SELECT ... WHERE statement,
+        so two customers can't both be granted the last unit.
+        Returns True if held, False if the product doesn't exist or not enough is available,
+        and None if the database failed (execute() already printed the [DB ERROR]), so callers
+        don't report a locked database as missing stock.
+        """
+        now = time.time()
+        changed = self.db.execute("""
+            INSERT INTO stock_reservations (user_id, product_id, qty, expires_at)
+            SELECT ?, p.id, ?, ? FROM products p
+            WHERE p.id = ?
+              AND p.stock - COALESCE((
+                    SELECT SUM(r.qty) FROM stock_reservations r
+                    WHERE r.product_id = p.id AND r.expires_at > ? AND r.user_id != ?
+                  ), 0) >= ?
+            ON CONFLICT (user_id, product_id) DO UPDATE SET qty = excluded.qty, expires_at = excluded.expires_at
+        """, (user_id, qty, now + self.ttl, product_id, now, user_id, qty), commit=True)
+        if changed is None:
+            return None
+        return changed == 1
+
+    def release(self, user_id: int, product_id: int = None) -> int:
+        """Drop the user's hold on one product, or on everything when product_id is None."""
+        if product_id is None:
+            return self.db.execute("DELETE FROM stock_reservations WHERE user_id = ?", (user_id,), commit=True) or 0
+        return self.db.execute(
+            "DELETE FROM stock_reservations WHERE user_id = ? AND product_id = ?", (user_id, product_id), commit=True
+        ) or 0
+
+    # ----- READ -----
+    def get_user_holds(self, user_id: int) -> dict:
+        """Active holds of a user: {product_id: qty}."""
+        rows = self.db.fetch_all(
+            "SELECT product_id, qty FROM stock_reservations WHERE user_id = ? AND expires_at > ?",
+            (user_id, time.time())
+        )
+        return {row["product_id"]: row["qty"] for row in rows} if rows else {}
+
+    def available_stock(self, product_id: int, user_id: int = None):
+        """
+        Stock minus active holds (the user's own hold is not subtracted when user_id is given).
+        Returns None if the product doesn't exist.
+        """
+        row = self.db.fetch_one("""
+            SELECT p.stock - COALESCE((
+                SELECT SUM(r.qty) FROM stock_reservations r
+                WHERE r.product_id = p.id AND r.expires_at > ? AND r.user_id IS NOT ?
+            ), 0) AS available
+            FROM products p WHERE p.id = ?
+        """, (time.time(), user_id, product_id))
+        return row["available"] if row else None
+
+    # ----- EXPIRY -----
+    def release_expired(self, batch_size: int = 500) -> int:
+        """
+        Delete expired holds, batch_size rows per transaction so the sweeper never holds the
+        write lock for long. Returns how many were deleted.
+        """
+        released = 0
+        while True:
+            deleted = self.db.execute("""
+                DELETE FROM stock_reservations WHERE id IN (
+                    SELECT id FROM stock_reservations WHERE expires_at <= ? LIMIT ?
+                )
+            """, (time.time(), batch_size), commit=True) or 0
+            released += deleted
+            if deleted < batch_size:
+                return released
+
+
+'''
+All the methods of reservation.py:->
+    1. hold()
+    2. release()
+    3. get_user_holds()
+    4. available_stock()
+    5. release_expired()
+'''
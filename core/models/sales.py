@@ -0,0 +1,160 @@
+'''
+Sales reports for admins, read from rollup tables instead of from every order.
+
+The rollups (created by migration 12) are tiny compared to orders and order_items:-
+    1. sales_daily:           one row per day           -> orders, units, revenue
+    2. sales_product_monthly: one row per product/month -> units, revenue
+    3. sales_status:          one row per order status  -> orders, revenue (cancelled included)
+Days and products only count orders that are not cancelled.
+
+The Order model calls add() / change() / remove() inside the same transaction as the order write, so a
+report never sees an order without its rollup change or the other way round. A report then reads at most
+a few hundred rows, however many orders the shop has: revenue by day over 90 days is 90 primary key rows,
+the top products of a month walk the (month, revenue) index backwards and stop after `limit` rows.
+'''
+
+from datetime import date, timedelta
+
+
+class SalesReport:
+    """Maintains and reads the sales rollup tables."""
+
+    def __init__(self, db):
+        self.db = db
+
+    # ----- Maintenance (called by Order inside its transaction) -----
+    def add(self, order: dict):
+        """Count a new order (dict with status, created_at, total, item_count and items)."""
+        self.change(None, order)
+
+    def remove(self, order: dict):
+        """Take a deleted order back out of the rollups."""
+        self.change(order, None)
+
+    def change(self, old: dict, new: dict):
+        """Move an order from its old state (None if it's new) to its new state (None if it's deleted)."""
+        if old:
+            self._add_status(old, -1)
+        if new:
+            self._add_status(new, +1)
+
+        old_counted = bool(old) and self._counted(old)
+        new_counted = bool(new) and self._counted(new)
+        if old_counted and new_counted and old["items"] == new["items"] and old["created_at"] == new["created_at"]:
+            return # e.g. pending -> shipped: the day and product rows don't change, skip their writes
+        if old_counted:
+            self._add_sales(old, -1)
+        if new_counted:
+            self._add_sales(new, +1)
+
+    def rebuild(self):
+        """Recompute every rollup from orders and order_items (after loading orders with plain SQL)."""
+        with self.db.transaction():
+            for table in ("sales_daily", "sales_product_monthly", "sales_status"):
+                self.db.execute(f"DELETE FROM {table}", commit=True)
+            self.db.execute("""
+                INSERT INTO sales_daily (day, orders, units, revenue)
+                SELECT SUBSTR(created_at, 1, 10), COUNT(*), SUM(item_count), ROUND(SUM(total), 2)
+                FROM orders WHERE LOWER(status) != 'cancelled' AND created_at IS NOT NULL
+                GROUP BY SUBSTR(created_at, 1, 10)
+            """, commit=True)
+            self.db.execute("""
+                INSERT INTO sales_product_monthly (month, product_id, name, units, revenue)
+                SELECT SUBSTR(o.created_at, 1, 7), i.product_id, MAX(i.name), SUM(i.qty), ROUND(SUM(i.price * i.qty), 2)
+                FROM order_items i JOIN orders o ON o.id = i.order_id
+                WHERE LOWER(o.status) != 'cancelled' AND o.created_at IS NOT NULL AND i.product_id IS NOT NULL
+                GROUP BY SUBSTR(o.created_at, 1, 7), i.product_id
+            """, commit=True)
+            self.db.execute("""
+                INSERT INTO sales_status (status, orders, revenue)
+                SELECT LOWER(status), COUNT(*), ROUND(SUM(total), 2) FROM orders GROUP BY LOWER(status)
+            """, commit=True)
+
+    def _add_status(self, order: dict, sign: int):
+        self.db.execute("""
+            INSERT INTO sales_status (status, orders, revenue) VALUES (?, ?, ?)
+            ON CONFLICT (status) DO UPDATE SET
+                orders = orders + excluded.orders,
+                revenue = ROUND(revenue + excluded.revenue, 2)
+        """, ((order["status"] or "").lower(), sign, sign * (order["total"] or 0)), commit=True)
+
+    def _add_sales(self, order: dict, sign: int):
+        created_at = order["created_at"] or ""
+        self.db.execute("""
+            INSERT INTO sales_daily (day, orders, units, revenue) VALUES (?, ?, ?, ?)
+            ON CONFLICT (day) DO UPDATE SET
+                orders = orders + excluded.orders,
+                units = units + excluded.units,
+                revenue = ROUND(revenue + excluded.revenue, 2)
+        """, (created_at[:10], sign, sign * (order["item_count"] or 0), sign * (order["total"] or 0)), commit=True)
+
+        lines = [(created_at[:7], item["product_id"], item.get("name"), sign * item.get("qty", 0),
+                  sign * item.get("price", 0) * item.get("qty", 0))
+                 for item in order["items"] if item.get("product_id")]
+        if lines:
+            self.db.execute_many("""
+                INSERT INTO sales_product_monthly (month, product_id, name, units, revenue) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (month, product_id) DO UPDATE SET
+                    name = COALESCE(excluded.name, name),
+                    units = units + excluded.units,
+                    revenue = ROUND(revenue + excluded.revenue, 2)
+            """, lines)
+
+    @staticmethod
+    def _counted(order: dict) -> bool:
+        return (order["status"] or "").lower() != "cancelled"
+
+    # ----- Reports -----
+    def revenue_by_day(self, days: int = 90, end: date = None):
+        """
+        One dict per day for the last `days` days up to end (default today), oldest first:
+        {"day", "orders", "units", "revenue"}. Days without sales are included with zeros.
+        """
+        end = end or date.today()
+        start = end - timedelta(days=max(1, int(days)) - 1)
+        rows = self.db.fetch_all(
+            "SELECT * FROM sales_daily WHERE day BETWEEN ? AND ? ORDER BY day", (start.isoformat(), end.isoformat())
+        ) or []
+        found = {row["day"]: row for row in rows}
+        report = []
+        for n in range((end - start).days + 1):
+            day = (start + timedelta(days=n)).isoformat()
+            row = found.get(day)
+            report.append({"day": day, "orders": row["orders"] if row else 0, "units": row["units"] if row else 0,
+                           "revenue": row["revenue"] if row else 0.0})
+        return report
+
+    def revenue_by_month(self, months: int = 12):
+        """Orders, units and revenue per month (YYYY-MM) for the last `months` months with sales, newest first."""
+        return self.db.fetch_all("""
+            SELECT SUBSTR(day, 1, 7) AS month, SUM(orders) AS orders, SUM(units) AS units, ROUND(SUM(revenue), 2) AS revenue
+            FROM sales_daily GROUP BY SUBSTR(day, 1, 7) ORDER BY month DESC LIMIT ?
+        """, (int(months),)) or [] # at most 366 rows a year to group, however many orders
+
+    def top_products(self, month: str = None, limit: int = 20):
+        """Best selling products of a month (YYYY-MM, default this month) by revenue: product_id, name, units, revenue."""
+        month = month or date.today().isoformat()[:7]
+        return self.db.fetch_all("""
+            SELECT product_id, name, units, revenue FROM sales_product_monthly
+            WHERE month = ? AND units > 0 ORDER BY revenue DESC LIMIT ?
+        """, (month, int(limit))) or []
+
+    def orders_by_status(self):
+        """Number of orders and their value per status, most orders first."""
+        return self.db.fetch_all(
+            "SELECT status, orders, revenue FROM sales_status WHERE orders > 0 ORDER BY orders DESC"
+        ) or []
+
+    def overview(self) -> dict:
+        """Headline numbers: revenue and orders today, this month and overall (cancelled orders left out)."""
+        today = date.today().isoformat()
+        row = self.db.fetch_one("""
+            SELECT
+                (SELECT COALESCE(SUM(orders), 0) FROM sales_daily WHERE day = ?) AS orders_today,
+                (SELECT COALESCE(SUM(revenue), 0) FROM sales_daily WHERE day = ?) AS revenue_today,
+                (SELECT COALESCE(SUM(orders), 0) FROM sales_daily WHERE day >= ?) AS orders_this_month,
+                (SELECT COALESCE(SUM(revenue), 0) FROM sales_daily WHERE day >= ?) AS revenue_this_month,
+                (SELECT COALESCE(SUM(orders), 0) FROM sales_status WHERE status != 'cancelled') AS orders_total,
+                (SELECT COALESCE(SUM(revenue), 0) FROM sales_status WHERE status != 'cancelled') AS revenue_total
+        """, (today, today, today[:8] + "01", today[:8] + "01"))
+        return {key: (round(row[key], 2) if isinstance(row[key], float) else row[key]) for key in row.keys()} if row else {}
@@ -0,0 +1,82 @@
+'''
+Keyset (cursor-based) pagination.
+
+Instead of OFFSET (which makes SQLite walk over every skipped row), a page remembers the id of its
+first and last row and the next query starts right after it:-
+    next page     -> WHERE id > last_id  ORDER BY id ASC  LIMIT n
+    previous page -> WHERE id < first_id ORDER BY id DESC LIMIT n (and flip the rows back)
+With an index on id (every primary key has one) each page costs the same no matter how deep you are.
+
+The position is handed to the caller as an opaque token string, so callers never build the WHERE part themselves.
+'''
+
+import base64
+import json
+
+DEFAULT_PAGE_SIZE = 20
+
+
+def encode_token(key_value, direction: str) -> str:
+    """Pack a position (last/first id seen + direction) into a URL-safe string."""
+    raw = json.dumps({"k": key_value, "d": direction}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_token(token: str):
+    """Unpack a token made by encode_token. Raises ValueError for anything else."""
+    try:
+        padded = token + "=" * (-len(token) % 4) # put back the padding we stripped
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        direction = data["d"]
+        key_value = data["k"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid page token.")
+    if direction not in ("next", "prev"):
+        raise ValueError("Invalid page token.")
+    return key_value, direction
+
+
+def fetch_page(db, select: str, where: list = None, params: tuple = (), token: str = None,
+               limit: int = DEFAULT_PAGE_SIZE, key: str = "id") -> dict:
+    """
+    Run one keyset-paginated query.
+        select : "SELECT ... FROM table" without WHERE / ORDER BY
+        where  : extra conditions joined with AND, e.g. ["user_id = ?"]
+        params : values for the ? in `where`
+        token  : None for the first page, otherwise a "next"/"prev" token from an earlier page
+        key    : unique, indexed column the pages are ordered by
+    Returns {"items": [rows], "next": token or None, "prev": token or None}.
+    """
+    limit = max(1, int(limit))
+    conditions = list(where or [])
+    values = list(params)
+
+    direction = "next"
+    if token:
+        key_value, direction = decode_token(token)
+        conditions.append(f"{key} > ?" if direction == "next" else f"{key} < ?")
+        values.append(key_value)
+
+    query = select
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += f" ORDER BY {key} {'ASC' if direction == 'next' else 'DESC'} LIMIT ?"
+    values.append(limit + 1) # one extra row tells us whether there is another page after this one
+
+    rows = list(db.fetch_all(query, tuple(values)) or [])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if direction == "prev":
+        rows.reverse() # we read backwards, show them in normal order again
+
+    if not rows:
+        return {"items": [], "next": None, "prev": None}
+
+    if direction == "next":
+        next_token = encode_token(rows[-1][key], "next") if has_more else None
+        prev_token = encode_token(rows[0][key], "prev") if token else None # the first page has nothing before it
+    else:
+        next_token = encode_token(rows[-1][key], "next") # we came from there, so there is always a next page
+        prev_token = encode_token(rows[0][key], "prev") if has_more else None
+
+    return {"items": rows, "next": next_token, "prev": prev_token}
@@ -0,0 +1,183 @@
+'''
+Connection pool for the DatabaseManager.
+
+A single sqlite3 connection (and a single cursor) can't be shared by two threads at the same time,
+their result sets would get mixed up. The pool keeps a bounded number of connections and hands them out:-
+    1. A thread checks a connection out (waiting if all of them are busy)
+    2. Runs its queries on it
+    3. Returns it so another thread can use it
+
+Every thread remembers the connection it has checked out, so nested calls on the same thread
+(for example a query inside another query's loop) reuse that connection instead of taking a second one.
+'''
+
+import queue # thread-safe FIFO queue, used to hold the idle connections
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PoolTimeout(sqlite3.OperationalError):
+    """Raised when no connection became free within the checkout timeout."""
+
+
+class ConnectionPool:
+    """
+    Bounded pool of sqlite3 connections with per-thread checkout.
+    Connections are created lazily, up to `size`.
+    """
+
+    def __init__(self, connect, size: int = 1, timeout: float = 30.0):
+        """
+        connect : callable that opens and configures a new sqlite3.Connection
+        size    : maximum number of connections the pool will ever open
+        timeout : seconds a thread waits for a free connection before PoolTimeout
+        """
+        if size < 1:
+            raise ValueError("Pool size must be at least 1.")
+
+        self._connect = connect
+        self.size = size
+        self.timeout = timeout
+
+        self._idle = queue.LifoQueue() # LIFO so the most recently used (warm cache) connection is reused first
+        self._all = [] # every connection ever opened, used by close()
+        self._lock = threading.Lock() # protects _all and the counters below
+        self._local = threading.local() # per-thread: the checked out connection and how deep the nesting is
+        self._closed = False
+
+        # Metrics
+        self._checkouts = 0
+        self._waits = 0 # how many checkouts had to wait because the pool was exhausted
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._timeouts = 0
+
+    # ----- Checkout / Return -----
+    def acquire(self) -> sqlite3.Connection:
+        """Check out a connection for the current thread (re-entrant)."""
+        local = self._local
+        if getattr(local, "depth", 0) > 0: # this thread already holds one, so reuse it
+            local.depth += 1
+            return local.conn
+
+        if self._closed:
+            raise sqlite3.ProgrammingError("Connection pool is closed.")
+
+        conn = self._take()
+        local.conn = conn
+        local.depth = 1
+        return conn
+
+    def release(self):
+        """Give back the current thread's connection once the outermost user is done."""
+        local = self._local
+        if getattr(local, "depth", 0) == 0:
+            return
+
+        local.depth -= 1
+        if local.depth > 0:
+            return
+
+        conn = local.conn
+        local.conn = None
+        if self._closed:
+            conn.close()
+            return
+
+        if conn.in_transaction: # someone left a transaction open, never hand a dirty connection to the next thread
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Context manager form: with pool.connection() as conn: ..."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release()
+
+    def current(self):
+        """Return the connection checked out by this thread, or None."""
+        if getattr(self._local, "depth", 0) > 0:
+            return self._local.conn
+        return None
+
+    def _take(self) -> sqlite3.Connection:
+        """Get an idle connection, open a new one, or wait for one to come back."""
+        try:
+            conn = self._idle.get_nowait()
+            self._count_checkout(0.0, waited=False)
+            return conn
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_open = len(self._all) < self.size
+            if can_open:
+                self._all.append(None) # reserve the slot while the connection is being opened
+
+        if can_open:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._lock:
+                    self._all.remove(None)
+                raise
+            with self._lock:
+                self._all[self._all.index(None)] = conn
+            self._count_checkout(0.0, waited=False)
+            return conn
+
+        # The pool is exhausted, so wait for another thread to return a connection
+        started = time.perf_counter()
+        try:
+            conn = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            with self._lock:
+                self._timeouts += 1
+            raise PoolTimeout(f"No database connection free after {self.timeout}s (pool size {self.size}).")
+        self._count_checkout(time.perf_counter() - started, waited=True)
+        return conn
+
+    def _count_checkout(self, waited_for: float, waited: bool):
+        with self._lock:
+            self._checkouts += 1
+            if waited:
+                self._waits += 1
+                self._wait_total += waited_for
+                self._wait_max = max(self._wait_max, waited_for)
+
+    # ----- Metrics -----
+    def stats(self) -> dict:
+        """Return a snapshot of pool usage and checkout wait times (seconds)."""
+        with self._lock:
+            opened = len([c for c in self._all if c is not None])
+            return {
+                "size": self.size,
+                "opened": opened,
+                "idle": self._idle.qsize(),
+                "in_use": opened - self._idle.qsize(),
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "wait_total": self._wait_total,
+                "wait_avg": self._wait_total / self._waits if self._waits else 0.0,
+                "wait_max": self._wait_max,
+                "timeouts": self._timeouts,
+            }
+
+    # ----- Shutdown -----
+    def close(self):
+        """Close every idle connection. Connections still in use are closed when they are released."""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+        held = self.current()
+        if held is not None: # the closing thread may itself hold one (e.g. inside `with DatabaseManager()`)
+            held.close()
@@ -0,0 +1,523 @@
+'''
+Headless HTTP/JSON API over the existing models and services (standard library only).
+
+main.py is an interactive console program; this runs the same shop as a web API so it can sit behind a
+load balancer and be load-tested:-
+    1. A fixed pool of worker threads serves the connections (no new thread per request)
+    2. HTTP/1.1 keep-alive: a client sends many requests over one connection; idle connections are
+       closed after `idle_timeout` seconds so they don't hold a worker forever
+    3. Every worker uses the DatabaseManager connection pool (pool_size = workers)
+    4. Users log in with POST /login and send the token back as "Authorization: Bearer <token>"
+    5. GET /admin/stats shows requests per second, latency per route, pool, lock and cache numbers
+
+Run it from the project folder:
+    python -m core.server
+    python -m core.server --port 8080 --workers 32 --profile throughput --quiet
+
+Endpoints (request and response bodies are JSON):
+    GET    /health
+    POST   /register                    {"username", "password"}
+    POST   /login                       {"username", "password"} -> {"token", "user"}
+    POST   /logout                      (auth)
+    GET    /me                          (auth)
+    GET    /products?cursor=&limit=     one page of products {"items", "next", "prev"}
+    GET    /products/search?q=&limit=
+    GET    /products/<id>
+    GET    /cart                        (auth) priced cart, see CartService.quote()
+    POST   /cart/items                  (auth) {"product_id", "qty"}
+    DELETE /cart/items/<product_id>     (auth)
+    POST   /checkout                    (auth)
+    GET    /orders?cursor=&limit=       (auth) your orders
+    GET    /orders/<id>                 (auth) one of your orders (any order for admins)
+    POST   /admin/products              (admin) {"name", "price", "stock", "description"}
+    PATCH  /admin/products/<id>         (admin) any of {"name", "price", "stock", "description"}
+    DELETE /admin/products/<id>         (admin)
+    POST   /admin/products/<id>/stock   (admin) {"change": +n or -n}
+    GET    /admin/orders?cursor=&limit= (admin)
+    POST   /admin/orders/<id>/status    (admin) {"status"}
+    POST   /admin/users/<id>/role       (admin) {"role": "admin" or "customer"}
+    GET    /admin/reports/sales?days=&month=&limit=   (admin) overview, revenue by day, top products, orders by status
+    GET    /admin/reports/customers?limit=            (admin) customers who spent the most
+    GET    /admin/stats                 (admin)
+'''
+
+import argparse
+import json
+import os
+import re
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from core.models.order import Order
+from core.models.product import Product
+from core.services.admin_service import AdminService
+from core.services.auth_service import AuthService
+from core.services.cart_service import CartService
+from core.services.cart_store import MemoryCartStore
+from core.services.session_store import SessionStore
+
+MAX_BODY_BYTES = 1_000_000
+MAX_PAGE_SIZE = 100
+
+ROUTES = [] # (method, compiled path regex, function, auth) filled by the @route decorator
+
+
+def route(method: str, pattern: str, auth: str = None):
+    """Register an ApiApp method for METHOD /path; auth is None, "user" or "admin"."""
+    def register(function):
+        ROUTES.append((method, re.compile(f"^{pattern}$"), function, auth))
+        return function
+    return register
+
+
+class ApiError(Exception):
+    """Stops a request with an HTTP status and a message for the client."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def plain_data(value):
+    """sqlite3.Row (also inside lists and dicts) -> plain dicts, so json.dumps can write it."""
+    if isinstance(value, sqlite3.Row):
+        return {key: value[key] for key in value.keys()}
+    if isinstance(value, dict):
+        return {key: plain_data(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [plain_data(item) for item in value]
+    return value
+
+
+def _public_user(user) -> dict:
+    return {"id": user["id"], "username": user["username"], "role": user["role"], "created_at": user["created_at"]}
+
+
+class Request:
+    """What a route function gets: path parameters, query string, JSON body and the logged-in user."""
+
+    def __init__(self, args, query, body, token, user):
+        self.args = args
+        self.query = query
+        self.body = body
+        self.token = token
+        self.user = user
+
+    def param(self, name: str, default=None):
+        values = self.query.get(name)
+        return values[0] if values else default
+
+    def field(self, name: str, kind=None, required: bool = True, default=None):
+        """A body field converted with kind (int, float, str); a missing or invalid field is a 400."""
+        if name not in self.body or self.body[name] is None:
+            if required:
+                raise ApiError(400, f"'{name}' is required")
+            return default
+        try:
+            return kind(self.body[name]) if kind else self.body[name]
+        except (TypeError, ValueError):
+            raise ApiError(400, f"'{name}' is invalid")
+
+    def limit(self) -> int:
+        try:
+            return max(1, min(int(self.param("limit", 20)), MAX_PAGE_SIZE))
+        except ValueError:
+            raise ApiError(400, "'limit' must be a number")
+
+
+class ApiApp:
+    """Routes requests to the models and services. Independent of HTTP, so it can be called directly too."""
+
+    def __init__(self, db, cart_store=None, sessions: SessionStore = None):
+        self.db = db
+        self.product_model = Product(db)
+        self.order_model = Order(db)
+        self.cart_service = CartService(db, store=cart_store or MemoryCartStore())
+        self.auth_service = AuthService(db, sessions or SessionStore(db, persist=True))
+
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.statuses = {} # {status code: count}
+        self.route_times = {} # {"GET /products": [count, total seconds, max seconds]}
+
+    # ----- Dispatch -----
+    def handle(self, method: str, target: str, body: bytes = b"", token: str = None):
+        """Run one request. Returns (status, payload dict)."""
+        started = time.perf_counter()
+        url = urlsplit(target)
+        name = f"{method} ?"
+        try:
+            function, args, auth, name = self._match(method, url.path)
+            payload = json.loads(body) if body else {}
+            if not isinstance(payload, dict):
+                raise ApiError(400, "the body must be a JSON object")
+            user = self.auth_service.get_user(token) if token else None
+            if auth and not user:
+                raise ApiError(401, "login required")
+            if auth == "admin" and user["role"] != "admin":
+                raise ApiError(403, "admins only")
+            result = function(self, Request(args, parse_qs(url.query), payload, token, user))
+            status, result = result if isinstance(result, tuple) else (200, result)
+            result = plain_data(result)
+        except ApiError as e:
+            status, result = e.status, {"error": e.message}
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            status, result = 400, {"error": "invalid JSON body"}
+        except ValueError as e: # e.g. a bad page token
+            status, result = 400, {"error": str(e)}
+        except Exception as e:
+            print(f"[API ERROR] {method} {url.path}: {e!r}", file=sys.stderr)
+            status, result = 500, {"error": "internal error"}
+        self._record(name, status, time.perf_counter() - started)
+        return status, result
+
+    def _match(self, method, path):
+        path_found = False
+        for route_method, pattern, function, auth in ROUTES:
+            found = pattern.match(path)
+            if found:
+                path_found = True
+                if route_method == method:
+                    return function, [int(arg) if arg.isdigit() else arg for arg in found.groups()], auth, f"{method} {pattern.pattern[1:-1]}"
+        if path_found:
+            raise ApiError(405, "method not allowed")
+        raise ApiError(404, "not found")
+
+    def _record(self, name, status, elapsed):
+        with self._lock:
+            self.requests += 1
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            entry = self.route_times.setdefault(name, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += elapsed
+            entry[2] = max(entry[2], elapsed)
+
+    def metrics(self) -> dict:
+        """Request counters: total, per second since start, by status and per route (ms)."""
+        with self._lock:
+            uptime = time.time() - self.started
+            return {
+                "uptime": uptime,
+                "requests": self.requests,
+                "requests_per_sec": self.requests / uptime if uptime else 0.0,
+                "statuses": {str(status): count for status, count in sorted(self.statuses.items())},
+                "routes": {
+                    name: {"count": count, "avg_ms": total / count * 1000, "max_ms": longest * 1000}
+                    for name, (count, total, longest) in sorted(self.route_times.items())
+                },
+            }
+
+    def _admin(self, request) -> AdminService:
+        """An AdminService that checks permissions against this request's session."""
+        return AdminService(self.db, self.auth_service.for_token(request.token))
+
+    # ----- Accounts -----
+    @route("GET", "/health")
+    def health(self, request):
+        return {"status": "ok"}
+
+    @route("POST", "/register")
+    def register(self, request):
+        username = request.field("username", str).strip()
+        password = request.field("password", str)
+        if not username or not password:
+            raise ApiError(400, "username and password can't be empty")
+        if not self.auth_service.register_user(username, password): # new accounts are always customers
+            raise ApiError(409, "username already exists")
+        return 201, {"ok": True}
+
+    @route("POST", "/login")
+    def login(self, request):
+        token = self.auth_service.login(request.field("username", str), request.field("password", str))
+        if not token:
+            raise ApiError(401, "wrong username or password")
+        return {"token": token, "user": _public_user(self.auth_service.get_user(token))}
+
+    @route("POST", "/logout", auth="user")
+    def logout(self, request):
+        self.auth_service.logout(request.token)
+        return {"ok": True}
+
+    @route("GET", "/me", auth="user")
+    def me(self, request):
+        return _public_user(request.user)
+
+    # ----- Products -----
+    @route("GET", "/products")
+    def list_products(self, request):
+        return self.product_model.list_products_page(request.param("cursor"), request.limit())
+
+    @route("GET", "/products/search")
+    def search_products(self, request):
+        keyword = (request.param("q") or "").strip()
+        if not keyword:
+            raise ApiError(400, "'q' is required")
+        return {"items": self.product_model.search_products(keyword, request.limit()) or []}
+
+    @route("GET", r"/products/(\d+)")
+    def get_product(self, request):
+        product = self.product_model.get_by_id(request.args[0])
+        if not product:
+            raise ApiError(404, "product not found")
+        return product
+
+    # ----- Cart -----
+    @route("GET", "/cart", auth="user")
+    def view_cart(self, request):
+        return self.cart_service.quote(request.user["id"])
+
+    @route("POST", "/cart/items", auth="user")
+    def add_to_cart(self, request):
+        qty = request.field("qty", int, required=False, default=1)
+        if qty < 1:
+            raise ApiError(400, "'qty' must be at least 1")
+        if not self.cart_service.add_to_cart(request.user["id"], request.field("product_id", int), qty):
+            raise ApiError(409, "product not found or not enough stock")
+        return self.cart_service.quote(request.user["id"])
+
+    @route("DELETE", r"/cart/items/(\d+)", auth="user")
+    def remove_from_cart(self, request):
+        if not self.cart_service.remove_from_cart(request.user["id"], request.args[0]):
+            raise ApiError(404, "product not in your cart")
+        return self.cart_service.quote(request.user["id"])
+
+    @route("POST", "/checkout", auth="user")
+    def checkout(self, request):
+        if not self.cart_service.checkout(request.user["id"]):
+            raise ApiError(409, "checkout failed, review your cart")
+        return {"ok": True}
+
+    # ----- Orders -----
+    @route("GET", "/orders", auth="user")
+    def my_orders(self, request):
+        return self.order_model.get_user_orders_page(request.user["id"], request.param("cursor"), request.limit())
+
+    @route("GET", r"/orders/(\d+)", auth="user")
+    def get_order(self, request):
+        order = self.order_model.get_order_by_id(request.args[0])
+        if not order or (order["user_id"] != request.user["id"] and request.user["role"] != "admin"):
+            raise ApiError(404, "order not found") # someone else's order looks the same as a missing one
+        return order
+
+    # ----- Admin -----
+    @route("POST", "/admin/products", auth="admin")
+    def add_product(self, request):
+        price = request.field("price", float)
+        stock = request.field("stock", int, required=False, default=0)
+        if price < 0 or stock < 0:
+            raise ApiError(400, "price and stock can't be negative")
+        self._admin(request).add_product(request.field("name", str), price, stock,
+                                         request.field("description", str, required=False, default=""))
+        return 201, {"ok": True}
+
+    @route("PATCH", r"/admin/products/(\d+)", auth="admin")
+    def update_product(self, request):
+        if not self.product_model.get_by_id(request.args[0]):
+            raise ApiError(404, "product not found")
+        changed = self._admin(request).update_product(
+            request.args[0],
+            name=request.field("name", str, required=False),
+            price=request.field("price", float, required=False),
+            stock=request.field("stock", int, required=False),
+            description=request.field("description", str, required=False),
+        )
+        if not changed:
+            raise ApiError(400, "nothing to update")
+        return self.product_model.get_by_id(request.args[0])
+
+    @route("DELETE", r"/admin/products/(\d+)", auth="admin")
+    def delete_product(self, request):
+        if not self._admin(request).delete_product(request.args[0]):
+            raise ApiError(404, "product not found")
+        return {"ok": True}
+
+    @route("POST", r"/admin/products/(\d+)/stock", auth="admin")
+    def change_stock(self, request):
+        change = request.field("change", int)
+        admin = self._admin(request)
+        done = admin.increase_stock(request.args[0], change) if change >= 0 else admin.reduce_stock(request.args[0], -change)
+        if not done:
+            raise ApiError(409, "product not found or not enough stock")
+        return self.product_model.get_by_id(request.args[0])
+
+    @route("GET", "/admin/orders", auth="admin")
+    def all_orders(self, request):
+        return self._admin(request).list_orders_page(request.param("cursor"), request.limit())
+
+    @route("POST", r"/admin/orders/(\d+)/status", auth="admin")
+    def update_order_status(self, request):
+        status = request.field("status", str).strip().lower()
+        if status not in ("pending", "processing", "shipped", "delivered", "cancelled"):
+            raise ApiError(400, "unknown status")
+        if not self._admin(request).update_order_status(request.args[0], status):
+            raise ApiError(404, "order not found")
+        return self.order_model.get_order_by_id(request.args[0])
+
+    @route("POST", r"/admin/users/(\d+)/role", auth="admin")
+    def change_role(self, request):
+        role = request.field("role", str)
+        admin = self._admin(request)
+        if role == "admin":
+            done = admin.promote_user_to_admin(request.args[0])
+        elif role == "customer":
+            done = admin.demote_admin_to_customer(request.args[0])
+        else:
+            raise ApiError(400, "role must be 'admin' or 'customer'")
+        if not done:
+            raise ApiError(409, "role not changed")
+        return {"ok": True}
+
+    @route("GET", "/admin/reports/sales", auth="admin")
+    def sales_report(self, request):
+        try:
+            days = max(1, min(int(request.param("days", 90)), 366))
+        except ValueError:
+            raise ApiError(400, "'days' must be a number")
+        month = request.param("month")
+        if month and not re.fullmatch(r"\d{4}-\d{2}", month):
+            raise ApiError(400, "'month' must look like YYYY-MM")
+        admin = self._admin(request)
+        return {
+            "overview": admin.sales_overview(),
+            "by_day": admin.revenue_by_day(days),
+            "top_products": admin.top_products(month, request.limit()),
+            "by_status": admin.orders_by_status(),
+        }
+
+    @route("GET", "/admin/reports/customers", auth="admin")
+    def customers_report(self, request):
+        return self._admin(request).top_customers(request.limit())
+
+    @route("GET", "/admin/stats", auth="admin")
+    def stats(self, request):
+        return {
+            "server": self.metrics(),
+            "pool": self.db.pool_stats(),
+            "locks": self.db.busy_stats(),
+            "sessions": self.auth_service.sessions.stats(),
+            "product_cache": self.product_model.cache_stats(),
+            "top_queries": self.db.top_queries(10),
+        }
+
+
+# ----- HTTP -----
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    """Turns HTTP requests into ApiApp.handle() calls and writes the JSON answer."""
+
+    protocol_version = "HTTP/1.1" # keep-alive: the connection stays open for the next request
+    server_version = "ConsoleCommerceAPI/1.0"
+
+    def setup(self):
+        super().setup()
+        # Headers and body go out in two writes; without TCP_NODELAY the second one waits for the client's
+        # delayed ACK (~40 ms), which caps a keep-alive connection at ~25 requests per second
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def _serve(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self._reply(413, {"error": "request body too large"})
+            self.close_connection = True
+            return
+        body = self.rfile.read(length) if length else b""
+        authorization = self.headers.get("Authorization", "")
+        token = authorization[7:].strip() if authorization.startswith("Bearer ") else None
+        status, payload = self.server.app.handle(self.command, self.path, body, token)
+        self._reply(status, payload)
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data))) # needed for keep-alive, the client knows where the answer ends
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _serve
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class PooledHTTPServer(HTTPServer):
+    """
+    HTTPServer that hands every accepted connection to a fixed ThreadPoolExecutor.
+    A keep-alive connection keeps its worker until the client closes it or it sits idle for idle_timeout seconds.
+    """
+
+    daemon_threads = True
+    request_queue_size = 128 # connections the OS queues while every worker is busy
+
+    def __init__(self, address, app: ApiApp, workers: int = 16, idle_timeout: float = 15.0, verbose: bool = False):
+        handler = type("Handler", (ApiRequestHandler,), {"timeout": idle_timeout}) # socket timeout closes idle connections
+        super().__init__(address, handler)
+        self.app = app
+        self.verbose = verbose
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-worker")
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+# ----- Command line -----
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the shop as an HTTP/JSON API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--db", default="data/ecommerce.db", help="SQLite database file")
+    parser.add_argument("--workers", type=int, default=16, help="worker threads (and database connections)")
+    parser.add_argument("--profile", default="throughput", help="PRAGMA profile: durable, throughput or bulk-load")
+    parser.add_argument("--idle-timeout", type=float, default=15.0, help="seconds before an idle keep-alive connection is closed")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    parser.add_argument("--quiet", action="store_true", help="hide the messages the models and services print")
+    args = parser.parse_args(argv)
+
+    from core.database import DatabaseManager # imported here so `--help` works without touching a database
+    from core.services.reservation_sweeper import ReservationSweeper
+
+    db = DatabaseManager(args.db, pool_size=args.workers, profile=args.profile)
+    app = ApiApp(db)
+    sweeper = ReservationSweeper(db)
+    sweeper.start()
+    server = PooledHTTPServer((args.host, args.port), app, args.workers, args.idle_timeout, args.verbose)
+    print(f"Serving on http://{args.host}:{server.server_address[1]} with {args.workers} workers (Ctrl+C to stop)")
+    if args.quiet:
+        sys.stdout = open(os.devnull, "w") # the models print a line for almost everything they do
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sys.stdout = sys.__stdout__
+        server.server_close()
+        sweeper.stop()
+        app.cart_service.store.close()
+        db.close()
+        print("Server stopped.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
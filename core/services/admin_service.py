@@ -60,6 +60,11 @@ class AdminService:
             return False
         
         return self.auth_service.is_admin()
+
+    def _refresh_sessions(self, user_id: int):
+        """Logged-in sessions keep a copy of the user row, give them the new role right away."""
+        if self.auth_service and hasattr(self.auth_service, "refresh_user"):
+            self.auth_service.refresh_user(user_id)
     
     
     # ----- Product management -----
@@ -128,6 +133,12 @@ class AdminService:
             return []
         return self.order_model.get_all_orders()
     
+    def list_orders_page(self, token: str = None, limit: int = 20) -> Dict:
+        """Return one page of all orders: {"items": [...], "next": token, "prev": token}."""
+        if not self._ensure_admin():
+            return {"items": [], "next": None, "prev": None}
+        return self.order_model.get_all_orders_page(token, limit)
+    
     def get_order(self, order_id: int):
         """Return a single order dict or None."""
         if not self._ensure_admin():
@@ -143,35 +154,37 @@ class AdminService:
         if not self._ensure_admin(): # making sure the user is an admin
             return False
         
-        order = self.order_model.get_order_by_id(order_id)
-        if not order:
-            return False
-        
-        old_status = order['status']
-        
-        # if cancelling, restore stock for items of old_status wasn't already cancelled 
-        if new_status.lower() == "cancelled" and old_status.lower() != 'cancelled':
-            # restore stock per item
-            restored_count = 0
-            for item in order['items']:
-                pid  = item.get("product_id")
-                qty = item.get("qty",0)
-                if pid and qty:
-                    # Restore stock for this item
-                    success = self.product_model.increase_stock(pid, qty)
-                    if success:
-                        restored_count += 1
-                        product = self.product_model.get_by_id(pid)
-                        if product:
-                            print(f"Restored {qty} units of {product['name']} (New stock: {product['stock']})")
-            
-            if restored_count > 0:
-                print(f"Stock restored for {restored_count} item(s) in the order.")
-                    
-        # Update the order status in DB
+        # Stock restore and status change are one transaction: either both are saved or neither is
         try:
-            # The Order.update_order method expects new_items list or new_status
-            self.order_model.update_order(order_id, new_items=None, new_status=new_status)
+            with self.db.transaction():
+                order = self.order_model.get_order_by_id(order_id)
+                if not order:
+                    return False
+                
+                old_status = order['status']
+                
+                # if cancelling, restore stock for items of old_status wasn't already cancelled 
+                if new_status.lower() == "cancelled" and old_status.lower() != 'cancelled':
+                    # restore stock per item
+                    restored_count = 0
+                    for item in order['items']:
+                        pid  = item.get("product_id")
+                        qty = item.get("qty",0)
+                        if pid and qty:
+                            # Restore stock for this item
+                            success = self.product_model.increase_stock(pid, qty)
+                            if success:
+                                restored_count += 1
+                                product = self.product_model.get_by_id(pid)
+                                if product:
+                                    print(f"Restored {qty} units of {product['name']} (New stock: {product['stock']})")
+                    
+                    if restored_count > 0:
+                        print(f"Stock restored for {restored_count} item(s) in the order.")
+                            
+                # Update the order status in DB
+                # The Order.update_order method expects new_items list or new_status
+                self.order_model.update_order(order_id, new_items=None, new_status=new_status)
             return True
         except Exception:
             return False
@@ -218,7 +231,8 @@ class AdminService:
         
         # Reuse Product.update_product style: dynamic update
         try:
-            self.db.execute("UPDATE users SET role = 'admin' WHERE id = ?",(user_id))
+            self.db.execute("UPDATE users SET role = 'admin' WHERE id = ?", (user_id,), commit=True)
+            self._refresh_sessions(user_id)
             return True
         except Exception:
             return False
@@ -242,7 +256,8 @@ class AdminService:
                 return False
             
         try:
-            self.db.execute("UPDATE users SET role = 'customer' WHERE id = ?",(user_id))
+            self.db.execute("UPDATE users SET role = 'customer' WHERE id = ?", (user_id,), commit=True)
+            self._refresh_sessions(user_id)
             return True
         except Exception:
             return False
@@ -255,16 +270,51 @@ class AdminService:
         """
         if not self._ensure_admin():
             return 0
-        rows = self.db.fetchone("SELECT COUNT(* as c FROM products")
+        rows = self.db.fetch_one("SELECT COUNT(*) AS c FROM products")
         return rows['c'] if rows else 0
     
     def order_count(self) -> int:
         """
-        returns total number of orders
+        returns total number of orders (every status, from the sales_status rollup instead of counting the orders table)
         """
         if not self._ensure_admin():
             return 0
-        rows = self.db.fetchone("SELECT COUNT(*) as c FROM orders")
+        rows = self.db.fetch_one("SELECT COALESCE(SUM(orders), 0) AS c FROM sales_status")
         return rows['c'] if rows else 0
-    
-    
\ No newline at end of file
+
+    # ----- Sales Reports (see core/models/sales.py) -----
+    def sales_overview(self) -> Dict:
+        """Revenue and orders today, this month and overall. Empty dict on permission denied."""
+        if not self._ensure_admin():
+            return {}
+        return self.order_model.sales.overview()
+
+    def revenue_by_day(self, days: int = 90) -> List[Dict]:
+        """Orders, units and revenue for each of the last `days` days, oldest first."""
+        if not self._ensure_admin():
+            return []
+        return self.order_model.sales.revenue_by_day(days)
+
+    def revenue_by_month(self, months: int = 12) -> List[Dict]:
+        """Orders, units and revenue per month, newest first."""
+        if not self._ensure_admin():
+            return []
+        return self.order_model.sales.revenue_by_month(months)
+
+    def top_products(self, month: str = None, limit: int = 20) -> List[Dict]:
+        """Best selling products of a month (YYYY-MM, default this month) by revenue."""
+        if not self._ensure_admin():
+            return []
+        return self.order_model.sales.top_products(month, limit)
+
+    def orders_by_status(self) -> List[Dict]:
+        """Number of orders and their value per status."""
+        if not self._ensure_admin():
+            return []
+        return self.order_model.sales.orders_by_status()
+
+    def top_customers(self, limit: int = 10) -> List[Dict]:
+        """Customers who spent the most (from user_order_summary)."""
+        if not self._ensure_admin():
+            return []
+        return self.order_model.top_customers(limit)
@@ -1,22 +1,29 @@
 '''
-auth_service.py will work as a bridge between the main program like CLI/UI and the model. 
-it won't print messages. instead it will return status or objects. 
+auth_service.py will work as a bridge between the main program like CLI/UI and the model.
+it won't print messages. instead it will return status or objects.
 
 ------------------------------------------------------------------------------------------------------------
 
 Handles user authentication and session management.
-Uses the User model for database operations.
+Uses the User model for database operations and a SessionStore for who is logged in.
 '''
 from core.models.user import User
+from core.services.session_store import SessionStore
+
 
 class AuthService:
     """Service layer for user authentication and registration."""
-    
-    def __init__(self,db):
+
+    def __init__(self,db, sessions: SessionStore = None):
+        """
+        db       : DatabaseManager instance
+        sessions : SessionStore shared by every login (default: an in-memory store)
+        """
         self.db = db
         self.user_model = User(db)
-        self.current_user = None # keeps track of logged-in user row 
-        
+        self.sessions = sessions if sessions is not None else SessionStore(db)
+        self.current_token = None # token of the console's own logged-in user
+
     # ----- Registration -----
     def register_user(self, username: str, password: str, role:str="customer"):
         """
@@ -24,44 +31,106 @@ class AuthService:
         Returns True if successful, False if username already exists.
         """
         return self.user_model.register(username, password, role)
-    
-    
+
+
     # ----- Login -----
+    def login(self, username: str, password: str):
+        """
+        Check the credentials and start a new session.
+        Returns the session token, or None on failure. Any number of users can be logged in at once.
+        """
+        user = self.user_model.validate_login(username, password)
+        if not user:
+            return None
+        return self.sessions.create(user)
+
     def login_user(self, username: str, password:str):
         """
-        Attempts to login a user.
+        Attempts to login a user (the console's single user).
         Returns True on success, False on failure.
         """
-        user = self.user_model.validate_login(username, password)
-        if user:
-            self.current_user = user
+        token = self.login(username, password)
+        if token:
+            if self.current_token:
+                self.sessions.revoke(self.current_token)
+            self.current_token = token
             return True
         return False
-    
+
     # ----- Logout -----
+    def logout(self, token: str) -> bool:
+        """End the session of a token."""
+        return self.sessions.revoke(token)
+
     def logout_user(self):
         """Logs out the current user."""
-        if self.current_user:
-            print(f"User '{self.current_user['username']}' logged out.")
-        self.current_user = None
-        
+        user = self.current_user
+        if user:
+            print(f"User '{user['username']}' logged out.")
+        if self.current_token:
+            self.sessions.revoke(self.current_token)
+        self.current_token = None
+
     # ----- Status -----
+    @property
+    def current_user(self):
+        """The console's logged-in user row (None when logged out or the session expired)."""
+        return self.sessions.get(self.current_token)
+
+    def get_user(self, token: str):
+        """Returns the user row of a session token (SQlite3.Row or None)."""
+        return self.sessions.get(token)
+
     def get_logged_in_user(self):
         """Returns the current logged-in user (SQlite3.Row or None)."""
         return self.current_user
-    
+
     def is_logged_in(self) -> bool:
         """Returns True if a user is logged in."""
         return self.current_user is not None
-    
+
     def is_admin(self) -> bool:
         """Returns True if the current user is an admin."""
-        return self.current_user and self.current_user["role"] == "admin"
-    
-    
+        user = self.current_user
+        return bool(user) and user["role"] == "admin"
+
+    def refresh_user(self, user_id: int):
+        """Let open sessions of a user see a changed role."""
+        self.sessions.refresh_user(user_id)
+
+    def for_token(self, token: str) -> "SessionAuth":
+        """An AuthService look-alike for one session, e.g. AdminService(db, auth_service.for_token(token))."""
+        return SessionAuth(self, token)
+
+
+class SessionAuth:
+    """
+    The status methods of AuthService (is_logged_in, is_admin, get_logged_in_user) for one session token.
+    Services that check permissions (AdminService) work per request with it, without a global "current user".
+    """
+
+    def __init__(self, auth_service: AuthService, token: str):
+        self.auth_service = auth_service
+        self.token = token
+
+    def get_logged_in_user(self):
+        return self.auth_service.get_user(self.token)
+
+    def is_logged_in(self) -> bool:
+        return self.get_logged_in_user() is not None
+
+    def is_admin(self) -> bool:
+        user = self.get_logged_in_user()
+        return bool(user) and user["role"] == "admin"
+
+    def refresh_user(self, user_id: int):
+        self.auth_service.refresh_user(user_id)
+
+
 '''
 - It wraps around the User model, so no duplicate logic can form.
-- Maintains session state in memory with self.current_user.
+- Keeps sessions in a SessionStore: login() returns a token, get_user(token) finds the user again.
+  The console keeps using login_user()/current_user, which is simply one of those sessions.
 - Returns clean results (True/False) so CLI/UI can decide what to show.
-- Compatible with database and current schema 
-'''
\ No newline at end of file
+- Compatible with database and current schema
+'''
@@ -8,19 +8,39 @@ It will work directly with the Product and Order models and use DatabaseManager
 '''
 """
 Handles suer cart operations and order creation.
-Each user's cart is stored in memory wile the app runs.
+Each user's cart is kept in a cart store: in memory by default, or in the database (see cart_store.py).
+Items in a cart are held (reserved) for a while, see core/models/reservation.py.
 When they checkout, the items are stored in the 'orders' table.
 """
 
 import json
+import sqlite3
 from datetime import datetime
+from core.cache import LRUCache
 from core.models.product import Product
 from core.models.order import Order
+from core.models.reservation import Reservation, DEFAULT_TTL
+from core.services.cart_store import MemoryCartStore
+
+
+class CheckoutError(Exception):
+    """Raised inside checkout to abort (and roll back) the checkout transaction."""
+
 
 class CartService:
-    def __init__(self,db):
+    QUOTE_CACHE_SIZE = 10_000 # how many users' cart quotes are remembered
+
+    def __init__(self,db, reservation_ttl: float = DEFAULT_TTL, store=None):
+        """
+        db              : DatabaseManager instance
+        reservation_ttl : seconds cart items stay reserved
+        store           : where carts live, MemoryCartStore() (default) or SQLiteCartStore(db)
+        """
         self.db = db
-        self.carts = {} # in_memory carts: {user_id:{product_id: qty,....}}
+        self.store = store if store is not None else MemoryCartStore() # carts: {user_id:{product_id: qty,....}}
+        self.reservation_model = Reservation(db, reservation_ttl) # holds cart quantities for reservation_ttl seconds
+        self._quotes = LRUCache(self.QUOTE_CACHE_SIZE) # {user_id: (cart lines + product versions, quote)}
+        self.failed_checkouts = {"stock": 0, "database": 0} # why checkout() returned False (for load tests and stats)
         
     # ----- Add to Cart -----
     def add_to_cart(self, user_id: int, product_id:int, qty:int = 1):
@@ -34,12 +54,18 @@ class CartService:
             print("Product is out of stock.")
             return False
         
-        # Initialize user cart if not exists
-        if user_id not in self.carts:
-            self.carts[user_id] = {}
-            
-        # Add quantity (accumulate if product already in cart)
-        self.carts[user_id][product_id] = self.carts[user_id].get(product_id, 0) + qty
+        # Hold the new cart quantity (accumulate if product already in cart); fails if other carts hold the rest
+        new_qty = self.store.get(user_id).get(product_id, 0) + qty
+        held = self.reservation_model.hold(user_id, product_id, new_qty)
+        if held is None: # the database failed (e.g. gave up waiting for the lock), it's not a stock problem
+            print("Could not add to your cart because of a database error, please try again.")
+            return False
+        if not held:
+            available = self.reservation_model.available_stock(product_id, user_id)
+            print(f"Not enough stock available for {product['name']}. Available: {max(available or 0, 0)}")
+            return False
+        
+        self.store.set_qty(user_id, product_id, new_qty)
         print(f"Added {qty} X {product['name']} to your cart.")
         return True
     
@@ -47,31 +73,85 @@ class CartService:
     # ----- Remove from Cart -----
     def remove_from_cart(self, user_id:int,product_id:int):
         """Remove a product entirely from the cart using the product ID"""
-        if user_id not in self.carts or product_id not in self.carts[user_id]:
+        if product_id not in self.store.get(user_id):
             print("Product not in your cart")
             return False
         
-        del self.carts[user_id][product_id]
+        self.store.remove(user_id, product_id)
+        self.reservation_model.release(user_id, product_id) # give the held units back to everyone else
         print("Product has been removed from your cart.")
         return True
     
     
+    # ----- Quote -----
+    def quote(self, user_id: int) -> dict:
+        """
+        Price the user's cart. Returns:
+            {"lines": [{"product_id", "name", "price", "qty", "line_total", "stock"}, ...],
+             "item_count": total quantity, "subtotal": float, "total": float, "warnings": [str, ...]}
+        All products are loaded with one query (Product.get_many). The quote is remembered until the cart
+        or one of its products changes (Product.versions_of), so showing the cart again before remove or
+        checkout costs no queries at all. The returned dict is shared, don't modify it.
+        """
+        cart = self.store.get(user_id)
+        if not cart:
+            return {"lines": [], "item_count": 0, "subtotal": 0.0, "total": 0.0, "warnings": []}
+
+        product_model = Product(self.db)
+        key = (tuple(cart.items()), product_model.versions_of(cart.keys()))
+        cached = self._quotes.get(user_id)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        products = product_model.get_many(cart.keys())
+        lines = []
+        warnings = []
+        subtotal = 0.0
+        for product_id, qty in cart.items():
+            product = products.get(product_id)
+            if not product:
+                warnings.append(f"Product ID {product_id} is no longer available.")
+                continue
+            line_total = round(product["price"] * qty, 2)
+            if product["stock"] < qty:
+                warnings.append(f"Only {max(product['stock'], 0)} left of {product['name']} (you have {qty}).")
+            lines.append({
+                "product_id": product_id,
+                "name": product["name"],
+                "price": product["price"],
+                "qty": qty,
+                "line_total": line_total,
+                "stock": product["stock"],
+            })
+            subtotal += line_total
+
+        subtotal = round(subtotal, 2)
+        quote = {
+            "lines": lines,
+            "item_count": sum(line["qty"] for line in lines),
+            "subtotal": subtotal,
+            "total": subtotal, # no tax or shipping yet
+            "warnings": warnings,
+        }
+        self._quotes.put(user_id, (key, quote))
+        return quote
+
+
     # ----- View Cart ----- 
     def view_cart(self, user_id: int):
-        """Show all items in the user's cart"""
-        if user_id not in self.carts or not self.carts[user_id]:
+        """Show all items in the user's cart (printed from quote())"""
+        quote = self.quote(user_id)
+        if not quote["lines"] and not quote["warnings"]:
             print("Your cart is empty.")
             return []
         
         print("\n--- Your Cart ---")
-        total = 0
-        for product_id, qty in self.carts[user_id].items():
-            product = Product(self.db).get_by_id(product_id)
-            subtotal = product["price"] * qty
-            print(f"{product['name']} (x{qty}) - ${subtotal:.2f}")
-            total += subtotal
-        print(f"Total: ${total: .2f}")
-        return self.carts[user_id]
+        for line in quote["lines"]:
+            print(f"[{line['product_id']}] {line['name']} (x{line['qty']}) - ${line['line_total']:.2f}")
+        for warning in quote["warnings"]:
+            print(f"  ! {warning}")
+        print(f"Total: ${quote['total']:.2f}")
+        return self.store.get(user_id) # the raw cart, it still lists products that disappeared so they can be removed
     
     
     # ----- Checkout -----
@@ -79,85 +159,97 @@ class CartService:
         """
         Convert cart to order and clear it.
         Also reduces stock for each product in the cart.
+
+        Everything runs in one transaction:-
+            1. Load every product in the cart with a single IN (...) query
+            2. Confirm the cart's stock holds (re-hold any that expired)
+            3. Decrement stock with guarded UPDATE ... WHERE stock >= qty statements (Product.reduce_stock_many)
+            4. Insert the order and release the holds
+        If any step fails the whole transaction rolls back, so stock is never left half-decremented.
         """
-        if user_id not in self.carts or not self.carts[user_id]:
+        cart = self.store.get(user_id)
+        if not cart:
             print("Cart is empty. Nothing to checkout.")
             return False
         
         product_model = Product(self.db)
-        items = []
-        
-        # First, verify stock availability for all items
-        for pid, qty in self.carts[user_id].items():
-            product = product_model.get_by_id(pid)
-            if not product:
-                print(f"Product ID {pid} not found. Removing from cart.")
-                continue
-            
-            # Check if enough stock is available
-            if product['stock'] < qty:
-                print(f"Error: Not enough stock for {product['name']}. Available: {product['stock']}, Required: {qty}")
-                return False
-            
-            items.append({
-                'product_id':pid,
-                'name':product['name'],
-                'price':product['price'],
-                'qty':qty,
-            })
+        order_model = Order(self.db)
         
-        # If we have items, proceed with checkout
-        if not items:
-            print("No valid items to checkout.")
+        try:
+            with self.db.transaction():
+                products = product_model.get_many(cart.keys(), fresh=True) # one query for the whole cart, straight from the database
+                
+                items = []
+                for pid, qty in cart.items():
+                    product = products.get(pid)
+                    if not product:
+                        print(f"Product ID {pid} not found. Skipping...")
+                        continue
+                    
+                    # Check if enough stock is available
+                    if product['stock'] < qty:
+                        raise CheckoutError(f"Not enough stock for {product['name']}. Available: {product['stock']}, Required: {qty}")
+                    
+                    items.append({
+                        'product_id':pid,
+                        'name':product['name'],
+                        'price':product['price'],
+                        'qty':qty,
+                    })
+                
+                # If we have items, proceed with checkout
+                if not items:
+                    raise CheckoutError("No valid items to checkout.")
+                
+                # Confirm the holds: lines whose hold is still active are already ours, expired or missing
+                # ones are held again now (which fails if other carts took the stock in the meantime)
+                holds = self.reservation_model.get_user_holds(user_id)
+                for item in items:
+                    if holds.get(item['product_id'], 0) < item['qty'] and not self.reservation_model.hold(user_id, item['product_id'], item['qty']):
+                        raise CheckoutError(f"{item['name']} is no longer available in that quantity.")
+                
+                # Guarded decrement of every line in one batch: it only succeeds if the stock is still there
+                # (another checkout may have taken it since we read it above)
+                if not product_model.reduce_stock_many([(item['product_id'], item['qty']) for item in items]):
+                    raise CheckoutError("Stock changed while checking out, please review your cart.")
+                
+                # Create an order record (joins this transaction, it doesn't commit on its own)
+                order_model.create_order(user_id, items)
+                self.reservation_model.release(user_id) # the held units are sold now
+        except CheckoutError as e:
+            self.failed_checkouts["stock"] += 1
+            print(f"Error: {e}")
+            return False
+        except sqlite3.Error:
+            self.failed_checkouts["database"] += 1 # e.g. gave up waiting for the write lock
+            print("Error: Checkout failed, no changes were saved.")
             return False
         
-        # Reduce stock for each item BEFORE creating the order
-        # This ensures stock is reduced atomically with order creation
-        reduced_items = []  # Track items we've successfully reduced stock for
-        for pid, qty in self.carts[user_id].items():
-            product = product_model.get_by_id(pid)
-            if not product:
-                print(f"Product ID {pid} not found. Skipping...")
-                continue
-            
-            product_name = product['name']
-            old_stock = product['stock']  # Store old stock value before reduction
-            
-            success = product_model.reduce_stock(pid, qty)
-            if not success:
-                # If stock reduction fails, we need to restore any stock we already reduced
-                print(f"Error: Failed to reduce stock for {product_name}. Rolling back...")
-                # Restore stock for items we already processed
-                for rollback_pid, rollback_qty in reduced_items:
-                    product_model.increase_stock(rollback_pid, rollback_qty)
-                return False
-            
-            # Show feedback about stock reduction
-            updated_product = product_model.get_by_id(pid)
-            if updated_product:
-                print(f"Reduced stock for {product_name}: {old_stock} → {updated_product['stock']} (-{qty})")
-            
-            # Track successfully reduced items
-            reduced_items.append((pid, qty))
-        
-        # Create an order record
-        order_model = Order(self.db)
-        order_model.create_order(user_id, items)
+        # Show feedback about stock reduction
+        for item in items:
+            old_stock = products[item['product_id']]['stock']
+            print(f"Reduced stock for {item['name']}: {old_stock} → {old_stock - item['qty']} (-{item['qty']})")
         
-        # Clear cart only after successful order creation and stock reduction
-        del self.carts[user_id]
+        # Clear cart only after the transaction has committed, and write that through right away
+        self.store.clear(user_id)
+        try:
+            self.store.flush(user_id)
+        except Exception as e: # the order is placed; the clear stays buffered and the background flusher writes it
+            print(f"[CART FLUSH ERROR] {e}")
+        self._quotes.pop(user_id)
         print("Checkout completed! Your order has been placed.")
         return True
     
     
 '''
 How it works:
-    - Keeps each user's cart in memory -> {user_id: {product_id: qty}}
-    - Uses the Product model to check product details 
+    - Keeps each user's cart in a cart store -> {user_id: {product_id: qty}} (memory or SQLite)
+    - Holds cart quantities with the Reservation model until checkout or expiry
+    - Uses the Product model to check product details (one query per cart, quotes cached until something changes)
     - Uses the Order model to create an order during checkout 
     - Provides clean methods:
         1. add_to_cart()
         2. remove_from_cart()
-        3. view_cart()
+        3. quote() / view_cart()
         4. checkout() 
 '''
\ No newline at end of file
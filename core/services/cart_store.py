@@ -0,0 +1,342 @@
+'''
+Cart storage backends for CartService.
+
+CartService only needs a few operations on "user -> {product_id: qty}", so where carts live is pluggable:-
+    1. MemoryCartStore : carts in this process's memory (lost on restart), bounded by idle timeout and
+                         max cart count, optionally spilling evicted carts to disk
+    2. SQLiteCartStore : carts in the cart_items table, shared by every process using the database.
+       Clicks are buffered in memory (write-behind) and written in one transaction every
+       `flush_interval` seconds, when the buffer gets big, or when CartService asks (at checkout),
+       so a burst of add/remove clicks costs one database write instead of one per click.
+Both return plain {product_id: qty} dicts from get().
+'''
+
+import json
+import os
+import sys
+import threading
+import time
+from array import array # compact typed arrays, 8 bytes per number instead of a full Python int object
+from collections import OrderedDict
+
+
+def _now_ms() -> int:
+    return int(time.monotonic() * 1000)
+
+
+class MemoryCartStore:
+    """
+    Carts kept in process memory, with limits so a long-running process can't leak them:-
+        - idle_timeout : a cart nobody touched for this many seconds is evicted
+        - max_carts    : when there are more carts than this, the least recently used one is evicted
+        - spill_dir    : evicted carts are written there as small JSON files and loaded back on the
+                         user's next visit (without it evicted carts are simply dropped)
+    Each cart is stored compactly as one flat array of 64-bit ints [last_used_ms, pid, qty, pid, qty, ...]
+    instead of a dict plus a timestamp object, roughly half the memory for the usual few-line cart.
+    """
+
+    def __init__(self, max_carts: int = 50_000, idle_timeout: float = 6 * 60 * 60, spill_dir: str = None):
+        self.max_carts = max_carts
+        self.idle_timeout = idle_timeout
+        self.spill_dir = spill_dir
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+        self.carts = OrderedDict() # {user_id: array('q', [last_used_ms, pid, qty, ...])}, least recently used first
+        self._lock = threading.Lock()
+        self.evicted_idle = 0
+        self.evicted_lru = 0
+        self.spilled = 0
+        self.restored = 0
+
+    # ----- Public API -----
+    def get(self, user_id: int) -> dict:
+        """Return a copy of the user's cart ({} if there is none)."""
+        with self._lock:
+            lines = self._entry(user_id)
+            if lines is None:
+                return {}
+            return {lines[i]: lines[i + 1] for i in range(1, len(lines), 2)}
+
+    def set_qty(self, user_id: int, product_id: int, qty: int):
+        with self._lock:
+            lines = self._entry(user_id)
+            if lines is None:
+                lines = self.carts[user_id] = array("q", [_now_ms()])
+            for i in range(1, len(lines), 2):
+                if lines[i] == product_id:
+                    lines[i + 1] = qty
+                    break
+            else:
+                lines.extend((product_id, qty))
+            self._enforce_limits()
+
+    def remove(self, user_id: int, product_id: int):
+        with self._lock:
+            lines = self._entry(user_id)
+            if lines is None:
+                return
+            for i in range(1, len(lines), 2):
+                if lines[i] == product_id:
+                    del lines[i:i + 2]
+                    break
+            if len(lines) == 1: # only the timestamp is left
+                del self.carts[user_id]
+
+    def clear(self, user_id: int):
+        with self._lock:
+            self.carts.pop(user_id, None)
+            self._delete_spill(user_id)
+
+    def flush(self, user_id: int = None):
+        """Nothing to write, kept so every store has the same methods."""
+        return 0
+
+    def close(self):
+        pass
+
+    # ----- Limits -----
+    def evict_idle(self) -> int:
+        """Evict every cart idle for longer than idle_timeout. Returns how many were evicted."""
+        with self._lock:
+            return self._evict_idle()
+
+    def _enforce_limits(self):
+        self._evict_idle()
+        while self.max_carts and len(self.carts) > self.max_carts:
+            user_id, lines = self.carts.popitem(last=False) # least recently used
+            self._spill(user_id, lines)
+            self.evicted_lru += 1
+
+    def _evict_idle(self) -> int:
+        if not self.idle_timeout:
+            return 0
+        cutoff = _now_ms() - self.idle_timeout * 1000
+        evicted = 0
+        while self.carts: # oldest first, so we can stop at the first cart that is still fresh
+            user_id, lines = next(iter(self.carts.items()))
+            if lines[0] > cutoff:
+                break
+            del self.carts[user_id]
+            self._spill(user_id, lines)
+            evicted += 1
+        self.evicted_idle += evicted
+        return evicted
+
+    def _entry(self, user_id):
+        """Find a cart (loading it back from the spill directory if needed) and mark it as just used."""
+        lines = self.carts.get(user_id)
+        if lines is None:
+            lines = self._load_spill(user_id)
+            if lines is None:
+                return None
+            lines[0] = _now_ms() # stamped before the limits run, or idle eviction would drop it right away
+            self.carts[user_id] = lines
+            self.restored += 1
+            self._enforce_limits() # the restored cart is the newest and freshest, so it is never the one evicted
+        else:
+            self.carts.move_to_end(user_id)
+            lines[0] = _now_ms()
+        return lines
+
+    # ----- Spill to disk -----
+    def _spill_path(self, user_id):
+        return os.path.join(self.spill_dir, f"{int(user_id)}.json")
+
+    def _spill(self, user_id, lines):
+        if not self.spill_dir or len(lines) < 2:
+            return
+        with open(self._spill_path(user_id), "w", encoding="utf-8") as f:
+            json.dump(lines.tolist()[1:], f) # the timestamp isn't saved, loading the cart back counts as using it
+        self.spilled += 1
+
+    def _load_spill(self, user_id):
+        if not self.spill_dir:
+            return None
+        path = self._spill_path(user_id)
+        try:
+            with open(path, encoding="utf-8") as f:
+                lines = array("q", [0] + json.load(f))
+        except (OSError, ValueError):
+            return None
+        os.remove(path) # it lives in memory again
+        return lines
+
+    def _delete_spill(self, user_id):
+        if self.spill_dir:
+            try:
+                os.remove(self._spill_path(user_id))
+            except OSError:
+                pass
+
+    # ----- Metrics -----
+    def stats(self) -> dict:
+        """Cart count, approximate memory footprint in bytes and eviction counters."""
+        with self._lock:
+            lines = sum(len(cart) // 2 for cart in self.carts.values())
+            footprint = sys.getsizeof(self.carts) + sum(sys.getsizeof(cart) for cart in self.carts.values())
+            return {
+                "carts": len(self.carts),
+                "lines": lines,
+                "approx_bytes": footprint,
+                "evicted_idle": self.evicted_idle,
+                "evicted_lru": self.evicted_lru,
+                "spilled": self.spilled,
+                "restored": self.restored,
+            }
+
+
+class SQLiteCartStore:
+    """Carts in the cart_items table with a write-behind buffer."""
+
+    def __init__(self, db, flush_interval: float = 2.0, max_pending: int = 1000, background: bool = True):
+        """
+        db             : DatabaseManager instance
+        flush_interval : seconds between background flushes
+        max_pending    : flush right away once this many changed lines are buffered
+        background     : start the flush thread (False = only flush when asked)
+        """
+        self.db = db
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = {} # {user_id: {"clear": bool, "items": {product_id: qty or None (= removed)}}}
+        self._pending_lines = 0
+        self._inflight = {} # {user_id: [entries taken by a flush that hasn't committed yet, oldest first]}
+        self._lock = threading.Lock()
+        self.flushes = 0
+        self.lines_written = 0
+
+        self._stop = threading.Event()
+        self._thread = None
+        if background:
+            self._thread = threading.Thread(target=self._run, name="cart-flusher", daemon=True)
+            self._thread.start()
+
+    # ----- Reads -----
+    def get(self, user_id: int) -> dict:
+        """The user's cart as stored, with this process's unflushed changes applied on top."""
+        with self._lock:
+            # Changes a flush is writing right now come first, then the ones buffered since; until that
+            # flush commits they are in neither the table nor _pending, so they must be overlaid too
+            layers = self._inflight.get(user_id, []) + ([self._pending[user_id]] if user_id in self._pending else [])
+            layers = [{"clear": entry["clear"], "items": dict(entry["items"])} for entry in layers]
+
+        cleared = [n for n, layer in enumerate(layers) if layer["clear"]]
+        cart = {}
+        if cleared: # after a clear the stored rows (and older changes) don't count anymore
+            layers = layers[cleared[-1]:]
+        else:
+            rows = self.db.fetch_all("SELECT product_id, qty FROM cart_items WHERE user_id = ?", (user_id,)) or []
+            cart = {row["product_id"]: row["qty"] for row in rows}
+        for layer in layers:
+            for product_id, qty in layer["items"].items():
+                if qty is None:
+                    cart.pop(product_id, None)
+                else:
+                    cart[product_id] = qty
+        return cart
+
+    # ----- Buffered writes -----
+    def set_qty(self, user_id: int, product_id: int, qty: int):
+        self._buffer(user_id, product_id, qty)
+
+    def remove(self, user_id: int, product_id: int):
+        self._buffer(user_id, product_id, None)
+
+    def clear(self, user_id: int):
+        with self._lock:
+            old = self._pending.get(user_id)
+            self._pending_lines -= (len(old["items"]) + old["clear"]) if old else 0
+            self._pending[user_id] = {"clear": True, "items": {}}
+            self._pending_lines += 1
+
+    def _buffer(self, user_id, product_id, qty):
+        with self._lock:
+            entry = self._pending.setdefault(user_id, {"clear": False, "items": {}})
+            if product_id not in entry["items"]:
+                self._pending_lines += 1
+            entry["items"][product_id] = qty
+            full = self._pending_lines >= self.max_pending
+        if full:
+            self.flush()
+
+    # ----- Flushing -----
+    def flush(self, user_id: int = None) -> int:
+        """
+        Write buffered changes (of one user, or everyone) in a single transaction.
+        Returns the number of buffered entries written.
+        """
+        with self._lock:
+            if user_id is None:
+                batch, self._pending = self._pending, {}
+                self._pending_lines = 0
+            else:
+                entry = self._pending.pop(user_id, None)
+                batch = {user_id: entry} if entry else {}
+                self._pending_lines -= (len(entry["items"]) + entry["clear"]) if entry else 0
+            for uid, entry in batch.items():
+                self._inflight.setdefault(uid, []).append(entry) # get() still sees it while it's written
+        if not batch:
+            return 0
+
+        now = time.time()
+        clears = [(uid,) for uid, entry in batch.items() if entry["clear"]]
+        deletes = [(uid, pid) for uid, entry in batch.items() for pid, qty in entry["items"].items() if qty is None]
+        upserts = [(uid, pid, qty, now) for uid, entry in batch.items() for pid, qty in entry["items"].items() if qty is not None]
+        try:
+            with self.db.transaction():
+                if clears:
+                    self.db.execute_many("DELETE FROM cart_items WHERE user_id = ?", clears)
+                if deletes:
+                    self.db.execute_many("DELETE FROM cart_items WHERE user_id = ? AND product_id = ?", deletes)
+                if upserts:
+                    self.db.execute_many("""
+                        INSERT INTO cart_items (user_id, product_id, qty, updated_at) VALUES (?, ?, ?, ?)
+                        ON CONFLICT (user_id, product_id) DO UPDATE SET qty = excluded.qty, updated_at = excluded.updated_at
+                    """, upserts)
+        except Exception:
+            self._requeue(batch) # keep the changes, the next flush tries again
+            raise
+        with self._lock:
+            self._drop_inflight(batch) # committed, the table has them now
+
+        written = len(clears) + len(deletes) + len(upserts)
+        self.flushes += 1
+        self.lines_written += written
+        return written
+
+    def _requeue(self, batch):
+        """Put a failed batch back under any newer changes made while it was being written."""
+        with self._lock:
+            self._drop_inflight(batch) # in the same locked step, so get() never misses the changes
+            for uid, entry in batch.items():
+                newer = self._pending.get(uid)
+                if newer and newer["clear"]:
+                    continue # cleared again since, the old changes don't matter
+                merged = {"clear": entry["clear"], "items": dict(entry["items"])}
+                if newer:
+                    merged["items"].update(newer["items"])
+                self._pending[uid] = merged
+            self._pending_lines = sum(len(e["items"]) + e["clear"] for e in self._pending.values())
+
+    def _drop_inflight(self, batch):
+        for uid, entry in batch.items():
+            entries = [e for e in self._inflight.get(uid, []) if e is not entry]
+            if entries:
+                self._inflight[uid] = entries
+            else:
+                self._inflight.pop(uid, None)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[CART FLUSH ERROR] {e}")
+
+    def close(self):
+        """Stop the background thread and write whatever is still buffered."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(5)
+            self._thread = None
+        self.flush()
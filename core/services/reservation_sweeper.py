@@ -0,0 +1,51 @@
+'''
+Background sweeper for expired stock reservations.
+
+Expired holds already stop counting against available stock the moment they expire, so the sweeper
+is only housekeeping: it deletes them in small batches every `interval` seconds so the
+stock_reservations table stays small. It runs in a daemon thread and never blocks the menus.
+'''
+
+import threading
+
+from core.models.reservation import Reservation
+
+
+class ReservationSweeper:
+    """Periodically releases expired holds in a background thread."""
+
+    def __init__(self, db, interval: float = 30.0, batch_size: int = 500):
+        self.reservation_model = Reservation(db)
+        self.interval = interval
+        self.batch_size = batch_size
+        self.released_total = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the sweeper thread (does nothing if it is already running)."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="reservation-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Ask the thread to finish and wait for it."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def sweep_once(self) -> int:
+        """Release expired holds now. Returns how many were released."""
+        released = self.reservation_model.release_expired(self.batch_size)
+        self.released_total += released
+        return released
+
+    def _run(self):
+        while not self._stop.wait(self.interval): # wait() returns True as soon as stop() is called
+            try:
+                self.sweep_once()
+            except Exception as e: # a failed sweep (e.g. database busy) is simply retried next round
+                print(f"[SWEEPER ERROR] {e}")
@@ -0,0 +1,194 @@
+'''
+Login sessions for many users at once.
+
+AuthService used to remember one logged-in user for the whole program. A SessionStore can hold thousands:-
+    1. create(user) gives back an opaque random token; whoever shows that token is that user
+    2. get(token) turns a token back into the user row with one dict lookup (no database query)
+    3. sessions expire after `ttl` seconds without use, every use pushes the expiry forward
+    4. at most `max_sessions` are kept in memory, the least recently used one is dropped first
+    5. persist=True also saves sessions in the sessions table, so they survive a restart and
+       sessions dropped from memory are loaded back on their next use
+Tokens themselves are never stored, only their SHA-256 hash.
+'''
+
+import hashlib
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from core.models.user import User
+
+DEFAULT_SESSION_TTL = 8 * 60 * 60 # seconds a session stays valid without being used
+
+
+def _hash(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class SessionStore:
+    """Token -> user row map with expiry, LRU bound and optional SQLite persistence."""
+
+    def __init__(self, db=None, ttl: float = DEFAULT_SESSION_TTL, max_sessions: int = 100_000, persist: bool = False):
+        """
+        db           : DatabaseManager instance (needed for persist=True)
+        ttl          : seconds of inactivity after which a session expires
+        max_sessions : sessions kept in memory
+        persist      : also store sessions in the database
+        """
+        if persist and db is None:
+            raise ValueError("persist=True needs a database")
+        self.db = db
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.persist = persist
+        self.user_model = User(db) if db is not None else None
+
+        self._sessions = OrderedDict() # {token_hash: [user_row, expires_at, saved_expires_at]}, least recently used first
+        self._by_user = {} # {user_id: {token_hash, ...}}, for logging a user out everywhere
+        self._lock = threading.Lock()
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+        self.loaded = 0
+
+    # ----- Create / Resolve -----
+    def create(self, user) -> str:
+        """Start a session for a user row and return its token."""
+        token = secrets.token_urlsafe(32)
+        key = _hash(token)
+        now = time.time()
+        expires_at = now + self.ttl
+        if self.persist:
+            self.db.execute(
+                "INSERT INTO sessions (token_hash, user_id, created_at, expires_at) VALUES (?, ?, ?, ?)",
+                (key, user["id"], now, expires_at), commit=True
+            )
+        with self._lock:
+            self._add(key, user, expires_at)
+            self.created += 1
+        return token
+
+    def get(self, token: str):
+        """Return the user row of a valid session (and extend it), or None."""
+        if not token:
+            return None
+        key = _hash(token)
+        now = time.time()
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry is not None:
+                if entry[1] <= now:
+                    self._remove(key)
+                    self.expired += 1
+                    entry = None
+                else:
+                    self._sessions.move_to_end(key)
+                    entry[1] = now + self.ttl # sliding expiry
+        if entry is None:
+            entry = self._load(key, now)
+            if entry is None:
+                return None
+
+        # Saving the new expiry on every request would make each read a write; only do it once half the TTL is used up
+        if self.persist and entry[2] - now < self.ttl / 2:
+            entry[2] = entry[1]
+            self.db.execute("UPDATE sessions SET expires_at = ? WHERE token_hash = ?", (entry[1], key), commit=True)
+        return entry[0]
+
+    def _load(self, key, now):
+        """Find a session that isn't in memory (dropped by the LRU bound, or from before a restart) in the database."""
+        if not self.persist:
+            return None
+        row = self.db.fetch_one("SELECT user_id, expires_at FROM sessions WHERE token_hash = ?", (key,))
+        if not row:
+            return None
+        user = self.user_model.get_by_id(row["user_id"])
+        if row["expires_at"] <= now or not user:
+            self.db.execute("DELETE FROM sessions WHERE token_hash = ?", (key,), commit=True)
+            return None
+        with self._lock:
+            entry = self._add(key, user, now + self.ttl, row["expires_at"])
+            self.loaded += 1
+        return entry
+
+    # ----- Revoke -----
+    def revoke(self, token: str) -> bool:
+        """End one session (logout). Returns True if it existed."""
+        key = _hash(token)
+        with self._lock:
+            found = self._remove(key)
+        if self.persist:
+            found = (self.db.execute("DELETE FROM sessions WHERE token_hash = ?", (key,), commit=True) or 0) > 0 or found
+        return found
+
+    def revoke_user(self, user_id: int) -> int:
+        """End every session of a user. Returns how many were in memory."""
+        with self._lock:
+            keys = list(self._by_user.get(user_id, ()))
+            for key in keys:
+                self._remove(key)
+        if self.persist:
+            self.db.execute("DELETE FROM sessions WHERE user_id = ?", (user_id,), commit=True)
+        return len(keys)
+
+    def refresh_user(self, user_id: int):
+        """Reload the user row held by that user's sessions (after a role or name change)."""
+        if self.user_model is None:
+            return
+        user = self.user_model.get_by_id(user_id)
+        if not user: # the user was deleted
+            self.revoke_user(user_id)
+            return
+        with self._lock:
+            for key in self._by_user.get(user_id, ()):
+                self._sessions[key][0] = user
+
+    def purge_expired(self) -> int:
+        """Delete expired sessions from memory (and the database). Returns how many were removed from memory."""
+        now = time.time()
+        with self._lock:
+            keys = [key for key, entry in self._sessions.items() if entry[1] <= now]
+            for key in keys:
+                self._remove(key)
+            self.expired += len(keys)
+        if self.persist:
+            self.db.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,), commit=True)
+        return len(keys)
+
+    # ----- Internal (caller holds the lock) -----
+    def _add(self, key, user, expires_at, saved_expires_at=None):
+        entry = self._sessions[key] = [user, expires_at, saved_expires_at or expires_at]
+        self._sessions.move_to_end(key)
+        self._by_user.setdefault(user["id"], set()).add(key)
+        while self.max_sessions and len(self._sessions) > self.max_sessions:
+            old_key = next(iter(self._sessions))
+            self._remove(old_key) # still in the database when persisted, get() loads it back
+            self.evicted += 1
+        return entry
+
+    def _remove(self, key) -> bool:
+        entry = self._sessions.pop(key, None)
+        if entry is None:
+            return False
+        keys = self._by_user.get(entry[0]["id"])
+        if keys:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[entry[0]["id"]]
+        return True
+
+    # ----- Metrics -----
+    def __len__(self):
+        return len(self._sessions)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "users": len(self._by_user),
+                "created": self.created,
+                "expired": self.expired,
+                "evicted": self.evicted,
+                "loaded": self.loaded,
+            }
@@ -14,6 +14,7 @@ Use this like a website - navigate through menus and interact with the system!
 ===============================================================================
 """
 
+import argparse
 import os
 import sys
 from core.database import DatabaseManager
@@ -22,12 +23,19 @@ from core.models.product import Product
 from core.models.order import Order
 from core.services.auth_service import AuthService
 from core.services.cart_service import CartService
+from core.services.cart_store import MemoryCartStore
 from core.services.admin_service import AdminService
+from core.services.reservation_sweeper import ReservationSweeper
 
 
 def clear_screen():
     """Clear the console screen for better UX."""
-    os.system('cls' if os.name == 'nt' else 'clear') # this will execute the command clear/cls before the next command is taken in terminal .
+    if not sys.stdout.isatty(): # output is going to a file or a pipe, there is no screen to clear
+        return
+    if os.name == 'nt':
+        os.system('cls') # older Windows consoles don't understand the escape codes below
+    else:
+        print("\033[2J\033[H", end="", flush=True) # ANSI "erase screen" + "cursor to top left", no need to start a `clear` process
 
 
 def print_header(title: str):
@@ -75,6 +83,48 @@ def display_products(products, show_stock=True):
     print("-" * 70)
 
 
+PAGE_SIZE = 10 # rows shown per page in the product and order listings
+
+
+def browse_pages(fetch_page, display, pick: str = None):
+    """
+    Show a paginated listing with next/prev navigation.
+    fetch_page(token) returns {"items", "next", "prev"} and display(items) prints one page.
+    With pick (e.g. "product ID to add"), typing a number on any page returns it; otherwise None is returned.
+    """
+    token = None
+    while True:
+        page = fetch_page(token)
+        display(page["items"])
+
+        options = []
+        if page["prev"]:
+            options.append("[p] Previous")
+        if page["next"]:
+            options.append("[n] Next")
+        if pick:
+            options.append(f"[number] {pick}")
+        if not options:
+            return None
+        choice = (get_user_input("  ".join(options) + "  [Enter] Back: ") or "").lower()
+        if choice == "n" and page["next"]:
+            token = page["next"]
+        elif choice == "p" and page["prev"]:
+            token = page["prev"]
+        elif pick and choice.isdigit():
+            return int(choice)
+        elif not choice:
+            return None
+
+
+def display_order_lines(orders):
+    """One short line per order (for picking an order by ID)."""
+    if not orders:
+        print("\nNo orders found.")
+    for order in orders:
+        print(f"Order ID: {order['id']} | Status: {order['status']} | User ID: {order['user_id']} | Total: tk{order['total']:.2f}")
+
+
 def display_orders(orders):
     """Display a list of orders."""
     if not orders:
@@ -85,13 +135,11 @@ def display_orders(orders):
         print(f"\n{'='*70}")
         print(f"Order ID: {order['id']} | Status: {order['status'].upper()} | Date: {order['created_at']}")
         print(f"{'-'*70}")
-        total = 0
         for item in order['items']:
             subtotal = item['price'] * item['qty']
-            total += subtotal
             print(f"  {item['name']:<30} x{item['qty']:<3} @ tk{item['price']:.2f} = tk{subtotal:.2f}")
         print(f"{'-'*70}")
-        print(f"Total: tk{total:.2f}")
+        print(f"Total: tk{order['total']:.2f}") # stored with the order when it was placed
         print(f"{'='*70}")
 
 
@@ -120,8 +168,7 @@ def customer_menu(db, auth_service, cart_service, product_model, order_model):
             # Browse Products
             clear_screen()
             print_header("Browse Products")
-            products = product_model.list_products()
-            display_products(products)
+            browse_pages(lambda token: product_model.list_products_page(token, PAGE_SIZE), display_products)
             input("\nPress Enter to continue...")
             clear_screen()
         
@@ -150,10 +197,7 @@ def customer_menu(db, auth_service, cart_service, product_model, order_model):
             # Add to Cart
             clear_screen()
             print_header("Add to Cart")
-            products = product_model.list_products()
-            display_products(products)
-            
-            product_id = get_user_input("\nEnter product ID to add: ", int)
+            product_id = browse_pages(lambda token: product_model.list_products_page(token, PAGE_SIZE), display_products, "product ID to add")
             if product_id:
                 qty = get_user_input("Enter quantity: ", int) or 1
                 cart_service.add_to_cart(user['id'], product_id, qty)
@@ -195,8 +239,7 @@ def customer_menu(db, auth_service, cart_service, product_model, order_model):
             # My Orders
             clear_screen()
             print_header("My Orders")
-            orders = order_model.get_user_orders(user['id'])
-            display_orders(orders)
+            browse_pages(lambda token: order_model.get_user_orders_page(user['id'], token, PAGE_SIZE), display_orders)
             input("\nPress Enter to continue...")
             clear_screen()
         
@@ -233,7 +276,8 @@ def admin_menu(db, auth_service, admin_service, product_model, order_model, user
             "8": "Cancel Order",
             "9": "View All Users",
             "10": "Promote User to Admin",
-            "11": "Logout"
+            "11": "Sales Reports",
+            "12": "Logout"
         })
         
         choice = get_user_input("Enter your choice: ", int)
@@ -242,8 +286,7 @@ def admin_menu(db, auth_service, admin_service, product_model, order_model, user
             # View All Products
             clear_screen()
             print_header("All Products")
-            products = product_model.list_products()
-            display_products(products)
+            browse_pages(lambda token: product_model.list_products_page(token, PAGE_SIZE), display_products)
             input("\nPress Enter to continue...")
             clear_screen()
         
@@ -265,10 +308,7 @@ def admin_menu(db, auth_service, admin_service, product_model, order_model, user
             # Update Product
             clear_screen()
             print_header("Update Product")
-            products = product_model.list_products()
-            display_products(products)
-            
-            product_id = get_user_input("\nEnter product ID to update: ", int)
+            product_id = browse_pages(lambda token: product_model.list_products_page(token, PAGE_SIZE), display_products, "product ID to update")
             if product_id:
                 print("\nLeave blank to skip updating a field:")
                 name = get_user_input("New name: ") or None
@@ -286,10 +326,7 @@ def admin_menu(db, auth_service, admin_service, product_model, order_model, user
             # Delete Product
             clear_screen()
             print_header("Delete Product")
-            products = product_model.list_products()
-            display_products(products)
-            
-            product_id = get_user_input("\nEnter product ID to delete: ", int)
+            product_id = browse_pages(lambda token: product_model.list_products_page(token, PAGE_SIZE), display_products, "product ID to delete")
             if product_id:
                 confirm = get_user_input("Are you sure? (yes/no): ").lower()
                 if confirm == 'yes':
@@ -301,10 +338,7 @@ def admin_menu(db, auth_service, admin_service, product_model, order_model, user
             # Manage Stock
             clear_screen()
             print_header("Manage Stock")
-            products = product_model.list_products()
-            display_products(products)
-            
-            product_id = get_user_input("\nEnter product ID: ", int)
+            product_id = browse_pages(lambda token: product_model.list_products_page(token, PAGE_SIZE), display_products, "product ID")
             if product_id:
                 print("\n1. Increase stock")
                 print("2. Reduce stock")
@@ -322,8 +356,7 @@ def admin_menu(db, auth_service, admin_service, product_model, order_model, user
             # View All Orders
             clear_screen()
             print_header("All Orders")
-            orders = admin_service.list_orders()
-            display_orders(orders)
+            browse_pages(lambda token: admin_service.list_orders_page(token, PAGE_SIZE), display_orders)
             input("\nPress Enter to continue...")
             clear_screen()
         
@@ -331,17 +364,12 @@ def admin_menu(db, auth_service, admin_service, product_model, order_model, user
             # Update Order Status
             clear_screen()
             print_header("Update Order Status")
-            orders = admin_service.list_orders()
-            if orders:
-                for order in orders:
-                    print(f"Order ID: {order['id']} | Status: {order['status']} | User ID: {order['user_id']}")
-                
-                order_id = get_user_input("\nEnter order ID: ", int)
-                if order_id:
-                    print("\nStatus options: pending, processing, shipped, delivered, cancelled")
-                    new_status = get_user_input("New status: ")
-                    if new_status:
-                        admin_service.update_order_status(order_id, new_status)
+            order_id = browse_pages(lambda token: admin_service.list_orders_page(token, PAGE_SIZE), display_order_lines, "order ID")
+            if order_id:
+                print("\nStatus options: pending, processing, shipped, delivered, cancelled")
+                new_status = get_user_input("New status: ")
+                if new_status:
+                    admin_service.update_order_status(order_id, new_status)
             input("\nPress Enter to continue...")
             clear_screen()
         
@@ -349,16 +377,11 @@ def admin_menu(db, auth_service, admin_service, product_model, order_model, user
             # Cancel Order
             clear_screen()
             print_header("Cancel Order")
-            orders = admin_service.list_orders()
-            if orders:
-                for order in orders:
-                    print(f"Order ID: {order['id']} | Status: {order['status']} | User ID: {order['user_id']}")
-                
-                order_id = get_user_input("\nEnter order ID to cancel: ", int)
-                if order_id:
-                    confirm = get_user_input("Are you sure? (yes/no): ").lower()
-                    if confirm == 'yes':
-                        admin_service.cancel_order(order_id)
+            order_id = browse_pages(lambda token: admin_service.list_orders_page(token, PAGE_SIZE), display_order_lines, "order ID to cancel")
+            if order_id:
+                confirm = get_user_input("Are you sure? (yes/no): ").lower()
+                if confirm == 'yes':
+                    admin_service.cancel_order(order_id)
             input("\nPress Enter to continue...")
             clear_screen()
         
@@ -395,6 +418,12 @@ def admin_menu(db, auth_service, admin_service, product_model, order_model, user
             clear_screen()
         
         elif choice == 11:
+            # Sales Reports
+            clear_screen()
+            sales_reports_menu(admin_service)
+            clear_screen()
+
+        elif choice == 12:
             # Logout
             auth_service.logout_user()
             print("\nLogged out successfully!")
@@ -408,6 +437,85 @@ def admin_menu(db, auth_service, admin_service, product_model, order_model, user
             clear_screen()
 
 
+def sales_reports_menu(admin_service):
+    """Sales report screens for admins; every report reads the rollup tables, so they're instant at any size."""
+    while True:
+        print_header("Sales Reports")
+        overview = admin_service.sales_overview()
+        if overview:
+            print(f"Today: {overview['orders_today']} orders, tk{overview['revenue_today']:.2f} | "
+                  f"This month: {overview['orders_this_month']} orders, tk{overview['revenue_this_month']:.2f} | "
+                  f"All time: {overview['orders_total']} orders, tk{overview['revenue_total']:.2f}")
+        print_menu({
+            "1": "Revenue by Day (last 90 days)",
+            "2": "Revenue by Month",
+            "3": "Top 20 Products This Month",
+            "4": "Top 20 Products of Another Month",
+            "5": "Orders by Status",
+            "6": "Top Customers",
+            "7": "Back"
+        })
+
+        choice = get_user_input("Enter your choice: ", int)
+        clear_screen()
+
+        if choice == 1:
+            print_header("Revenue by Day (last 90 days)")
+            days = admin_service.revenue_by_day(90)
+            best = max((day["revenue"] for day in days), default=0)
+            print(f"{'Day':<12} {'Orders':>7} {'Units':>7} {'Revenue':>12}")
+            print("-" * 70)
+            for day in days:
+                bar = "#" * int(28 * day["revenue"] / best) if best > 0 else "" # a small bar chart in the console
+                print(f"{day['day']:<12} {day['orders']:>7} {day['units']:>7} {day['revenue']:>12.2f} {bar}")
+            print("-" * 70)
+            print(f"{'Total':<12} {sum(d['orders'] for d in days):>7} {sum(d['units'] for d in days):>7} "
+                  f"{sum(d['revenue'] for d in days):>12.2f}")
+
+        elif choice == 2:
+            print_header("Revenue by Month")
+            print(f"{'Month':<10} {'Orders':>8} {'Units':>8} {'Revenue':>14}")
+            print("-" * 70)
+            for month in admin_service.revenue_by_month(12):
+                print(f"{month['month']:<10} {month['orders']:>8} {month['units']:>8} {month['revenue']:>14.2f}")
+
+        elif choice in (3, 4):
+            month = get_user_input("Month (YYYY-MM): ") if choice == 4 else None
+            products = admin_service.top_products(month, 20)
+            print_header(f"Top 20 Products - {month or 'This Month'}")
+            if not products:
+                print("\nNo sales in that month.")
+            else:
+                print(f"{'#':<4} {'ID':<8} {'Name':<35} {'Units':>7} {'Revenue':>12}")
+                print("-" * 70)
+                for rank, product in enumerate(products, start=1):
+                    print(f"{rank:<4} {product['product_id']:<8} {(product['name'] or '')[:35]:<35} "
+                          f"{product['units']:>7} {product['revenue']:>12.2f}")
+
+        elif choice == 5:
+            print_header("Orders by Status")
+            print(f"{'Status':<15} {'Orders':>8} {'Value':>14}")
+            print("-" * 70)
+            for row in admin_service.orders_by_status():
+                print(f"{row['status']:<15} {row['orders']:>8} {row['revenue']:>14.2f}")
+
+        elif choice == 6:
+            print_header("Top Customers")
+            print(f"{'ID':<6} {'Username':<20} {'Orders':>7} {'Spent':>12}  Last Order")
+            print("-" * 70)
+            for row in admin_service.top_customers(20):
+                print(f"{row['user_id']:<6} {(row['username'] or '-'):<20} {row['order_count']:>7} "
+                      f"{row['total_spent']:>12.2f}  {row['last_order_at'] or '-'}")
+
+        elif choice == 7:
+            break
+
+        else:
+            print("\nInvalid choice. Please try again.")
+        input("\nPress Enter to continue...")
+        clear_screen()
+
+
 def main_menu(db, auth_service, cart_service, product_model, order_model, admin_service, user_model):
     """Main application menu (login/register)."""
     while True:
@@ -461,8 +569,7 @@ def main_menu(db, auth_service, cart_service, product_model, order_model, admin_
             # Browse Products (Guest)
             clear_screen()
             print_header("Browse Products (Guest Mode)")
-            products = product_model.list_products()
-            display_products(products)
+            browse_pages(lambda token: product_model.list_products_page(token, PAGE_SIZE), display_products)
             print("\nNote: Please login to add items to cart and make purchases.")
             input("\nPress Enter to continue...")
             clear_screen()
@@ -479,12 +586,44 @@ def main_menu(db, auth_service, cart_service, product_model, order_model, admin_
             clear_screen()
 
 
-def main():
+def run_batch_mode(args):
+    """Run a command script without menus (see core/batch.py). Returns the exit code."""
+    from contextlib import redirect_stdout
+    from core.batch import run_batch
+
+    with redirect_stdout(sys.stderr): # migration / admin setup messages must not end up in the JSONL results
+        db = DatabaseManager(args.db)
+    with db:
+        source = sys.stdin if args.batch == "-" else open(args.batch, encoding="utf-8")
+        out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+        try:
+            summary = run_batch(db, source, out, args.stop_on_error)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            if out is not sys.stdout:
+                out.close()
+    print(f"{summary['commands']} commands, {summary['failed']} failed, {summary['ms']:.1f} ms", file=sys.stderr)
+    return 1 if summary["failed"] else 0
+
+
+def main(argv=None):
     """Main application entry point."""
+    parser = argparse.ArgumentParser(description="Console Commerce")
+    parser.add_argument("--db", default="data/ecommerce.db", help="SQLite database file")
+    parser.add_argument("--batch", metavar="FILE", help="run commands from a script or JSONL file ('-' = stdin) instead of the menus")
+    parser.add_argument("--out", default="-", help="where batch mode writes its JSONL results ('-' = stdout)")
+    parser.add_argument("--stop-on-error", action="store_true", help="stop the batch at the first failed command")
+    parser.add_argument("--cart-spill", metavar="DIR",
+                        help="folder for idle carts parked on disk (default: <db name>_cart_spill next to the database)")
+    args = parser.parse_args(argv)
+    if args.batch:
+        sys.exit(run_batch_mode(args))
+
     try:
         # Initialize database and services
         print("Initializing Console Commerce...")
-        db = DatabaseManager()
+        db = DatabaseManager(args.db)
         
         # Create model instances
         user_model = User(db)
@@ -493,15 +632,22 @@ def main():
         
         # Create service instances
         auth_service = AuthService(db)
-        cart_service = CartService(db)
+        # idle carts are parked on disk, in a folder that belongs to this database (carts are per database)
+        spill_dir = args.cart_spill or os.path.splitext(args.db)[0] + "_cart_spill"
+        cart_service = CartService(db, store=MemoryCartStore(spill_dir=spill_dir))
         admin_service = AdminService(db, auth_service)
         
+        # Release expired cart holds in the background
+        sweeper = ReservationSweeper(db)
+        sweeper.start()
+        
         clear_screen()
         
         # Start the application
         main_menu(db, auth_service, cart_service, product_model, order_model, admin_service, user_model)
         
         # Close database connection
+        sweeper.stop()
         db.close()
         
     except KeyboardInterrupt:
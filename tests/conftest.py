@@ -0,0 +1,36 @@
+'''
+Shared pytest fixtures. Every test gets its own temporary database, the shop's own data/ecommerce.db
+is never touched. pytest captures what the models print, use the capsys fixture to check it.
+'''
+
+import os
+
+import pytest
+
+from core.database import DatabaseManager
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return os.path.join(str(tmp_path), "shop.db")
+
+
+@pytest.fixture
+def open_db(db_path):
+    """open_db(path=None, **kwargs) -> DatabaseManager, closed again after the test."""
+    opened = []
+
+    def open_database(path=None, **kwargs):
+        db = DatabaseManager(path or db_path, **kwargs)
+        opened.append(db)
+        return db
+
+    yield open_database
+    for db in opened:
+        db.close()
+
+
+@pytest.fixture
+def db(open_db):
+    """A fresh, fully migrated database (with the default admin as user 1)."""
+    return open_db()
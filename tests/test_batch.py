@@ -0,0 +1,104 @@
+'''
+Tests for scripted runs (core/batch.py): line parsing, argument matching, sessions and the JSON Lines output.
+'''
+
+import io
+import json
+
+import pytest
+
+from core.batch import BatchError, BatchRunner, parse_line, run_batch
+
+
+def run_script(db, text, stop_on_error=False):
+    out = io.StringIO()
+    summary = run_batch(db, text.strip().splitlines(), out, stop_on_error)
+    return summary, [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_parse_line():
+    assert parse_line("") is None
+    assert parse_line("   # a comment") is None
+    assert parse_line('add_product "USB Hub" 19.99 40') == {"cmd": "add_product", "args": ["USB Hub", "19.99", "40"]}
+    assert parse_line('{"cmd": "add_to_cart", "product_id": 3}') == {"cmd": "add_to_cart", "product_id": 3}
+    with pytest.raises(BatchError):
+        parse_line('{"product_id": 3}')
+    with pytest.raises(ValueError):
+        parse_line('{"cmd": ')
+
+
+def test_plain_script_and_json_lines_give_the_same_results(db):
+    summary, results = run_script(db, '''
+        login admin admin123
+        add_product "USB Hub" 19.99 40
+        {"cmd": "add_product", "name": "Cable", "price": 4.5, "stock": 10}
+        get_product 2
+    ''')
+    assert summary["commands"] == 4 and summary["failed"] == 0
+    assert [result["line"] for result in results] == [1, 2, 3, 4]
+    assert results[0]["result"]["role"] == "admin"
+    assert results[3]["result"]["name"] == "Cable"
+    assert results[3]["result"]["price"] == 4.5 # converted from the text of a plain script line too
+
+
+def test_each_result_line_has_the_documented_fields(db):
+    _, results = run_script(db, "get_product 1")
+    assert set(results[0]) == {"line", "cmd", "ok", "result", "output", "ms"}
+    assert results[0]["ok"] is False # no such product
+
+
+def test_errors(db):
+    summary, results = run_script(db, '''
+        frobnicate
+        checkout
+        {"cmd": "get_product"}
+        get_product abc
+        get_product 1 2
+        {"cmd": "get_product", "product_id": 1, "colour": "red"}
+        {broken json
+    ''')
+    errors = [result.get("error") for result in results]
+    assert errors[0] == "unknown command 'frobnicate'"
+    assert errors[1] == "login first"
+    assert errors[2] == "missing argument product_id"
+    assert errors[3] == "product_id must be int"
+    assert errors[4] == "too many arguments"
+    assert errors[5] == "unknown argument(s): colour"
+    assert errors[6].startswith("unreadable line")
+    assert summary["failed"] == 7
+
+
+def test_stop_on_error(db):
+    summary, results = run_script(db, "checkout\nlist_products", stop_on_error=True)
+    assert summary["commands"] == 1 and len(results) == 1
+
+
+def test_admins_only(db):
+    _, results = run_script(db, '''
+        register ann secret
+        login ann secret
+        add_product Mug 3.0 5
+    ''')
+    assert results[2]["error"] == "admins only"
+
+
+def test_named_sessions(db):
+    _, results = run_script(db, '''
+        login admin admin123
+        add_product Mug 3.0 5
+        register ann secret
+        {"cmd": "login", "username": "ann", "password": "secret", "session": "shopper"}
+        add_to_cart 1 2
+        {"cmd": "add_product", "name": "Bowl", "price": 4.0, "session": "admin"}
+        {"cmd": "checkout", "session": "shopper"}
+    ''')
+    assert all(result["ok"] for result in results), results
+    assert results[4]["output"].startswith("Added 2 X Mug") # what the service printed is kept, not shown
+    assert db.fetch_one("SELECT user_id FROM orders")["user_id"] == results[3]["result"]["user_id"]
+
+
+def test_logout(db):
+    runner = BatchRunner(db)
+    assert runner.run({"cmd": "login", "args": ["admin", "admin123"]})["ok"]
+    assert runner.run({"cmd": "logout"})["ok"]
+    assert runner.run({"cmd": "stats"})["error"] == "login first"
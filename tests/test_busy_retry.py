@@ -0,0 +1,63 @@
+'''
+Tests for the lock contention handling in core/database.py (_retry_busy, busy_stats).
+'''
+
+import sqlite3
+import threading
+import time
+
+import pytest
+
+
+def hold_write_lock(db, seconds, locked):
+    """In another thread: take the write lock with a transaction and keep it for a while."""
+    def run():
+        with db.transaction():
+            db.execute("UPDATE users SET role = role WHERE id = 1", commit=True)
+            locked.set()
+            time.sleep(seconds)
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def test_waiting_for_another_writer_is_counted(open_db):
+    first, second = open_db(), open_db() # two "programs" on the same file
+    locked = threading.Event()
+    holder = hold_write_lock(first, 0.3, locked)
+    assert locked.wait(5)
+
+    started = time.perf_counter()
+    with second.transaction():
+        second.execute("UPDATE users SET role = role WHERE id = 1", commit=True)
+    waited = time.perf_counter() - started
+    holder.join()
+
+    busy = second.busy_stats()
+    assert waited >= 0.2
+    assert busy["waits"] == 1
+    assert busy["retries"] > 0 # the short busy_timeout hands the waiting to _retry_busy
+    assert busy["busy_errors"] >= busy["retries"]
+    assert busy["lock_wait"] >= 0.2
+    assert busy["gave_up"] == 0
+
+
+def test_gives_up_after_the_deadline(open_db):
+    first, second = open_db(), open_db(busy_deadline=0.1)
+    locked = threading.Event()
+    holder = hold_write_lock(first, 0.5, locked)
+    assert locked.wait(5)
+
+    with pytest.raises(sqlite3.OperationalError):
+        with second.transaction():
+            pass
+    holder.join()
+    assert second.busy_stats()["gave_up"] == 1
+
+
+def test_no_contention_no_waits(db):
+    for _ in range(20):
+        with db.transaction():
+            db.execute("UPDATE users SET role = role WHERE id = 1", commit=True)
+    busy = db.busy_stats()
+    assert (busy["waits"], busy["retries"], busy["busy_errors"]) == (0, 0, 0)
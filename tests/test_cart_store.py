@@ -0,0 +1,53 @@
+'''
+Tests for core/services/cart_store.py.
+'''
+
+import threading
+
+import pytest
+
+from core.services.cart_store import SQLiteCartStore
+
+
+@pytest.fixture
+def store(open_db):
+    db = open_db(pool_size=4) # room for a reader next to a flush
+    store = SQLiteCartStore(db, background=False)
+    yield store
+    store.close()
+
+
+def test_lines_being_flushed_stay_visible(store):
+    db = store.db
+    store.set_qty(7, 1, 2)
+    store.flush()
+    store.set_qty(7, 2, 5)
+
+    writing, release = threading.Event(), threading.Event()
+    execute_many = db.execute_many
+    def slow_execute_many(query, rows): # holds the flush between taking the buffer and committing
+        writing.set()
+        release.wait(5)
+        return execute_many(query, rows)
+    db.execute_many = slow_execute_many
+
+    flusher = threading.Thread(target=store.flush)
+    flusher.start()
+    assert writing.wait(5)
+    try:
+        assert store.get(7) == {1: 2, 2: 5}
+    finally:
+        release.set()
+        flusher.join(5)
+        db.execute_many = execute_many
+    assert store.get(7) == {1: 2, 2: 5}
+    assert store._inflight == {}
+
+
+def test_clear_being_flushed_hides_stored_lines(store):
+    store.set_qty(7, 1, 2)
+    store.flush()
+    store.clear(7)
+    store.set_qty(7, 3, 1)
+    store.flush(7)
+    assert store.get(7) == {3: 1}
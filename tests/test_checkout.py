@@ -0,0 +1,55 @@
+'''
+Tests for CartService.checkout in core/services/cart_service.py.
+'''
+
+import sqlite3
+
+import pytest
+
+from core.models.order import Order
+from core.models.product import Product
+from core.services.cart_service import CartService
+
+
+@pytest.fixture
+def cart_service(db):
+    product_model = Product(db)
+    product_model.add_product("Mug", 5.0, 10)
+    product_model.add_product("Pen", 1.0, 10)
+    service = CartService(db)
+    service.add_to_cart(7, 1, 3)
+    service.add_to_cart(7, 2, 2)
+    return service
+
+
+def stock(db):
+    return [row["stock"] for row in db.fetch_all("SELECT stock FROM products ORDER BY id")]
+
+
+def test_failure_while_writing_the_order_rolls_everything_back(db, cart_service, monkeypatch):
+    def failing_insert(order, order_id, items):
+        raise sqlite3.OperationalError("disk I/O error")
+    monkeypatch.setattr(Order, "_insert_items", failing_insert)
+    assert cart_service.checkout(7) is False
+
+    assert stock(db) == [10, 10]
+    for table in ("orders", "order_items", "user_order_summary", "sales_daily"):
+        assert db.fetch_one(f"SELECT COUNT(*) AS n FROM {table}")["n"] == 0, table
+    assert cart_service.store.get(7) == {1: 3, 2: 2} # the cart is kept for another try
+    assert cart_service.failed_checkouts == {"stock": 0, "database": 1}
+
+
+def test_stock_gone_rolls_everything_back(db, cart_service):
+    db.execute("UPDATE products SET stock = 1 WHERE id = 2", commit=True) # someone else sold the pens
+    Product(db).invalidate(2)
+    assert cart_service.checkout(7) is False
+    assert stock(db) == [10, 1]
+    assert db.fetch_one("SELECT COUNT(*) AS n FROM orders")["n"] == 0
+    assert cart_service.failed_checkouts == {"stock": 1, "database": 0}
+
+
+def test_successful_checkout(db, cart_service):
+    assert cart_service.checkout(7) is True
+    assert stock(db) == [7, 8]
+    assert db.fetch_one("SELECT total FROM orders")["total"] == 17.0
+    assert cart_service.store.get(7) == {}
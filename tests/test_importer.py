@@ -0,0 +1,37 @@
+'''
+Tests for core/importer.py.
+'''
+
+from core.importer import ProductImporter
+
+
+def import_rows(db, rows, key="name"):
+    return ProductImporter(db, key=key).import_rows(enumerate(rows, start=2))
+
+
+def skus(db):
+    return {row["name"]: row["sku"] for row in db.fetch_all("SELECT name, sku FROM products")}
+
+
+def test_sku_repeated_in_one_batch_is_rejected(db):
+    report = import_rows(db, [
+        {"name": "A", "price": 1, "stock": 1, "sku": "X"},
+        {"name": "B", "price": 2, "stock": 2, "sku": "X"},
+        {"name": "C", "price": 3, "stock": 3, "sku": "Y"},
+    ])
+    assert (report["inserted"], report["updated"], report["rejected"]) == (2, 0, 1)
+    assert report["rejects"][0][0] == 3
+    assert "'X'" in report["rejects"][0][1]
+    assert skus(db) == {"A": "X", "C": "Y"}
+
+
+def test_sku_of_another_product_is_rejected(db):
+    import_rows(db, [{"name": "A", "price": 1, "stock": 1, "sku": "X"}])
+    report = import_rows(db, [
+        {"name": "B", "price": 2, "stock": 2, "sku": "X"}, # X belongs to A
+        {"name": "A", "price": 5, "stock": 1, "sku": "X"}, # A keeping its own sku is fine
+    ])
+    assert (report["inserted"], report["updated"], report["rejected"]) == (0, 1, 1)
+    assert "already belongs" in report["rejects"][0][1]
+    assert skus(db) == {"A": "X"}
+    assert db.fetch_one("SELECT price FROM products WHERE name = 'A'")["price"] == 5
@@ -0,0 +1,71 @@
+'''
+Tests for MemoryCartStore in core/services/cart_store.py.
+'''
+
+import os
+
+from core.services import cart_store
+from core.services.cart_store import MemoryCartStore
+
+
+class Clock:
+    """Stands in for cart_store._now_ms so idle time can pass instantly."""
+
+    def __init__(self):
+        self.ms = 10_000_000_000 # like a host that has been up for a long time
+
+    def __call__(self):
+        return self.ms
+
+
+def test_lru_eviction_spills_and_restores(tmp_path):
+    store = MemoryCartStore(max_carts=2, idle_timeout=None, spill_dir=str(tmp_path))
+    store.set_qty(1, 5, 2)
+    store.set_qty(2, 6, 1)
+    store.get(1) # 1 is now more recently used than 2
+    store.set_qty(3, 7, 1)
+    assert store.evicted_lru == 1
+    assert set(store.carts) == {1, 3}
+    assert os.path.exists(os.path.join(str(tmp_path), "2.json"))
+
+    assert store.get(2) == {6: 1} # loaded back, which pushes out the least recently used cart (1)
+    assert store.restored == 1
+    assert set(store.carts) == {2, 3}
+    assert not os.path.exists(os.path.join(str(tmp_path), "2.json"))
+
+
+def test_idle_carts_are_evicted(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cart_store, "_now_ms", clock)
+    store = MemoryCartStore(idle_timeout=60, spill_dir=str(tmp_path))
+    store.set_qty(1, 5, 2)
+    clock.ms += 30_000
+    store.set_qty(2, 6, 1)
+    clock.ms += 40_000 # cart 1 is idle for 70 s now, cart 2 for 40 s
+    assert store.evict_idle() == 1
+    assert set(store.carts) == {2}
+    assert store.stats()["spilled"] == 1
+
+
+def test_restored_cart_stays_in_memory(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cart_store, "_now_ms", clock)
+    store = MemoryCartStore(idle_timeout=1, spill_dir=str(tmp_path))
+    store.set_qty(1, 5, 2)
+    clock.ms += 5_000
+    assert store.evict_idle() == 1
+
+    clock.ms += 5_000
+    store.set_qty(1, 6, 1) # loads the cart back from disk and changes it
+    assert store.get(1) == {5: 2, 6: 1}
+    assert store.stats()["carts"] == 1
+
+
+def test_without_spill_dir_evicted_carts_are_dropped(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cart_store, "_now_ms", clock)
+    store = MemoryCartStore(idle_timeout=1)
+    store.set_qty(1, 5, 2)
+    clock.ms += 5_000
+    store.evict_idle()
+    assert store.get(1) == {}
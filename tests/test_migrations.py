@@ -0,0 +1,32 @@
+'''
+Tests for core/migrations.py.
+'''
+
+import json
+import sqlite3
+
+
+def test_version_3_database_is_upgraded(open_db, db_path):
+    # A database from before order_items: the lines only exist in orders.items_json, schema version 3
+    open_db().close()
+    items = [{"product_id": 1, "name": "Mug", "price": 2.5, "qty": 2}, {"product_id": 2, "name": "Pen", "price": 1.0, "qty": 1}]
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO orders (id, user_id, items_json, status, created_at) VALUES (1, 1, ?, 'pending', '2025-01-02T10:00:00')",
+                 (json.dumps(items),))
+    conn.execute("INSERT INTO orders (id, user_id, items_json, status, created_at) VALUES (2, 1, 'not json', 'cancelled', '2025-01-03T10:00:00')")
+    conn.execute("PRAGMA user_version = 3")
+    conn.commit()
+    conn.close()
+
+    db = open_db() # runs migration 4 and everything after it
+    lines = db.fetch_all("SELECT order_id, product_id, name, price, qty FROM order_items ORDER BY id")
+    assert [tuple(line) for line in lines] == [(1, 1, "Mug", 2.5, 2), (1, 2, "Pen", 1.0, 1)]
+    order = db.fetch_one("SELECT total, item_count FROM orders WHERE id = 1")
+    assert (order["total"], order["item_count"]) == (6.0, 3)
+    summary = db.fetch_one("SELECT order_count, total_spent, last_order_id FROM user_order_summary WHERE user_id = 1")
+    assert tuple(summary) == (1, 6.0, 2) # the cancelled order doesn't count, but is the last one
+    assert db.fetch_one("SELECT revenue FROM sales_daily WHERE day = '2025-01-02'")["revenue"] == 6.0
+    db.close()
+
+    db = open_db() # opening again must not copy the lines twice
+    assert db.fetch_one("SELECT COUNT(*) AS n FROM order_items")["n"] == 2
@@ -0,0 +1,21 @@
+'''
+Tests for the order totals and user_order_summary kept by core/models/order.py.
+'''
+
+from core.models.order import Order
+
+ITEMS = [{"product_id": 1, "name": "Mug", "price": 2.5, "qty": 2}]
+
+
+def test_delete_moves_last_order_back(db):
+    order_model = Order(db)
+    first = order_model.create_order(1, ITEMS)
+    second = order_model.create_order(1, ITEMS)
+    order_model.delete_order(second)
+    summary = order_model.get_user_summary(1)
+    assert (summary["order_count"], summary["total_spent"]) == (1, 5.0)
+    assert summary["last_order_id"] == first
+
+    order_model.delete_order(first)
+    summary = order_model.get_user_summary(1)
+    assert (summary["order_count"], summary["last_order_id"], summary["last_order_at"]) == (0, None, None)
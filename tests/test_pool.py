@@ -0,0 +1,141 @@
+'''
+Tests for the connection pool (core/pool.py): per-thread re-entrant checkout, the size cap and close().
+'''
+
+import sqlite3
+import threading
+
+import pytest
+
+from core.pool import ConnectionPool, PoolTimeout
+
+
+@pytest.fixture
+def make_pool(db_path):
+    """make_pool(size, timeout) -> ConnectionPool on a temporary file, closed after the test."""
+    pools = []
+
+    def make(size=1, timeout=30.0):
+        pool = ConnectionPool(lambda: sqlite3.connect(db_path, check_same_thread=False), size=size, timeout=timeout)
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.close()
+
+
+def in_thread(target):
+    """Run target() in another thread and return what it returned (or raised)."""
+    result = {}
+
+    def run():
+        try:
+            result["value"] = target()
+        except Exception as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    thread.join(10)
+    return result
+
+
+def test_nested_checkout_reuses_the_threads_connection(make_pool):
+    pool = make_pool(size=1)
+    with pool.connection() as outer:
+        with pool.connection() as inner: # would wait forever on a size 1 pool if it took a second connection
+            assert inner is outer
+        assert pool.current() is outer # the inner release doesn't give it back yet
+    assert pool.current() is None
+    assert pool.stats()["idle"] == 1
+    assert pool.stats()["checkouts"] == 1
+
+
+def test_threads_get_different_connections(make_pool):
+    pool = make_pool(size=2)
+    with pool.connection() as mine:
+        other = in_thread(lambda: pool.acquire())["value"]
+        assert other is not mine
+    assert pool.stats()["opened"] == 2
+
+
+def test_connections_are_reused(make_pool):
+    pool = make_pool(size=4)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert second is first
+    assert pool.stats()["opened"] == 1
+
+
+def test_size_cap_and_timeout(make_pool):
+    pool = make_pool(size=1, timeout=0.05)
+    with pool.connection():
+        result = in_thread(lambda: pool.acquire())
+    assert isinstance(result["error"], PoolTimeout)
+    stats = pool.stats()
+    assert stats["opened"] == 1
+    assert stats["timeouts"] == 1
+
+
+def test_waiting_thread_gets_the_returned_connection(make_pool):
+    pool = make_pool(size=1, timeout=5)
+    conn = pool.acquire()
+    taken = threading.Event()
+
+    def take():
+        got = pool.acquire()
+        taken.set()
+        pool.release()
+        return got
+
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(conn=take()))
+    thread.start()
+    assert not taken.wait(0.05) # still waiting, the only connection is ours
+    pool.release()
+    thread.join(5)
+    assert result["conn"] is conn
+    assert pool.stats()["waits"] == 1
+
+
+def test_open_transaction_is_rolled_back_on_release(make_pool):
+    pool = make_pool(size=1)
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE t (x)")
+        conn.commit()
+        conn.execute("INSERT INTO t VALUES (1)") # left uncommitted
+    with pool.connection() as conn:
+        assert not conn.in_transaction
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+
+
+def test_close(make_pool):
+    pool = make_pool(size=2)
+    held = in_thread(lambda: pool.acquire())["value"] # checked out by a thread that never gives it back
+    with pool.connection() as idle:
+        pass
+    assert idle is not held
+
+    pool.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        idle.execute("SELECT 1") # idle connections are closed right away
+    held.execute("SELECT 1") # one still in use is left alone
+    with pytest.raises(sqlite3.ProgrammingError):
+        pool.acquire()
+
+
+def test_close_also_closes_the_closing_threads_connection(make_pool):
+    pool = make_pool(size=1)
+    conn = pool.acquire()
+    pool.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1") # close() also closes the closing thread's own connection
+    pool.release()
+    assert pool.stats()["idle"] == 0
+
+
+def test_size_must_be_positive():
+    with pytest.raises(ValueError):
+        ConnectionPool(lambda: None, size=0)
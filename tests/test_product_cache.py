@@ -0,0 +1,39 @@
+'''
+Tests for the product cache in core/models/product.py.
+'''
+
+import pytest
+
+from core.models.product import Product, _Versions
+
+
+@pytest.fixture
+def product_model(db):
+    model = Product(db)
+    model.add_product("Mug", 5.0, 10)
+    return model
+
+
+def test_row_changed_during_read_is_not_cached(db, product_model):
+    fetch_one = db.fetch_one
+    def fetch_then_change(query, params=()): # another thread updates the product right after our SELECT
+        row = fetch_one(query, params)
+        db.execute("UPDATE products SET stock = 3 WHERE id = 1", commit=True)
+        product_model.invalidate(1)
+        return row
+    db.fetch_one = fetch_then_change
+    assert product_model.get_by_id(1)["stock"] == 10
+    db.fetch_one = fetch_one
+    assert product_model.get_by_id(1)["stock"] == 3
+
+
+def test_versions_are_bounded_and_never_go_back():
+    versions = _Versions(2)
+    versions.bump([1])
+    old = versions.get(1)
+    versions.bump([1])
+    current = versions.get(1)
+    versions.bump([2, 3]) # 1 is dropped to make room
+    assert len(versions) == 2
+    assert versions.get(1) >= current # unchanged since, or newer: never the old value
+    assert versions.get(1) != old
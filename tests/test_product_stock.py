@@ -0,0 +1,29 @@
+'''
+Tests for stock changes in core/models/product.py.
+'''
+
+import pytest
+
+from core.models.product import Product
+
+
+@pytest.fixture
+def product_model(db):
+    model = Product(db)
+    model.add_product("Mug", 5.0, 1)
+    return model
+
+
+def test_shortage(product_model, capsys):
+    capsys.readouterr()
+    assert product_model.reduce_stock(1, 2) is False
+    assert capsys.readouterr().out == "Not enough products in stock.\n"
+
+
+def test_database_error_is_not_a_shortage(db, product_model, capsys, monkeypatch):
+    monkeypatch.setattr(db, "execute", lambda *args, **kwargs: None) # what execute() returns after swallowing an sqlite3 error
+    capsys.readouterr()
+    assert product_model.reduce_stock(1, 1) is False
+    output = capsys.readouterr().out
+    assert "database error" in output
+    assert "Not enough" not in output
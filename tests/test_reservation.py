@@ -0,0 +1,131 @@
+'''
+Tests for stock holds (core/models/reservation.py), the sweeper and how add_to_cart reports them.
+'''
+
+import types
+
+import pytest
+
+from core.models import reservation
+from core.models.product import Product
+from core.models.reservation import Reservation
+from core.services.cart_service import CartService
+from core.services.reservation_sweeper import ReservationSweeper
+
+
+class Clock:
+    """Stands in for time.time() in reservation.py, so tests can jump past the TTL."""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(reservation, "time", types.SimpleNamespace(time=clock.time))
+    return clock
+
+
+@pytest.fixture
+def holds(db, clock):
+    Product(db).add_product("Lamp", 20.0, 5) # product 1, 5 in stock
+    return Reservation(db, ttl=60)
+
+
+def test_hold_and_available_stock(holds):
+    assert holds.hold(2, 1, 3) is True
+    assert holds.available_stock(1) == 2
+    assert holds.available_stock(1, user_id=2) == 5 # the user's own hold doesn't count against them
+    assert holds.get_user_holds(2) == {1: 3}
+
+
+def test_hold_replaces_the_previous_hold(holds):
+    assert holds.hold(2, 1, 3) is True
+    assert holds.hold(2, 1, 4) is True
+    assert holds.get_user_holds(2) == {1: 4}
+    assert holds.available_stock(1) == 1
+
+
+def test_hold_refused_when_others_hold_the_stock(holds):
+    assert holds.hold(2, 1, 4) is True
+    assert holds.hold(3, 1, 2) is False
+    assert holds.hold(3, 1, 1) is True
+    assert holds.hold(4, 1, 1) is False
+
+
+def test_hold_of_missing_product(holds):
+    assert holds.hold(2, 99, 1) is False
+    assert holds.available_stock(99) is None
+
+
+def test_release(holds):
+    holds.hold(2, 1, 2)
+    assert holds.release(2, 1) == 1
+    assert holds.available_stock(1) == 5
+
+    holds.hold(2, 1, 1)
+    assert holds.release(2) == 1
+    assert holds.get_user_holds(2) == {}
+
+
+def test_expired_holds_stop_counting(holds, clock):
+    holds.hold(2, 1, 5)
+    assert holds.hold(3, 1, 1) is False
+
+    clock.now += 61
+    assert holds.available_stock(1) == 5
+    assert holds.get_user_holds(2) == {}
+    assert holds.hold(3, 1, 5) is True
+
+
+def test_release_expired_in_batches(db, holds, clock):
+    for user_id in range(2, 7):
+        holds.hold(user_id, 1, 1)
+    clock.now += 61
+    holds.hold(7, 1, 1) # still active, must survive
+
+    assert holds.release_expired(batch_size=2) == 5
+    assert db.fetch_one("SELECT COUNT(*) AS n FROM stock_reservations")["n"] == 1
+    assert holds.get_user_holds(7) == {1: 1}
+
+
+def test_sweeper(db, holds, clock):
+    holds.hold(2, 1, 1)
+    holds.hold(3, 1, 1)
+    clock.now += 61
+
+    sweeper = ReservationSweeper(db, batch_size=1)
+    assert sweeper.sweep_once() == 2
+    assert sweeper.sweep_once() == 0
+    assert sweeper.released_total == 2
+
+
+def test_sweeper_thread_starts_and_stops(db):
+    sweeper = ReservationSweeper(db, interval=0.01)
+    sweeper.start()
+    sweeper.stop()
+    assert sweeper._thread is None
+
+
+def test_database_error_is_not_a_shortage(db, holds, capsys, monkeypatch):
+    cart_service = CartService(db)
+    real_execute = db.execute
+
+    def failing_execute(query, *args, **kwargs):
+        if "stock_reservations" in query:
+            return None # what execute() returns after swallowing an sqlite3 error
+        return real_execute(query, *args, **kwargs)
+
+    monkeypatch.setattr(db, "execute", failing_execute)
+    assert cart_service.reservation_model.hold(2, 1, 1) is None
+
+    capsys.readouterr()
+    assert cart_service.add_to_cart(2, 1, 1) is False
+    output = capsys.readouterr().out
+    assert "database error" in output
+    assert "Not enough stock" not in output
+    assert cart_service.store.get(2) == {}
@@ -0,0 +1,108 @@
+'''
+Tests for the sales rollups (core/models/sales.py): the changes Order makes as it goes must add up to
+exactly what rebuild() computes from the orders themselves.
+'''
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from core.models import order as order_module
+from core.models.order import Order
+
+ROLLUPS = {
+    "sales_daily": "SELECT day, orders, units, revenue FROM sales_daily WHERE orders != 0 ORDER BY day",
+    "sales_product_monthly": "SELECT month, product_id, units, revenue FROM sales_product_monthly WHERE units != 0 ORDER BY month, product_id",
+    "sales_status": "SELECT status, orders, revenue FROM sales_status WHERE orders != 0 ORDER BY status",
+}
+
+
+def snapshot(db):
+    # rows that went back to zero stay behind after incremental changes, rebuild() doesn't create them
+    return {table: [tuple(row) for row in db.fetch_all(query) or []] for table, query in ROLLUPS.items()}
+
+
+def assert_matches_rebuild(db, order_model):
+    incremental = snapshot(db)
+    order_model.sales.rebuild()
+    rebuilt = snapshot(db)
+    for table in ROLLUPS:
+        assert len(incremental[table]) == len(rebuilt[table]), table
+        for mine, expected in zip(incremental[table], rebuilt[table]):
+            assert mine[:-1] == expected[:-1], table
+            assert mine[-1] == pytest.approx(expected[-1], abs=0.011), table # revenue, rounded at every step
+
+
+class Clock:
+    """Stands in for datetime in order.py, so orders land on different days and months."""
+
+    def __init__(self):
+        self.current = datetime(2024, 1, 30, 12, 0)
+
+    def now(self):
+        self.current += timedelta(hours=7)
+        return self.current
+
+
+@pytest.fixture
+def order_model(db, monkeypatch):
+    monkeypatch.setattr(order_module, "datetime", Clock())
+    return Order(db)
+
+
+def items(rng):
+    return [{"product_id": rng.randint(1, 5), "name": f"Product {n}", "price": rng.choice([2.5, 9.99, 14.0]), "qty": rng.randint(1, 3)}
+            for n in range(rng.randint(1, 3))]
+
+
+def test_create_update_cancel_delete(db, order_model):
+    first = order_model.create_order(2, [{"product_id": 1, "name": "Mug", "price": 2.5, "qty": 2}])
+    second = order_model.create_order(3, [{"product_id": 2, "name": "Lamp", "price": 20.0, "qty": 1}])
+    assert_matches_rebuild(db, order_model)
+
+    order_model.update_order(first, new_status="shipped")
+    order_model.update_order(second, new_items=[{"product_id": 1, "name": "Mug", "price": 2.5, "qty": 4}])
+    assert_matches_rebuild(db, order_model)
+
+    order_model.update_order(first, new_status="cancelled")
+    assert_matches_rebuild(db, order_model)
+    order_model.update_order(first, new_status="pending") # un-cancelled orders count again
+    assert_matches_rebuild(db, order_model)
+
+    order_model.delete_order(second)
+    order_model.update_order(first, new_status="cancelled")
+    order_model.delete_order(first) # deleting a cancelled order only touches sales_status
+    assert_matches_rebuild(db, order_model)
+    assert snapshot(db) == {table: [] for table in ROLLUPS}
+
+
+def test_random_changes_match_rebuild(db, order_model):
+    rng = random.Random(7)
+    order_ids = []
+    for _ in range(200):
+        action = rng.random()
+        if action < 0.4 or not order_ids:
+            order_ids.append(order_model.create_order(rng.randint(2, 6), items(rng)))
+        elif action < 0.65:
+            order_model.update_order(rng.choice(order_ids), new_status=rng.choice(["pending", "shipped", "Cancelled", "delivered"]))
+        elif action < 0.85:
+            order_model.update_order(rng.choice(order_ids), new_items=items(rng))
+        else:
+            order_id = rng.choice(order_ids)
+            order_ids.remove(order_id)
+            order_model.delete_order(order_id)
+    assert len({row[0][:7] for row in snapshot(db)["sales_daily"]}) > 1 # the orders really span several months
+    assert_matches_rebuild(db, order_model)
+
+
+def test_reports(db, order_model):
+    order_model.create_order(2, [{"product_id": 1, "name": "Mug", "price": 2.5, "qty": 2}])
+    cancelled = order_model.create_order(2, [{"product_id": 2, "name": "Lamp", "price": 20.0, "qty": 1}])
+    order_model.update_order(cancelled, new_status="cancelled")
+
+    statuses = {row["status"]: (row["orders"], row["revenue"]) for row in order_model.sales.orders_by_status()}
+    assert statuses == {"pending": (1, 5.0), "cancelled": (1, 20.0)}
+    assert [(row["product_id"], row["units"]) for row in order_model.sales.top_products("2024-01")] == [(1, 2)]
+    days = order_model.sales.revenue_by_day(3, end=datetime(2024, 1, 31).date())
+    assert [day["revenue"] for day in days] == [0.0, 5.0, 0.0] # days without sales are filled in
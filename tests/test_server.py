@@ -0,0 +1,124 @@
+'''
+Tests for the JSON API (core/server.py). ApiApp.handle() is called directly, no sockets involved.
+'''
+
+import json
+
+import pytest
+
+from core.server import ApiApp
+
+
+@pytest.fixture
+def app(db):
+    app = ApiApp(db)
+    app.product_model.add_product("Kettle", 30.0, 3) # product 1
+    return app
+
+
+def call(app, method, target, body=None, token=None):
+    return app.handle(method, target, json.dumps(body).encode("utf-8") if body is not None else b"", token)
+
+
+def login(app, username, password):
+    status, result = call(app, "POST", "/login", {"username": username, "password": password})
+    assert status == 200
+    return result["token"]
+
+
+@pytest.fixture
+def admin_token(app):
+    return login(app, "admin", "admin123") # the default admin of a new database
+
+
+@pytest.fixture
+def customer_token(app):
+    assert call(app, "POST", "/register", {"username": "ann", "password": "secret"})[0] == 201
+    return login(app, "ann", "secret")
+
+
+def test_routing(app):
+    assert call(app, "GET", "/health") == (200, {"status": "ok"})
+    status, product = call(app, "GET", "/products/1")
+    assert status == 200 and product["name"] == "Kettle"
+    status, page = call(app, "GET", "/products?limit=5")
+    assert status == 200 and [item["id"] for item in page["items"]] == [1]
+
+
+def test_not_found_and_method_not_allowed(app):
+    assert call(app, "GET", "/nowhere")[0] == 404
+    assert call(app, "GET", "/products/99") == (404, {"error": "product not found"})
+    assert call(app, "DELETE", "/products/1")[0] == 405
+
+
+def test_bad_requests(app, customer_token):
+    assert app.handle("POST", "/login", b"{not json")[0] == 400
+    assert app.handle("POST", "/login", b"[1, 2]")[0] == 400
+    assert call(app, "POST", "/login", {"username": "ann"}) == (400, {"error": "'password' is required"})
+    assert call(app, "GET", "/products?limit=abc")[0] == 400
+    assert call(app, "GET", "/products/search")[0] == 400
+    assert call(app, "POST", "/cart/items", {"product_id": "x"}, customer_token) == (400, {"error": "'product_id' is invalid"})
+    assert call(app, "POST", "/cart/items", {"product_id": 1, "qty": 0}, customer_token)[0] == 400
+
+
+def test_login_required(app):
+    assert call(app, "GET", "/me") == (401, {"error": "login required"})
+    assert call(app, "GET", "/cart", token="made-up")[0] == 401
+    assert call(app, "POST", "/login", {"username": "admin", "password": "wrong"})[0] == 401
+
+
+def test_admins_only(app, customer_token, admin_token):
+    assert call(app, "GET", "/admin/stats", token=customer_token) == (403, {"error": "admins only"})
+    assert call(app, "POST", "/admin/products", {"name": "Cup", "price": 2.0}, customer_token)[0] == 403
+    assert call(app, "GET", "/admin/stats", token=admin_token)[0] == 200
+    assert call(app, "POST", "/admin/products", {"name": "Cup", "price": 2.0}, admin_token)[0] == 201
+
+
+def test_logout_ends_the_session(app, customer_token):
+    status, me = call(app, "GET", "/me", token=customer_token)
+    assert status == 200 and me["username"] == "ann" and "password" not in me
+    assert call(app, "POST", "/logout", token=customer_token)[0] == 200
+    assert call(app, "GET", "/me", token=customer_token)[0] == 401
+
+
+def test_register_conflict(app, customer_token):
+    assert call(app, "POST", "/register", {"username": "ann", "password": "other"})[0] == 409
+
+
+def test_cart_and_checkout(app, customer_token):
+    status, cart = call(app, "POST", "/cart/items", {"product_id": 1, "qty": 2}, customer_token)
+    assert status == 200 and cart["item_count"] == 2
+    assert call(app, "POST", "/cart/items", {"product_id": 1, "qty": 5}, customer_token)[0] == 409 # only 3 in stock
+    assert call(app, "POST", "/checkout", token=customer_token) == (200, {"ok": True})
+
+    status, orders = call(app, "GET", "/orders", token=customer_token)
+    assert status == 200 and len(orders["items"]) == 1
+    order_id = orders["items"][0]["id"]
+    assert call(app, "GET", f"/orders/{order_id}", token=customer_token)[0] == 200
+    assert call(app, "POST", "/checkout", token=customer_token)[0] == 409 # the cart is empty now
+
+
+def test_someone_elses_order_looks_missing(app, customer_token, admin_token):
+    call(app, "POST", "/cart/items", {"product_id": 1}, admin_token)
+    call(app, "POST", "/checkout", token=admin_token)
+    order_id = call(app, "GET", "/admin/orders", token=admin_token)[1]["items"][0]["id"]
+    assert call(app, "GET", f"/orders/{order_id}", token=customer_token) == (404, {"error": "order not found"})
+    assert call(app, "GET", f"/orders/{order_id}", token=admin_token)[0] == 200
+
+
+def test_internal_errors_are_500(app, monkeypatch, capsys):
+    def broken(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(app.product_model, "get_by_id", broken)
+    assert call(app, "GET", "/products/1") == (500, {"error": "internal error"})
+    assert "boom" in capsys.readouterr().err
+
+
+def test_metrics_count_statuses(app):
+    call(app, "GET", "/health")
+    call(app, "GET", "/nowhere")
+    metrics = app.metrics()
+    assert metrics["requests"] == 2
+    assert metrics["statuses"] == {"200": 1, "404": 1}
+    assert metrics["routes"]["GET /health"]["count"] == 1
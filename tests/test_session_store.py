@@ -0,0 +1,131 @@
+'''
+Tests for login sessions (core/services/session_store.py): token hashing, expiry, the LRU bound and persistence.
+'''
+
+import types
+
+import pytest
+
+from core.models.user import User
+from core.services import session_store
+from core.services.session_store import SessionStore
+
+
+class Clock:
+    """Stands in for time.time() in session_store.py."""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(session_store, "time", types.SimpleNamespace(time=clock.time))
+    return clock
+
+
+@pytest.fixture
+def admin(db):
+    return User(db).get_by_id(1) # the default admin every new database gets
+
+
+def test_create_and_get(admin):
+    store = SessionStore()
+    token = store.create(admin)
+    assert store.get(token)["id"] == admin["id"]
+    assert store.get("not-a-token") is None
+    assert store.get("") is None
+
+
+def test_only_the_token_hash_is_stored(db, admin):
+    store = SessionStore(db, persist=True)
+    token = store.create(admin)
+    rows = db.fetch_all("SELECT token_hash FROM sessions")
+    assert [row["token_hash"] for row in rows] == [session_store._hash(token)]
+    assert token not in store._sessions
+    assert token not in rows[0]["token_hash"]
+
+
+def test_expiry_slides_with_use(admin, clock):
+    store = SessionStore(ttl=100)
+    token = store.create(admin)
+    clock.now += 90
+    assert store.get(token) is not None # used, so it lives another 100 seconds
+    clock.now += 90
+    assert store.get(token) is not None
+    clock.now += 101
+    assert store.get(token) is None
+    assert store.stats()["expired"] == 1
+    assert len(store) == 0
+
+
+def test_purge_expired(admin, clock):
+    store = SessionStore(ttl=100)
+    store.create(admin)
+    clock.now += 50
+    fresh = store.create(admin)
+    clock.now += 60
+    assert store.purge_expired() == 1
+    assert store.get(fresh) is not None
+
+
+def test_lru_bound(admin):
+    store = SessionStore(max_sessions=2)
+    first = store.create(admin)
+    second = store.create(admin)
+    store.get(first) # first is now the most recently used
+    third = store.create(admin)
+    assert store.get(second) is None
+    assert store.get(first) is not None and store.get(third) is not None
+    assert store.stats()["evicted"] == 1
+
+
+def test_revoke(admin):
+    store = SessionStore()
+    token = store.create(admin)
+    other = store.create(admin)
+    assert store.revoke(token) is True
+    assert store.get(token) is None
+    assert store.revoke(token) is False
+    assert store.revoke_user(admin["id"]) == 1
+    assert store.get(other) is None
+
+
+def test_persisted_sessions_survive_a_restart(db, admin):
+    token = SessionStore(db, persist=True).create(admin)
+    restarted = SessionStore(db, persist=True) # a new process: nothing in memory yet
+    assert restarted.get(token)["id"] == admin["id"]
+    assert restarted.stats()["loaded"] == 1
+
+    assert SessionStore(db).get(token) is None # without persist the database isn't looked at
+
+
+def test_persisted_session_evicted_from_memory_is_loaded_back(db, admin):
+    store = SessionStore(db, persist=True, max_sessions=1)
+    token = store.create(admin)
+    store.create(admin) # pushes the first one out of memory
+    assert store.get(token)["id"] == admin["id"]
+    assert store.stats()["loaded"] == 1
+
+
+def test_expired_persisted_session_is_deleted(db, admin, clock):
+    token = SessionStore(db, ttl=100, persist=True).create(admin)
+    clock.now += 101
+    assert SessionStore(db, ttl=100, persist=True).get(token) is None
+    assert db.fetch_one("SELECT COUNT(*) AS n FROM sessions")["n"] == 0
+
+
+def test_revoke_removes_the_persisted_session(db, admin):
+    store = SessionStore(db, persist=True)
+    token = store.create(admin)
+    assert store.revoke(token) is True
+    assert SessionStore(db, persist=True).get(token) is None
+
+
+def test_persist_needs_a_database():
+    with pytest.raises(ValueError):
+        SessionStore(persist=True)
@@ -0,0 +1,87 @@
+'''
+Tests for DatabaseManager.transaction(): nesting with SAVEPOINTs, rollback and the after-transaction callbacks.
+'''
+
+import pytest
+
+
+def names(db):
+    return [row["name"] for row in db.fetch_all("SELECT name FROM products ORDER BY id") or []]
+
+
+def add(db, name):
+    db.execute("INSERT INTO products (name, price, stock) VALUES (?, 1.0, 1)", (name,), commit=True)
+
+
+def test_commit(db):
+    with db.transaction():
+        add(db, "a")
+        add(db, "b")
+    assert names(db) == ["a", "b"]
+    assert not db.in_transaction()
+
+
+def test_rollback(db):
+    with pytest.raises(ValueError):
+        with db.transaction():
+            add(db, "a")
+            raise ValueError("abort")
+    assert names(db) == []
+    assert not db.in_transaction()
+
+
+def test_inner_rollback_keeps_the_outer_work(db):
+    with db.transaction():
+        add(db, "outer")
+        with pytest.raises(ValueError):
+            with db.transaction(): # a SAVEPOINT
+                add(db, "inner")
+                raise ValueError("abort inner")
+        assert db.in_transaction()
+        add(db, "after")
+    assert names(db) == ["outer", "after"]
+
+
+def test_outer_rollback_undoes_committed_inner_blocks(db):
+    with pytest.raises(ValueError):
+        with db.transaction():
+            with db.transaction():
+                add(db, "inner")
+            raise ValueError("abort outer")
+    assert names(db) == []
+
+
+def test_error_after_sqlite_rolled_back_by_itself(db):
+    # SQLite ends the transaction on its own after errors like SQLITE_FULL; the original error must come out,
+    # not "cannot rollback - no transaction is active"
+    with pytest.raises(ValueError):
+        with db.transaction() as conn:
+            with db.transaction():
+                add(db, "a")
+                conn.execute("ROLLBACK")
+                raise ValueError("original")
+    assert names(db) == []
+    assert not db.in_transaction()
+
+    with db.transaction(): # the connection is usable again
+        add(db, "b")
+    assert names(db) == ["b"]
+
+
+def test_callbacks_run_after_commit_and_rollback(db):
+    calls = []
+    with db.transaction():
+        db.call_after_transaction(lambda: calls.append("commit"))
+        with db.transaction():
+            db.call_after_transaction(lambda: calls.append("nested"))
+        assert calls == [] # nothing runs before the outer block ends
+    assert calls == ["commit", "nested"]
+
+    with pytest.raises(ValueError):
+        with db.transaction():
+            db.call_after_transaction(lambda: calls.append("rollback"))
+            raise ValueError("abort")
+    assert calls == ["commit", "nested", "rollback"]
+
+    db.call_after_transaction(lambda: calls.append("now")) # outside a transaction it runs right away
+    assert calls[-1] == "now"